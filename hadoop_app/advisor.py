@@ -0,0 +1,279 @@
+import math
+from django.db import transaction
+from .config import HADOOP_CONFIG
+from .models import HadoopJob, JobResourceProfile
+from .yarn import APPLICATION_TAG, job_submitter, job_tag
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Memory units of YARN and Spark settings, in MB; bare numbers are MB
+MEMORY_UNITS = {'k': 1 / 1024, 'm': 1, 'g': 1024, 't': 1048576}
+
+# Executors Spark starts on YARN when num_executors is not set
+DEFAULT_SPARK_EXECUTORS = 2
+
+def memory_mb(value):
+    """Megabytes in a memory setting such as '1024', '512m' or '2g'"""
+    value = str(value).strip().lower().rstrip('b')
+    if value[-1:] in MEMORY_UNITS:
+        return float(value[:-1]) * MEMORY_UNITS[value[-1]]
+    return float(value)
+
+def allocation(job_type, configuration):
+    """Memory (MB) and vcores a job configuration reserves at a time, or None if it sets no resources"""
+    if job_type == 'MAPREDUCE':
+        return memory_mb(configuration.get('memory') or 1024), int(configuration.get('vcores') or 1)
+    if job_type == 'SPARK':
+        executors = int(configuration.get('num_executors') or DEFAULT_SPARK_EXECUTORS)
+        return (
+            executors * memory_mb(configuration.get('executor_memory') or '1g'),
+            executors * int(configuration.get('executor_cores') or 1)
+        )
+    return None
+
+class ResourceAdvisor:
+    """Learn per-job-name resource usage from finished jobs and size new submissions.
+
+    Usage comes from the ResourceManager reports of every application a job
+    started (memory and vcore seconds) and, for sizing, from what the job's
+    own containers actually used: JobHistory counters for MapReduce (peak
+    task memory and CPU time) and the Spark History Server executor metrics
+    for Spark (peak heap and task time). YARN only reports reserved
+    resources, which would size every job at least as large as it already is.
+    """
+
+    def __init__(self, submitter):
+        self.submitter = submitter
+        self.config = HADOOP_CONFIG['ADVISOR']
+
+    def _counters(self, application_id):
+        """Fetch the task counters of a MapReduce job from the JobHistory server"""
+        job_id = application_id.replace('application_', 'job_', 1)
+        url = f"http://{HADOOP_CONFIG['MAPREDUCE']['historyserver']}/ws/v1/history/mapreduce/jobs/{job_id}/counters"
+        response = self.submitter.client.session.get(url, timeout=self.submitter.client.timeout)
+        response.raise_for_status()
+        counters = {}
+        for group in response.json()['jobCounters'].get('counterGroup', []):
+            for counter in group.get('counter', []):
+                counters[counter['name']] = counter['totalCounterValue']
+        return counters
+
+    def _spark_executors(self, application_id):
+        """Fetch the executors (and driver) of a finished Spark application from the Spark History Server"""
+        url = f"http://{HADOOP_CONFIG['MAPREDUCE']['spark_historyserver']}/api/v1/applications/{application_id}/allexecutors"
+        response = self.submitter.client.session.get(url, timeout=self.submitter.client.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _spark_usage(self, app, executors):
+        """Executor count the work needed, peak executor heap (MB) and task seconds of one Spark application"""
+        workers = [executor for executor in executors if executor.get('id') != 'driver']
+        runtime = (app.get('finishedTime', 0) - app.get('startedTime', 0)) / 1000
+        if not workers or runtime <= 0:
+            return None
+        task_seconds = sum(executor.get('totalDuration', 0) for executor in workers) / 1000
+        cores = max(executor.get('totalCores', 1) for executor in workers)
+        heap = max((executor.get('peakMemoryMetrics') or {}).get('JVMHeapMemory', 0) for executor in workers)
+        return {
+            # Parallelism the tasks kept busy, never more than the executors that ran
+            'executors': min(len(workers), task_seconds / (runtime * cores)),
+            'peak_memory_mb': heap / 1048576,
+            'cpu_seconds': task_seconds
+        }
+
+    def collect_usage(self, job):
+        """Record the resources a finished job used and fold them into its profile"""
+        # The launcher and every application it started carry the job tag
+        apps = self.submitter.client.applications(applicationTags=job_tag(job))
+
+        usage = {
+            'runtime': (job.finished_at - job.started_at).total_seconds(),
+            'memory_seconds': sum(app.get('memorySeconds', 0) for app in apps),
+            'vcore_seconds': sum(app.get('vcoreSeconds', 0) for app in apps),
+        }
+        peaks, cpu_millis, executors = [], 0, []
+        for app in apps:
+            if APPLICATION_TAG in app.get('applicationTags', '').split(','):
+                # The launcher only runs the client; it says nothing about the job's containers
+                continue
+            if app.get('applicationType') == 'SPARK':
+                try:
+                    spark = self._spark_usage(app, self._spark_executors(app['id']))
+                except Exception as e:
+                    logger.warning(f"No Spark History Server executors for {app['id']}: {e}")
+                    continue
+                if spark is not None:
+                    executors.append(spark['executors'])
+                    peaks.append(spark['peak_memory_mb'] * 1048576)
+                    cpu_millis += spark['cpu_seconds'] * 1000
+                continue
+            if app.get('applicationType') != 'MAPREDUCE':
+                continue
+            try:
+                counters = self._counters(app['id'])
+            except Exception as e:
+                logger.warning(f"No JobHistory counters for {app['id']}: {e}")
+                continue
+            cpu_millis += counters.get('CPU_MILLISECONDS', 0)
+            peaks += [
+                counters[name] for name in ('MAP_PHYSICAL_MEMORY_BYTES_MAX', 'REDUCE_PHYSICAL_MEMORY_BYTES_MAX')
+                if name in counters
+            ]
+        if cpu_millis:
+            usage['cpu_seconds'] = cpu_millis / 1000
+        if peaks:
+            usage['peak_memory_mb'] = max(peaks) / 1048576
+        if executors:
+            usage['executors'] = max(executors)
+
+        job.metrics = {**(job.metrics or {}), 'usage': usage}
+        job.save(update_fields=['metrics'])
+        self.learn(job, usage)
+        return usage
+
+    def learn(self, job, usage):
+        """Update the running averages of a job name with one finished run"""
+        alpha = self.config['smoothing']
+
+        def blend(old, new):
+            if new is None:
+                return old
+            if old is None:
+                return new
+            return (1 - alpha) * old + alpha * new
+
+        with transaction.atomic():
+            profile, _ = JobResourceProfile.objects.select_for_update().get_or_create(
+                owner_id=job.owner_id, name=job.name, job_type=job.job_type
+            )
+            if profile.samples == 0:
+                profile.avg_runtime = usage['runtime']
+                profile.avg_memory_seconds = usage['memory_seconds']
+                profile.avg_vcore_seconds = usage['vcore_seconds']
+                profile.avg_cpu_seconds = usage.get('cpu_seconds')
+                profile.avg_executors = usage.get('executors')
+                profile.peak_memory_mb = usage.get('peak_memory_mb')
+            else:
+                profile.avg_runtime = blend(profile.avg_runtime, usage['runtime'])
+                profile.avg_memory_seconds = blend(profile.avg_memory_seconds, usage['memory_seconds'])
+                profile.avg_vcore_seconds = blend(profile.avg_vcore_seconds, usage['vcore_seconds'])
+                profile.avg_cpu_seconds = blend(profile.avg_cpu_seconds, usage.get('cpu_seconds'))
+                profile.avg_executors = blend(profile.avg_executors, usage.get('executors'))
+                new_peak = usage.get('peak_memory_mb')
+                if new_peak is not None:
+                    # Decay slowly towards recent runs, but never below the newest peak
+                    profile.peak_memory_mb = max(new_peak, blend(profile.peak_memory_mb, new_peak))
+            profile.samples += 1
+            profile.save()
+        return profile
+
+    def _round_memory(self, memory_mb):
+        increment = self.config['memory_increment']
+        memory_mb = max(memory_mb * self.config['memory_headroom'], self.config['min_memory'])
+        return int(math.ceil(memory_mb / increment) * increment)
+
+    def suggest(self, profile, configuration):
+        """Suggest resource settings for a job from its learned profile"""
+        suggestion = {}
+        if profile.job_type == 'MAPREDUCE':
+            if profile.peak_memory_mb:
+                suggestion['memory'] = str(self._round_memory(profile.peak_memory_mb))
+            if profile.avg_cpu_seconds and profile.avg_vcore_seconds:
+                # Scale vcores by how busy the allocated vcores actually were
+                utilization = profile.avg_cpu_seconds / profile.avg_vcore_seconds
+                suggestion['vcores'] = str(max(1, math.ceil(int(configuration.get('vcores', 1)) * utilization)))
+        elif profile.job_type == 'SPARK':
+            # Both come from what executors used, and never exceed what the job already has,
+            # so applied advice cannot ratchet a job up run after run
+            if profile.avg_executors:
+                executors = min(self.config['max_executors'], max(1, math.ceil(profile.avg_executors)))
+                suggestion['num_executors'] = str(executors)
+            if profile.peak_memory_mb:
+                current = memory_mb(configuration.get('executor_memory') or '1g')
+                suggestion['executor_memory'] = f'{int(min(self._round_memory(profile.peak_memory_mb), current))}m'
+        return suggestion
+
+    def advise(self, owner, job_type, name, requested, configuration):
+        """Suggest (or apply) resources for the values a submission left out.
+
+        Returns the advice recorded on the job, or None when there is not
+        enough history for this job name yet.
+        """
+        if not self.config['enabled']:
+            return None
+        profile = JobResourceProfile.objects.filter(owner=owner, name=name, job_type=job_type).first()
+        if profile is None or profile.samples < self.config['min_samples']:
+            return None
+
+        suggestion = {
+            key: value for key, value in self.suggest(profile, configuration).items()
+            if key not in requested
+        }
+        applied = suggestion if self.config['mode'] == 'apply' else {}
+        # What the submission would have run with, to measure the applied advice against
+        replaced = {key: configuration.get(key) for key in applied}
+        configuration.update(applied)
+        return {
+            'suggested': suggestion,
+            'applied': applied,
+            'replaced': replaced,
+            'predicted_runtime': profile.avg_runtime,
+            'samples': profile.samples
+        }
+
+    def savings(self, job, advice, usage):
+        """Resources the applied advice saved, against what the job's own settings would have reserved.
+
+        The run's usage is scaled by how much more (or less) the replaced
+        settings reserve than the applied ones; negative values mean the
+        advice sized the job up.
+        """
+        saved = {'memory_seconds': 0, 'vcore_seconds': 0}
+        if not advice['applied']:
+            return saved
+        original = {**job.configuration, **advice.get('replaced', {})}
+        used, requested = allocation(job.job_type, job.configuration), allocation(job.job_type, original)
+        if used is None or not all(used):
+            return saved
+        saved['memory_seconds'] = usage['memory_seconds'] * (requested[0] / used[0] - 1)
+        saved['vcore_seconds'] = usage['vcore_seconds'] * (requested[1] / used[1] - 1)
+        return saved
+
+    def report(self, owner):
+        """Compare predicted with actual runtimes and sum the resources saved by advice"""
+        jobs = HadoopJob.objects.filter(
+            owner=owner, status='SUCCEEDED', metrics__has_key='advisor'
+        ).filter(metrics__has_key='usage').only('id', 'name', 'job_type', 'configuration', 'metrics')
+
+        entries = []
+        memory_saved = vcore_saved = 0
+        for job in jobs:
+            advice, usage = job.metrics['advisor'], job.metrics['usage']
+            saved = self.savings(job, advice, usage)
+            memory_saved += saved['memory_seconds']
+            vcore_saved += saved['vcore_seconds']
+            entries.append({
+                'id': job.pk,
+                'name': job.name,
+                'job_type': job.job_type,
+                'applied': advice['applied'],
+                'predicted_runtime': advice['predicted_runtime'],
+                'actual_runtime': usage['runtime'],
+                'saved': saved
+            })
+
+        return {
+            'jobs': entries,
+            'profiles': list(
+                JobResourceProfile.objects.filter(owner=owner).values(
+                    'name', 'job_type', 'samples', 'avg_runtime', 'avg_memory_seconds',
+                    'avg_vcore_seconds', 'avg_executors', 'peak_memory_mb'
+                )
+            ),
+            'memory_seconds_saved': memory_saved,
+            'vcore_seconds_saved': vcore_saved
+        }
+
+# Singleton instance of the resource advisor
+resource_advisor = ResourceAdvisor(job_submitter)
@@ -0,0 +1,338 @@
+import operator
+import re
+import threading
+import time
+import uuid
+from collections import deque
+import requests
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from .config import HADOOP_CONFIG
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _rule_key(name):
+    return f'hadoop_alerts:rule:{name}'
+
+OPERATORS = {
+    '>': operator.gt, '>=': operator.ge, '<': operator.lt,
+    '<=': operator.le, '==': operator.eq, '!=': operator.ne,
+}
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# [aggregate(]metric[, window)] operator threshold [for duration]
+EXPRESSION = re.compile(
+    r'^\s*(?:(?P<aggregate>avg|min|max|increase)\(\s*(?P<windowed>[\w.]+)\s*,\s*(?P<window>\w+)\s*\)|(?P<metric>[\w.]+))'
+    r'\s*(?P<operator>>=|<=|==|!=|>|<)\s*(?P<threshold>-?\d+(?:\.\d+)?)'
+    r'(?:\s+for\s+(?P<duration>\w+))?\s*$'
+)
+
+def parse_duration(value):
+    """Seconds in '90', '30s', '10m', '1h' or '2d'"""
+    match = re.match(r'^(\d+(?:\.\d+)?)([smhd]?)$', str(value).strip())
+    if not match:
+        raise ValueError(f"Invalid duration: {value}")
+    return float(match.group(1)) * DURATION_UNITS.get(match.group(2) or 's')
+
+def flatten_metrics(metrics):
+    """Turn collect_metrics output into {'metric.field': number} samples"""
+    return {
+        f'{name}.{field}': value
+        for name, fields in metrics.items() if isinstance(fields, dict)
+        for field, value in fields.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+class RollingWindow:
+    """Aggregate over the last window seconds, kept up to date in amortized O(1).
+
+    avg and increase keep the samples of the window; min and max only keep
+    the samples that can still become the extreme.
+    """
+
+    def __init__(self, aggregate, window):
+        self.aggregate = aggregate
+        self.window = window
+        # (timestamp, value, increase since the previous sample), for avg and increase
+        self.samples = deque()
+        self.total = 0.0
+        self.increase_total = 0.0
+        # Monotonic deque of (timestamp, value), for min and max
+        self.extremes = deque()
+
+    def add(self, timestamp, value):
+        cutoff = timestamp - self.window
+        if self.aggregate in ('min', 'max'):
+            beaten = operator.ge if self.aggregate == 'min' else operator.le
+            while self.extremes and beaten(self.extremes[-1][1], value):
+                self.extremes.pop()
+            self.extremes.append((timestamp, value))
+            while self.extremes[0][0] < cutoff:
+                self.extremes.popleft()
+            return
+
+        if self.samples:
+            previous = self.samples[-1][1]
+            # A counter that went down was reset; it has counted value since
+            increase = value - previous if value >= previous else value
+        else:
+            increase = 0.0
+        self.samples.append((timestamp, value, increase))
+        self.total += value
+        self.increase_total += increase
+        while len(self.samples) > 1 and self.samples[0][0] < cutoff:
+            _, old_value, old_increase = self.samples.popleft()
+            self.total -= old_value
+            self.increase_total -= old_increase
+
+    def value(self):
+        if self.aggregate == 'avg':
+            return self.total / len(self.samples)
+        if self.aggregate == 'increase':
+            # The oldest sample's increase happened before the window
+            return self.increase_total - self.samples[0][2]
+        return self.extremes[0][1]
+
+    def dump(self):
+        return {
+            'samples': list(self.samples),
+            'extremes': list(self.extremes),
+            'total': self.total,
+            'increase_total': self.increase_total
+        }
+
+    def load(self, data):
+        self.samples = deque(tuple(sample) for sample in data['samples'])
+        self.extremes = deque(tuple(extreme) for extreme in data['extremes'])
+        self.total = data['total']
+        self.increase_total = data['increase_total']
+
+class AlertRule:
+    """A threshold on one metric sample, optionally aggregated over a window.
+
+    The rule fires once the threshold has been breached for the 'for'
+    duration and resolves only when the value crosses back over clear
+    (hysteresis, defaulting to the threshold). While firing it notifies
+    again every repeat_interval seconds, if set.
+    """
+
+    def __init__(self, name, expression, severity='warning', clear=None, repeat_interval=None, description=''):
+        match = EXPRESSION.match(expression)
+        if not match:
+            raise ValueError(f"Invalid alert expression for {name}: {expression}")
+        self.name = name
+        self.expression = expression
+        self.severity = severity
+        self.description = description
+        self.metric = match.group('windowed') or match.group('metric')
+        self.aggregate = match.group('aggregate')
+        self.window_seconds = parse_duration(match.group('window')) if self.aggregate else None
+        self.operator = match.group('operator')
+        self.threshold = float(match.group('threshold'))
+        self.clear = float(clear) if clear is not None else self.threshold
+        self.duration = parse_duration(match.group('duration') or 0)
+        self.repeat_interval = repeat_interval
+        # Version of the shared state this rule was last synced with
+        self.revision = None
+        self.reset()
+
+    def reset(self):
+        self.window = RollingWindow(self.aggregate, self.window_seconds) if self.aggregate else None
+        self.state = 'ok'
+        self.value = None
+        self.pending_since = None
+        self.fired_at = None
+        self.last_notified = None
+
+    def _alert(self, state, timestamp):
+        return {
+            'rule': self.name,
+            'state': state,
+            'severity': self.severity,
+            'expression': self.expression,
+            'value': self.value,
+            'threshold': self.threshold,
+            'since': self.fired_at,
+            'timestamp': timestamp,
+            'description': self.description
+        }
+
+    def observe(self, timestamp, sample):
+        """Evaluate a new sample, returning an alert to send or None"""
+        if self.window is not None:
+            self.window.add(timestamp, sample)
+            self.value = self.window.value()
+        else:
+            self.value = sample
+        compare = OPERATORS[self.operator]
+
+        if self.state == 'firing':
+            if not compare(self.value, self.clear):
+                self.state, self.pending_since = 'ok', None
+                return self._alert('resolved', timestamp)
+            if self.repeat_interval and timestamp - self.last_notified >= self.repeat_interval:
+                self.last_notified = timestamp
+                return self._alert('firing', timestamp)
+            return None
+
+        if not compare(self.value, self.threshold):
+            self.state, self.pending_since = 'ok', None
+            return None
+        if self.pending_since is None:
+            self.pending_since = timestamp
+        if timestamp - self.pending_since < self.duration:
+            self.state = 'pending'
+            return None
+        self.state = 'firing'
+        self.fired_at = self.last_notified = timestamp
+        return self._alert('firing', timestamp)
+
+    def dump(self):
+        return {
+            'expression': self.expression,
+            'window': self.window.dump() if self.window else None,
+            'state': self.state,
+            'value': self.value,
+            'pending_since': self.pending_since,
+            'fired_at': self.fired_at,
+            'last_notified': self.last_notified
+        }
+
+    def load(self, data):
+        if data['expression'] != self.expression:
+            # The rule changed since the state was saved; start over
+            return
+        self.reset()
+        if self.window is not None:
+            self.window.load(data['window'])
+        for field in ('state', 'value', 'pending_since', 'fired_at', 'last_notified'):
+            setattr(self, field, data[field])
+
+class LogNotifier:
+    """Write alerts to the application log"""
+
+    def notify(self, alert):
+        log = logger.info if alert['state'] == 'resolved' else logger.warning
+        log(f"Alert {alert['rule']} {alert['state']}: {alert['expression']} (value {alert['value']})")
+
+class WebhookNotifier:
+    """POST alerts as JSON to a URL, e.g. a chat or paging webhook"""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def notify(self, alert):
+        requests.post(self.url, json=alert, timeout=self.timeout).raise_for_status()
+
+class MemorySink:
+    """Keep alerts in memory, for tests and local development"""
+
+    def __init__(self):
+        self.alerts = []
+
+    def notify(self, alert):
+        self.alerts.append(alert)
+
+class AlertEngine:
+    """Evaluate alert rules against metric samples as they are collected.
+
+    Rules are indexed by metric, so a sample only touches the rules that
+    watch it, and each rule keeps its own rolling window. Rule state lives
+    in memory and is handed between Celery worker processes through one
+    cache key per rule, read and written only when the rule gets a sample.
+    """
+
+    def __init__(self):
+        self.config = HADOOP_CONFIG['ALERTS']
+        self.lock = threading.Lock()
+        self._rules = None
+        self._notifiers = None
+
+    def reload(self):
+        """Rebuild rules and notifiers from the configuration, dropping rule state"""
+        with self.lock:
+            self._rules = None
+            self._notifiers = None
+
+    @property
+    def rules(self):
+        if self._rules is None:
+            rules = {}
+            for spec in self.config['rules']:
+                spec = {'repeat_interval': self.config['repeat_interval'], **spec}
+                rule = AlertRule(**spec)
+                rules.setdefault(rule.metric, []).append(rule)
+            self._rules = rules
+        return self._rules
+
+    @property
+    def notifiers(self):
+        if self._notifiers is None:
+            self._notifiers = [
+                import_string(spec['class'])(**{key: value for key, value in spec.items() if key != 'class'})
+                for spec in self.config['notifiers']
+            ]
+        return self._notifiers
+
+    def _restore(self, rules):
+        """Load the state other processes saved for these rules, skipping rules already in sync"""
+        saved = cache.get_many([_rule_key(rule.name) for rule in rules])
+        for rule in rules:
+            data = saved.get(_rule_key(rule.name))
+            if data is not None and data['revision'] != rule.revision:
+                rule.load(data['state'])
+                rule.revision = data['revision']
+
+    def _persist(self, rules):
+        for rule in rules:
+            rule.revision = uuid.uuid4().hex
+        cache.set_many({
+            _rule_key(rule.name): {'revision': rule.revision, 'state': rule.dump()} for rule in rules
+        }, timeout=None)
+
+    def observe(self, samples, timestamp=None):
+        """Feed {'metric.field': value} samples to the rules watching them and send the resulting alerts"""
+        if not self.config['enabled']:
+            return []
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self.lock:
+            observed = [(rule, value) for metric, value in samples.items() for rule in self.rules.get(metric, ())]
+            rules = [rule for rule, _ in observed]
+            self._restore(rules)
+            alerts = []
+            for rule, value in observed:
+                alert = rule.observe(timestamp, value)
+                if alert is not None:
+                    alerts.append(alert)
+            if rules:
+                self._persist(rules)
+
+        for alert in alerts:
+            for notifier in self.notifiers:
+                try:
+                    notifier.notify(alert)
+                except Exception as e:
+                    logger.error(f"Failed to send alert {alert['rule']} via {type(notifier).__name__}: {e}")
+        return alerts
+
+    def status(self):
+        """Current state of every rule"""
+        with self.lock:
+            self._restore([rule for rules in self.rules.values() for rule in rules])
+            return [
+                {
+                    'name': rule.name,
+                    'expression': rule.expression,
+                    'severity': rule.severity,
+                    'state': rule.state,
+                    'value': rule.value,
+                    'since': rule.fired_at if rule.state == 'firing' else rule.pending_since
+                }
+                for rules in self.rules.values() for rule in rules
+            ]
+
+# Singleton instance of the alert engine
+alert_engine = AlertEngine()
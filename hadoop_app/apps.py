@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class HadoopAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hadoop_app'
+
+    def ready(self):
+        # Hooks query timing into every database connection before one opens
+        from . import instrumentation  # noqa: F401
+        # Token cache invalidation must run wherever tokens and users change
+        from . import authentication  # noqa: F401
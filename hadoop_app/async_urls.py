@@ -0,0 +1,16 @@
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('monitoring/cluster_health/', async_views.cluster_health),
+    path('monitoring/metrics/', async_views.metrics),
+    path('monitoring/hdfs_capacity/', async_views.metric, {'name': 'hdfs_capacity'}),
+    path('monitoring/hdfs_usage/', async_views.metric, {'name': 'hdfs_used'}),
+    path('monitoring/mapreduce_jobs/', async_views.metric, {'name': 'mapreduce_jobs'}),
+    path('monitoring/yarn_containers/', async_views.metric, {'name': 'yarn_containers'}),
+    path('hdfs-files/status/', async_views.file_status),
+    path('hdfs-files/list_directory/', async_views.list_directory),
+    path('hadoop-jobs/<int:pk>/status/', async_views.job_status, name='async-job-status'),
+    path('hadoop-jobs/events/', async_views.job_events, name='async-job-events'),
+    path('hadoop-jobs/<int:pk>/logs/', async_views.job_logs, name='async-job-logs'),
+]
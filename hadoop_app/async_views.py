@@ -0,0 +1,165 @@
+from functools import wraps
+from urllib.parse import quote
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from .config import HADOOP_CONFIG
+from .models import HadoopJob
+from .monitoring import hadoop_monitor
+from .clients import get_async_http_client
+from .instrumentation import span
+from .authentication import authenticate_token
+from .job_events import await_status_change, status_event_stream
+from .job_logs import job_log_fetcher
+from .yarn import TERMINAL_STATUSES
+
+# Native async views for the endpoints that mostly wait on Hadoop. Under ASGI
+# a slow upstream call only parks a coroutine instead of holding a worker
+# thread; under WSGI Django runs them in a fresh event loop per request, and
+# the DRF viewsets remain the regular synchronous API.
+
+async def _authenticate(request):
+    """Resolve the user from a DRF token header or the session"""
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if keyword == 'Token' and key.strip():
+        try:
+            user, _ = await sync_to_async(authenticate_token)(key.strip())
+        except AuthenticationFailed:
+            return None
+        return user
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+def async_login_required(view):
+    """Reject unauthenticated requests the way the DRF endpoints do"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await _authenticate(request)
+        if user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+@require_GET
+@async_login_required
+async def cluster_health(request):
+    """Get overall Hadoop cluster health"""
+    return JsonResponse(await hadoop_monitor.acheck_cluster_health(get_async_http_client()))
+
+@require_GET
+@async_login_required
+async def metrics(request):
+    """Get Hadoop cluster metrics"""
+    return JsonResponse(await hadoop_monitor.acollect_metrics(get_async_http_client()))
+
+@require_GET
+@async_login_required
+async def metric(request, name):
+    """Get a single Hadoop cluster metric"""
+    try:
+        return JsonResponse(await hadoop_monitor.aget_metric(get_async_http_client(), name))
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+async def _webhdfs(op, path):
+    """Call a WebHDFS read operation, returning None when the path does not exist"""
+    config = HADOOP_CONFIG['HDFS']
+    with span('hdfs'):
+        response = await get_async_http_client().get(
+            f"http://{config['host']}:{config['port']}/webhdfs/v1{quote(path)}",
+            params={'op': op, 'user.name': config['user']}
+        )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+@require_GET
+@async_login_required
+async def file_status(request):
+    """Get the status of an HDFS path"""
+    path = request.GET.get('path', f'/user/{request.user.username}')
+    try:
+        result = await _webhdfs('GETFILESTATUS', path)
+        if result is None:
+            return JsonResponse({'path': path, 'exists': False})
+        return JsonResponse({'path': path, 'exists': True, 'status': result['FileStatus']})
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@require_GET
+@async_login_required
+async def list_directory(request):
+    """List the contents of an HDFS directory"""
+    path = request.GET.get('path', f'/user/{request.user.username}')
+    try:
+        result = await _webhdfs('LISTSTATUS', path)
+        if result is None:
+            return JsonResponse({'path': path, 'exists': False})
+        statuses = result['FileStatuses']['FileStatus']
+        # Listing a file returns the file itself with an empty suffix
+        is_directory = not (len(statuses) == 1 and statuses[0]['pathSuffix'] == '')
+        return JsonResponse({
+            'path': path,
+            'exists': True,
+            'is_directory': is_directory,
+            'contents': [entry['pathSuffix'] for entry in statuses] if is_directory else []
+        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@require_GET
+@async_login_required
+async def job_status(request, pk):
+    """Get job status, optionally long-polling until it changes"""
+    job = await HadoopJob.objects.filter(pk=pk, owner=request.user).only('id', 'status').afirst()
+    if job is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    try:
+        wait = min(
+            float(request.GET.get('wait', 0)),
+            HADOOP_CONFIG['MAPREDUCE']['notifications']['long_poll_timeout']
+        )
+    except ValueError:
+        return JsonResponse({'error': 'wait must be a number'}, status=400)
+    if wait > 0 and job.status not in TERMINAL_STATUSES:
+        known = request.GET.get('known', job.status)
+        return JsonResponse({'status': await await_status_change(job, known, wait)})
+    return JsonResponse({'status': job.status})
+
+@require_GET
+@async_login_required
+async def job_events(request):
+    """Stream status changes of the user's jobs as Server-Sent Events"""
+    response = StreamingHttpResponse(status_event_stream(request.user), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@require_GET
+@async_login_required
+async def job_logs(request, pk):
+    """Follow the log of a running job from an offset, or its last tail bytes, until the job finishes"""
+    job = await HadoopJob.objects.filter(pk=pk, owner=request.user).only('id', 'status', 'application_id').afirst()
+    if job is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    if not job.application_id:
+        return JsonResponse({'logs': 'No logs available yet'})
+    try:
+        offset = int(request.GET.get('offset', 0))
+        tail = int(request.GET['tail']) if 'tail' in request.GET else None
+        if offset < 0 or (tail is not None and tail < 0):
+            return JsonResponse({'error': 'offset and tail must not be negative'}, status=400)
+        filename = request.GET.get('file', 'stdout')
+        # Resolve the container before streaming so lookup errors still return JSON
+        node, container = await job_log_fetcher.alocate(job, filename, request.GET.get('container'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    chunks = job_log_fetcher.afollow(job, node, container, filename=filename, offset=offset, tail=tail)
+    response = StreamingHttpResponse(chunks, content_type='text/plain')
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,142 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from .config import HADOOP_CONFIG
+import logging
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_KEY = 'hadoop_token_revocations'
+
+class TokenCache:
+    """Bounded LRU of authenticated tokens, with their users, kept per process.
+
+    Entries are re-read from the database after token_cache_ttl seconds.
+    Revoking a token drops it here and bumps a counter in the shared
+    cache; other processes check that counter at most once per
+    revocation_check_interval and clear their entries when it moves.
+    """
+
+    def __init__(self):
+        self.config = HADOOP_CONFIG['AUTH']
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.epoch = None
+        self.next_revocation_check = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            token, fresh_until = entry
+            if time.monotonic() >= fresh_until:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return token
+
+    def put(self, token):
+        with self.lock:
+            self.entries[token.key] = (token, time.monotonic() + self.config['token_cache_ttl'])
+            self.entries.move_to_end(token.key)
+            while len(self.entries) > self.config['token_cache_size']:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def check_revocations(self):
+        """Forget every cached token once another process has revoked one"""
+        now = time.monotonic()
+        if now < self.next_revocation_check:
+            return
+        self.next_revocation_check = now + self.config['revocation_check_interval']
+        try:
+            epoch = cache.get(REVOCATION_KEY, 0)
+        except Exception as e:
+            # Entries still expire after token_cache_ttl
+            logger.warning(f"Failed to check token revocations: {e}")
+            return
+        if epoch != self.epoch:
+            self.clear()
+            self.epoch = epoch
+
+    def revoke(self, key=None, user_id=None):
+        """Drop a token, or all tokens of a user, here and in every other process"""
+        with self.lock:
+            for cached_key, (token, _) in list(self.entries.items()):
+                if cached_key == key or token.user_id == user_id:
+                    del self.entries[cached_key]
+        try:
+            cache.add(REVOCATION_KEY, 0, timeout=None)
+            cache.incr(REVOCATION_KEY)
+        except Exception as e:
+            logger.warning(f"Failed to publish token revocation: {e}")
+
+def token_expires_at(token):
+    expiry = HADOOP_CONFIG['AUTH']['token_expiry']
+    return token.created + timedelta(seconds=expiry) if expiry else None
+
+def authenticate_token(key):
+    """Resolve a token key to (user, token), without a query when the token is cached"""
+    token_cache.check_revocations()
+    token = token_cache.get(key)
+    if token is None:
+        try:
+            token = Token.objects.select_related('user').get(key=key)
+        except Token.DoesNotExist:
+            raise AuthenticationFailed('Invalid token.')
+        token_cache.put(token)
+
+    if not token.user.is_active:
+        raise AuthenticationFailed('User inactive or deleted.')
+    expires_at = token_expires_at(token)
+    if expires_at is not None and expires_at <= timezone.now():
+        raise AuthenticationFailed('Token has expired.')
+    # Requests must not share, and mutate, one cached user object
+    return copy.copy(token.user), token
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """DRF token authentication served from the in-process token cache"""
+
+    def authenticate_credentials(self, key):
+        return authenticate_token(key)
+
+def issue_token(user, rotate=False):
+    """Return the user's token, replacing it when rotating or once it has expired"""
+    token = Token.objects.filter(user=user).first()
+    if token is not None:
+        expires_at = token_expires_at(token)
+        if rotate or (expires_at is not None and expires_at <= timezone.now()):
+            # Deleting revokes cached copies through the post_delete handler
+            token.delete()
+            token = None
+    if token is None:
+        token = Token.objects.create(user=user)
+    return token
+
+def _revoke_deleted_token(sender, instance, **kwargs):
+    token_cache.revoke(key=instance.key)
+
+def _revoke_user_tokens(sender, instance, created=False, update_fields=None, **kwargs):
+    # New users have no tokens yet, and logins only touch last_login
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    token_cache.revoke(user_id=instance.pk)
+
+post_delete.connect(_revoke_deleted_token, sender=Token)
+post_save.connect(_revoke_user_tokens, sender=User)
+
+# Singleton instance of the token cache
+token_cache = TokenCache()
@@ -0,0 +1,180 @@
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+import requests
+from django.core.wsgi import get_wsgi_application
+from rest_framework.authtoken.models import Token
+from .models import HDFSFile, HiveQuery, HadoopJob
+
+def summarize(latencies, errors, duration):
+    """Throughput and latency percentiles of a run, latencies in seconds"""
+    latencies = sorted(latencies)
+
+    def percentile(fraction):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 2)
+
+    return {
+        'operations': len(latencies),
+        'per_second': round(len(latencies) / duration, 1) if duration else None,
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'errors': len(errors),
+        'error_samples': sorted(set(errors))[:3]
+    }
+
+def _upload(session, base_url, fixtures):
+    # Unique content so every request writes to HDFS rather than deduplicating
+    name = f'bench-{uuid.uuid4().hex}.csv'
+    return session.post(f'{base_url}/api/hdfs-files/upload/', files={'file': (name, name.encode() * 64)})
+
+# Each scenario issues one request against the API and returns the response
+SCENARIOS = {
+    'hdfs_list_directory': lambda session, base_url, fixtures: session.get(
+        f'{base_url}/api/hdfs-files/list_directory/', params={'path': fixtures['directory']}
+    ),
+    'hdfs_upload': _upload,
+    'hdfs_download': lambda session, base_url, fixtures: session.get(
+        f"{base_url}/api/hdfs-files/{fixtures['file']}/download/"
+    ),
+    'hdfs_files_list': lambda session, base_url, fixtures: session.get(f'{base_url}/api/hdfs-files/'),
+    'hive_execute': lambda session, base_url, fixtures: session.post(
+        f'{base_url}/api/hive-queries/execute/', json={'query': 'SELECT * FROM sample LIMIT 10'}
+    ),
+    'hive_queries_list': lambda session, base_url, fixtures: session.get(f'{base_url}/api/hive-queries/'),
+    'jobs_list': lambda session, base_url, fixtures: session.get(f'{base_url}/api/hadoop-jobs/'),
+    'job_status': lambda session, base_url, fixtures: session.get(
+        f"{base_url}/api/hadoop-jobs/{fixtures['job']}/status/"
+    ),
+    'monitoring_metrics': lambda session, base_url, fixtures: session.get(f'{base_url}/api/monitoring/metrics/'),
+    'cluster_health': lambda session, base_url, fixtures: session.get(f'{base_url}/api/monitoring/cluster_health/'),
+    'async_metrics': lambda session, base_url, fixtures: session.get(f'{base_url}/api/async/monitoring/metrics/'),
+}
+
+def create_fixtures(user, count=200):
+    """Rows and files the scenarios read, owned by user"""
+    from .clients import get_hdfs_client
+    directory = f'/user/{user.username}'
+    path = f'{directory}/bench-fixture.csv'
+    data = b'id,value\n' + b'1,2\n' * 1024
+    get_hdfs_client().write(path, data=data, overwrite=True)
+    hdfs_file = HDFSFile.objects.create(name='bench-fixture.csv', path=path, size=len(data), original_size=len(data), owner=user)
+    HDFSFile.objects.bulk_create(
+        HDFSFile(name=f'file-{i}.csv', path=f'{directory}/file-{i}.csv', size=i, original_size=i, owner=user)
+        for i in range(count)
+    )
+    HiveQuery.objects.bulk_create(
+        HiveQuery(query=f'SELECT {i}', result='[]', status='COMPLETED', owner=user) for i in range(count)
+    )
+    HadoopJob.objects.bulk_create(
+        HadoopJob(name=f'job-{i}', job_type='MAPREDUCE', configuration={}, status='COMPLETED', owner=user)
+        for i in range(count)
+    )
+    job = HadoopJob.objects.create(name='bench-running', job_type='MAPREDUCE', configuration={}, status='RUNNING', owner=user)
+    return {'directory': directory, 'file': hdfs_file.pk, 'job': job.pk}
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class APIBenchmark:
+    """Drive the API over HTTP at a fixed concurrency and measure each scenario.
+
+    The API runs in-process on a threaded WSGI server so memory can be
+    traced with tracemalloc; the traced peak therefore includes the load
+    generating clients, which stay the same between builds.
+    """
+
+    def __init__(self, user, concurrency=8, requests_per_scenario=200, warmup=10, trace_memory=True):
+        self.token = Token.objects.get_or_create(user=user)[0].key
+        self.user = user
+        self.concurrency = concurrency
+        self.requests_per_scenario = requests_per_scenario
+        self.warmup = warmup
+        self.trace_memory = trace_memory
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers['Authorization'] = f'Token {self.token}'
+        return session
+
+    def _call(self, scenario, base_url, fixtures):
+        started = time.perf_counter()
+        try:
+            response = scenario(self._session(), base_url, fixtures)
+            # Read the whole body so streamed downloads are timed to the last byte
+            response.content
+        except requests.RequestException as e:
+            return None, type(e).__name__
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            return None, f'HTTP {response.status_code}'
+        return elapsed, None
+
+    def run_scenario(self, name, base_url, fixtures):
+        scenario = SCENARIOS[name]
+        for _ in range(self.warmup):
+            self._call(scenario, base_url, fixtures)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(
+                lambda _: self._call(scenario, base_url, fixtures), range(self.requests_per_scenario)
+            ))
+        duration = time.perf_counter() - started
+
+        summary = summarize([latency for latency, _ in results if latency is not None], [error for _, error in results if error], duration)
+        summary['duration_s'] = round(duration, 3)
+        if self.trace_memory:
+            summary['memory_peak_kb'] = round((tracemalloc.get_traced_memory()[1] - baseline) / 1024, 1)
+        summary['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return summary
+
+    def run(self, names, fixtures):
+        """Serve the API and run the named scenarios one after another"""
+        server = make_server('127.0.0.1', 0, get_wsgi_application(), server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        if self.trace_memory:
+            tracemalloc.start()
+        try:
+            return {name: self.run_scenario(name, base_url, fixtures) for name in names}
+        finally:
+            if self.trace_memory:
+                tracemalloc.stop()
+            server.shutdown()
+            server.server_close()
+
+def compare(baseline, current, threshold):
+    """List regressions of current over baseline beyond threshold (a fraction, 0.2 = 20%)"""
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        if before.get('p95_ms') and result.get('p95_ms') and result['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']} ms -> {result['p95_ms']} ms")
+        if before.get('per_second') and result.get('per_second') is not None and result['per_second'] < before['per_second'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {before['per_second']}/s -> {result['per_second']}/s")
+        if result['errors'] > before.get('errors', 0):
+            regressions.append(f"{name}: errors {before.get('errors', 0)} -> {result['errors']}")
+    return regressions
@@ -0,0 +1,72 @@
+import asyncio
+import weakref
+import httpx
+from pyhive import hive
+import hdfs
+from .config import HADOOP_CONFIG
+from .instrumentation import span
+
+class TracedInsecureClient(hdfs.InsecureClient):
+    """HDFS client that counts every WebHDFS call against the current request"""
+
+    def _request(self, method, url, **kwargs):
+        with span('hdfs'):
+            return super()._request(method, url, **kwargs)
+
+class TracedThriftClient:
+    """Proxy for a HiveServer2 thrift client that times every RPC"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        def traced(*args, **kwargs):
+            with span('hive'):
+                return attribute(*args, **kwargs)
+        return traced
+
+def get_hdfs_client():
+    """Get configured HDFS client"""
+    config = HADOOP_CONFIG['HDFS']
+    return TracedInsecureClient(
+        f'http://{config["host"]}:{config["port"]}',
+        user=config["user"],
+        timeout=config["timeout"]
+    )
+
+def get_hive_connection(database='default'):
+    """Get configured Hive connection"""
+    config = HADOOP_CONFIG['HIVE']
+    with span('hive'):
+        connection = hive.Connection(
+            host=config["host"],
+            port=config["port"],
+            username=config["user"],
+            database=database,
+            auth=config["auth"]
+        )
+    connection._client = TracedThriftClient(connection._client)
+    return connection
+
+# Connections belong to the event loop that opened them, so keep one client per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_http_client():
+    """Get the shared async HTTP client of the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        config = HADOOP_CONFIG['ASYNC']
+        client = httpx.AsyncClient(
+            timeout=config['timeout'],
+            limits=httpx.Limits(
+                max_connections=config['max_connections'],
+                max_keepalive_connections=config['max_keepalive_connections']
+            )
+        )
+        _async_clients[loop] = client
+    return client
@@ -0,0 +1,113 @@
+import time
+import uuid
+from django.core.cache import cache
+from .alerts import alert_engine, flatten_metrics
+from .config import HADOOP_CONFIG
+from .health_snapshots import health_snapshots
+from .models import HadoopMetric
+from .monitoring import hadoop_monitor
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = 'hadoop_collection:lock'
+STATE_KEY = 'hadoop_collection:state'
+
+# Deletes the lock only while it still holds our token, in one step on the Redis server
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class CollectionPipeline:
+    """Collect cluster health and metrics in one pass over the JMX endpoints.
+
+    Beat triggers run() every tick; a cycle only happens once the current
+    interval has passed, and a lock in the shared cache keeps cycles from
+    overlapping across workers. The interval doubles, up to max_interval,
+    while any endpoint is unhealthy or slower than slow_threshold, and
+    halves back to the configured interval once they recover.
+    """
+
+    def __init__(self):
+        self.config = HADOOP_CONFIG['MONITORING']
+
+    def _acquire(self):
+        token = uuid.uuid4().hex
+        if cache.add(LOCK_KEY, token, timeout=self.config['collection']['lock_timeout']):
+            return token
+        return None
+
+    def _release(self, token):
+        """Delete the lock if it is still ours; it may have expired and been taken by another cycle"""
+        backend = getattr(cache, '_cache', None)
+        if hasattr(backend, 'get_client'):
+            key = cache.make_and_validate_key(LOCK_KEY)
+            client = backend.get_client(key, write=True)
+            client.eval(RELEASE_SCRIPT, 1, key, backend._serializer.dumps(token))
+        elif cache.get(LOCK_KEY) == token:
+            # Caches without a Redis client are local to one process (tests and development)
+            cache.delete(LOCK_KEY)
+
+    def next_interval(self, interval, responses):
+        """Interval until the next cycle given how the endpoints just behaved"""
+        base = self.config['metrics_collection']['interval']
+        struggling = any(
+            response['error'] is not None or response['status_code'] != 200
+            or response['latency'] > self.config['collection']['slow_threshold']
+            for response in responses.values()
+        )
+        if struggling:
+            return min(max(interval, base) * 2, self.config['collection']['max_interval'])
+        return max(base, interval / 2)
+
+    def _store_metrics(self, metrics):
+        HadoopMetric.objects.bulk_create(
+            HadoopMetric(metric_type=metric_type.upper(), value=value, cluster_name='default')
+            for metric_type, value in metrics.items()
+        )
+
+    def _store_health(self, health):
+        health_snapshots.store(health)
+
+    def run(self, force=False):
+        """Run a cycle if one is due and none is running; returns the cycle's results or None"""
+        if not force and time.time() < (cache.get(STATE_KEY) or {}).get('next_run', 0):
+            return None
+        token = self._acquire()
+        if token is None:
+            logger.info("Skipping collection cycle: another one is running")
+            return None
+
+        try:
+            # Another worker may have finished a cycle between the check above and taking the lock
+            state = cache.get(STATE_KEY) or {}
+            now = time.time()
+            if not force and now < state.get('next_run', 0):
+                return None
+            responses = hadoop_monitor.fetch_endpoints()
+            health = hadoop_monitor.health_from(responses)
+            metrics = hadoop_monitor.metrics_from(responses)
+
+            self._store_metrics(metrics)
+            alerts = alert_engine.observe(flatten_metrics(metrics)) if metrics else []
+
+            statuses = {service: entry['status'] for service, entry in health.items()}
+            health_due = now - state.get('health_stored_at', 0) >= self.config['cluster_health_check']['interval']
+            if health_due or statuses != state.get('statuses'):
+                self._store_health(health)
+                state['health_stored_at'] = now
+
+            interval = self.next_interval(state.get('interval', 0), responses)
+            if interval != state.get('interval'):
+                logger.info(f"Collection interval is now {interval:.0f}s")
+            state.update(interval=interval, next_run=now + interval, statuses=statuses)
+            cache.set(STATE_KEY, state, timeout=None)
+            return {'health': health, 'metrics': metrics, 'alerts': alerts, 'interval': interval}
+        finally:
+            self._release(token)
+
+# Singleton instance of the collection pipeline
+collection_pipeline = CollectionPipeline()
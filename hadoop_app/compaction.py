@@ -0,0 +1,154 @@
+import posixpath
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from .config import HADOOP_CONFIG
+from .clients import get_hdfs_client
+from .compression import is_compressed_path
+from .models import HDFSContent, HDFSFile
+from .deduplication import shared_paths
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HDFSCompactor:
+    """Merge small files under an HDFS directory into larger target-sized files.
+
+    Outputs are written into a hidden staging directory (ignored by Hive and
+    MapReduce input formats), then swapped with the originals using renames
+    only, so readers never see a half-written or duplicated directory.
+    """
+
+    def __init__(self):
+        self.config = HADOOP_CONFIG['HDFS']['compaction']
+
+    def _small_files(self, client, path):
+        """List the regular files in a directory and pick the ones worth merging"""
+        files = [
+            (name, status) for name, status in client.list(path, status=True)
+            if status['type'] == 'FILE' and not name.startswith(('.', '_'))
+        ]
+        # Compressed files cannot be merged by plain concatenation
+        small = sorted(
+            (posixpath.join(path, name), status['length']) for name, status in files
+            if status['length'] < self.config['small_file_threshold'] and not is_compressed_path(name)
+        )
+        return len(files), small
+
+    def _plan(self, files, target_size):
+        """Group files into bins that each stay under the target size"""
+        bins = []
+        current, current_size = [], 0
+        for path, length in files:
+            if current and current_size + length > target_size:
+                bins.append(current)
+                current, current_size = [], 0
+            current.append(path)
+            current_size += length
+        if current:
+            bins.append(current)
+        return [group for group in bins if len(group) >= self.config['min_files']]
+
+    def _concatenate(self, client, paths, skip_header):
+        """Stream the contents of several files as one, one chunk at a time"""
+        for index, path in enumerate(paths):
+            drop_header = skip_header and index > 0
+            last = b''
+            with client.read(path, chunk_size=self.config['chunk_size']) as reader:
+                for chunk in reader:
+                    if drop_header:
+                        newline = chunk.find(b'\n')
+                        if newline == -1:
+                            continue
+                        chunk = chunk[newline + 1:]
+                        drop_header = False
+                    if chunk:
+                        last = chunk
+                        yield chunk
+            if last and not last.endswith(b'\n'):
+                yield b'\n'
+
+    def compact(self, compaction):
+        """Run a compaction and record before/after file counts on it"""
+        client = get_hdfs_client()
+        path = posixpath.normpath(compaction.path)
+        staging = posixpath.join(path, f'_compaction-{compaction.pk}')
+        originals = posixpath.join(staging, 'originals')
+
+        files_before, small = self._small_files(client, path)
+        # Deduplicated content referenced by several files must stay where it is
+        shared = shared_paths([source for source, _ in small])
+        small = [(source, length) for source, length in small if source not in shared]
+        # Merged files keep their sources' owner, so each one only merges files of a single user
+        owners = dict(HDFSFile.objects.filter(path__in=[source for source, _ in small]).values_list('path', 'owner_id'))
+        by_owner = defaultdict(list)
+        for source, length in small:
+            by_owner[owners.get(source, compaction.owner_id)].append((source, length))
+        bins = [
+            (owner_id, group) for owner_id, files in sorted(by_owner.items())
+            for group in self._plan(files, compaction.target_size)
+        ]
+        sizes = dict(small)
+
+        compaction.status = 'RUNNING'
+        compaction.files_before = files_before
+        compaction.save(update_fields=['status', 'files_before'])
+
+        sources = [source for _, group in bins for source in group]
+        if not sources:
+            compaction.status = 'COMPLETED'
+            compaction.files_after = files_before
+            compaction.finished_at = timezone.now()
+            compaction.save()
+            return compaction
+
+        client.makedirs(originals)
+        moved = []
+        outputs = []
+        try:
+            # Write merged files into the staging directory
+            for index, (owner_id, group) in enumerate(bins):
+                part = posixpath.join(staging, f'compacted-{compaction.pk}-{index:05d}')
+                client.write(part, data=self._concatenate(client, group, compaction.skip_header))
+                outputs.append((part, posixpath.join(path, posixpath.basename(part)), owner_id))
+
+            # Swap originals and merged files using renames only
+            for source in sources:
+                client.rename(source, posixpath.join(originals, posixpath.basename(source)))
+                moved.append(source)
+            for part, final, _ in outputs:
+                client.rename(part, final)
+
+            with transaction.atomic():
+                HDFSFile.objects.filter(path__in=sources).delete()
+                HDFSContent.objects.filter(path__in=sources).delete()
+                for _, final, owner_id in outputs:
+                    HDFSFile.objects.create(
+                        name=posixpath.basename(final),
+                        path=final,
+                        size=client.status(final)['length'],
+                        owner_id=owner_id
+                    )
+        except Exception:
+            for _, final, _ in outputs:
+                client.delete(final)
+            for source in moved:
+                client.rename(posixpath.join(originals, posixpath.basename(source)), source)
+            client.delete(staging, recursive=True)
+            raise
+
+        client.delete(staging, recursive=True)
+
+        compaction.status = 'COMPLETED'
+        compaction.files_merged = len(sources)
+        compaction.bytes_merged = sum(sizes[source] for source in sources)
+        compaction.files_after = files_before - len(sources) + len(outputs)
+        compaction.finished_at = timezone.now()
+        compaction.save()
+        logger.info(
+            f"Compacted {compaction.path}: {compaction.files_before} -> {compaction.files_after} files"
+        )
+        return compaction
+
+# Singleton instance of the compactor
+hdfs_compactor = HDFSCompactor()
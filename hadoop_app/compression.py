@@ -0,0 +1,177 @@
+import bz2
+import zlib
+from .config import HADOOP_CONFIG
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import snappy
+except ImportError:
+    snappy = None
+
+# File extension appended to HDFS paths for each codec
+CODEC_EXTENSIONS = {
+    'gzip': '.gz',
+    'bzip2': '.bz2',
+    'zstd': '.zst',
+    'snappy': '.snappy',
+}
+
+# Uncompressed bytes per Snappy block; Hadoop's SnappyCodec decompresses each block into a
+# buffer of io.compression.codec.snappy.buffersize, 256 KiB by default
+SNAPPY_BLOCK_SIZE = 262144
+
+def available_codecs():
+    """Get the codecs usable in this environment"""
+    codecs = ['gzip', 'bzip2']
+    if zstandard is not None:
+        codecs.append('zstd')
+    if snappy is not None:
+        codecs.append('snappy')
+    return codecs
+
+def is_compressed_path(path):
+    """Check whether an HDFS path carries a compression codec extension"""
+    return path.endswith(tuple(CODEC_EXTENSIONS.values()))
+
+class _GzipDecompressor:
+    """Streaming gzip decompressor that also handles concatenated members"""
+
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(wbits=47)
+
+    def decompress(self, data):
+        output = []
+        while data:
+            output.append(self._decompressor.decompress(data))
+            data = self._decompressor.unused_data
+            if data:
+                self._decompressor = zlib.decompressobj(wbits=47)
+        return b''.join(output)
+
+    def flush(self):
+        return self._decompressor.flush()
+
+class _HadoopSnappyCompressor:
+    """Streaming Snappy compressor writing Hadoop's block format, which SnappyCodec reads.
+
+    Each block is its uncompressed length followed by the length and bytes
+    of its compressed data, all lengths big-endian 32-bit integers. (The
+    Snappy framing format of snappy.StreamCompressor is not readable by
+    Hive or MapReduce.)
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def _block(self, data):
+        compressed = snappy.compress(data)
+        return len(data).to_bytes(4, 'big') + len(compressed).to_bytes(4, 'big') + compressed
+
+    def compress(self, data):
+        self._buffer += data
+        blocks = []
+        while len(self._buffer) >= SNAPPY_BLOCK_SIZE:
+            blocks.append(self._block(bytes(self._buffer[:SNAPPY_BLOCK_SIZE])))
+            del self._buffer[:SNAPPY_BLOCK_SIZE]
+        return b''.join(blocks)
+
+    def flush(self):
+        block = self._block(bytes(self._buffer)) if self._buffer else b''
+        self._buffer = bytearray()
+        return block
+
+class _HadoopSnappyDecompressor:
+    """Streaming decompressor for Snappy in Hadoop's block format, with one or more chunks per block"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        # Uncompressed bytes of the current block still to come
+        self._remaining = 0
+
+    def decompress(self, data):
+        self._buffer += data
+        output = []
+        while len(self._buffer) >= 4:
+            length = int.from_bytes(self._buffer[:4], 'big')
+            if not self._remaining:
+                self._remaining = length
+                del self._buffer[:4]
+                continue
+            if len(self._buffer) < 4 + length:
+                break
+            chunk = snappy.uncompress(bytes(self._buffer[4:4 + length]))
+            del self._buffer[:4 + length]
+            self._remaining -= len(chunk)
+            output.append(chunk)
+        return b''.join(output)
+
+def get_compressor(codec, level=None):
+    """Get a streaming compressor with compress(chunk) and flush() methods"""
+    if codec not in available_codecs():
+        raise ValueError(f"Unsupported compression codec: {codec}")
+    if level is None:
+        level = HADOOP_CONFIG['HDFS']['compression']['levels'].get(codec)
+    if codec == 'gzip':
+        return zlib.compressobj(level if level is not None else 6, zlib.DEFLATED, 31)
+    if codec == 'bzip2':
+        return bz2.BZ2Compressor(level if level is not None else 9)
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=level if level is not None else 3).compressobj()
+    return _HadoopSnappyCompressor()
+
+def get_decompressor(codec):
+    """Get a streaming decompressor with a decompress(chunk) method"""
+    if codec not in available_codecs():
+        raise ValueError(f"Unsupported compression codec: {codec}")
+    if codec == 'gzip':
+        return _GzipDecompressor()
+    if codec == 'bzip2':
+        return bz2.BZ2Decompressor()
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompressobj()
+    return _HadoopSnappyDecompressor()
+
+class CompressingStream:
+    """Iterate over compressed chunks while counting original and compressed bytes"""
+
+    def __init__(self, chunks, codec=None, level=None):
+        self.chunks = chunks
+        self.codec = codec
+        self.level = level
+        self.original_size = 0
+        self.compressed_size = 0
+
+    def __iter__(self):
+        compressor = get_compressor(self.codec, self.level) if self.codec else None
+        for chunk in self.chunks:
+            self.original_size += len(chunk)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                self.compressed_size += len(chunk)
+                yield chunk
+        if compressor is not None:
+            tail = compressor.flush()
+            if tail:
+                self.compressed_size += len(tail)
+                yield tail
+
+def decompress_chunks(chunks, codec):
+    """Decompress a stream of chunks produced by the given codec"""
+    if not codec:
+        yield from chunks
+        return
+    decompressor = get_decompressor(codec)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    # bz2 decompressors have nothing to flush and no flush method
+    flush = getattr(decompressor, 'flush', None)
+    tail = flush() if flush is not None else None
+    if tail:
+        yield tail
@@ -9,6 +9,33 @@ HADOOP_CONFIG = {
             'health_check_interval': 300,  # seconds
             'max_retries': 3,
             'retry_delay': 5  # seconds
+        },
+        'disk_usage': {
+            'cache_ttl': 900,  # seconds
+            'max_workers': 16,
+            'max_depth': 3,
+            'precompute_paths': ['/user'],
+            'precompute_depth': 2,
+            'precompute_interval': 600  # seconds
+        },
+        'compaction': {
+            'target_size': 134217728,  # bytes, one HDFS block
+            'small_file_threshold': 16777216,  # bytes, only smaller files are merged
+            'min_files': 2,
+            'chunk_size': 1048576  # bytes
+        },
+        'compression': {
+            'default_codec': None,  # gzip, bzip2, zstd or snappy; None stores files as sent
+            'chunk_size': 1048576,  # bytes
+            'levels': {
+                'gzip': 6,
+                'bzip2': 9,
+                'zstd': 3
+            }
+        },
+        'deduplication': {
+            'enabled': True,
+            'hash_chunk_size': 4194304  # bytes
         }
     },
     'HIVE': {
@@ -25,11 +52,69 @@ HADOOP_CONFIG = {
     'MAPREDUCE': {
         'jobtracker': 'localhost:8088',
         'historyserver': 'localhost:19888',
+        'spark_historyserver': 'localhost:18080',
         'monitoring': {
             'job_status_interval': 60,  # seconds
             'log_fetch_interval': 300  # seconds
+        },
+        'submission': {
+            'timeout': 30,  # seconds
+            'pool_size': 20,  # pooled connections to the ResourceManager
+            'max_retries': 5,
+            'max_app_attempts': 1,
+            'am_memory': 1024,  # MB, launcher container
+            'am_vcores': 1,
+            'log_dir': '<LOG_DIR>'  # expanded by YARN in container commands
+        },
+        'notifications': {
+            'long_poll_timeout': 60,  # seconds, upper bound for ?wait=
+            'stream_timeout': 300,  # seconds before an event stream closes and the client reconnects
+            'check_interval': 1,  # seconds
+            'heartbeat_interval': 15,  # seconds
+            'key_ttl': 600  # seconds job status and event keys are kept after a change; keep above long_poll_timeout
+        },
+        'logs': {
+            'cache_dir': '/tmp/hadoop_app/job_logs',
+            'cache_max_bytes': 1073741824,  # bytes
+            'chunk_size': 65536,  # bytes
+            'timeout': 30,  # seconds
+            'follow_interval': 2,  # seconds
+            'follow_timeout': 600,  # seconds the async endpoint follows a log
+            'sync_follow_timeout': 25  # seconds a synchronous worker follows a log; keep below the worker timeout
         }
     },
+    'ADVISOR': {
+        'enabled': True,
+        'mode': 'suggest',  # 'suggest' only reports, 'apply' fills in omitted resources
+        'min_samples': 3,  # completed runs before a job name gets advice
+        'smoothing': 0.3,  # weight of the newest run in the running averages
+        'memory_headroom': 1.2,
+        'memory_increment': 512,  # MB, YARN minimum allocation
+        'min_memory': 512,  # MB
+        'max_executors': 50
+    },
+    'WORKFLOW': {
+        'max_parallel': 4  # jobs of one workflow running at the same time
+    },
+    'ASYNC': {
+        'timeout': 30,  # seconds per upstream call
+        'max_connections': 1000,
+        'max_keepalive_connections': 100
+    },
+    'AUTH': {
+        'token_cache_size': 10000,  # tokens kept in memory per process
+        'token_cache_ttl': 300,  # seconds before a cached token is re-read from the database
+        'revocation_check_interval': 1,  # seconds between checks for tokens revoked by other processes
+        'token_expiry': None  # seconds a token stays valid after it is issued; None never expires
+    },
+    'INSTRUMENTATION': {
+        'enabled': True,
+        'sample_rate': 0.1,  # fraction of requests traced with DB/HDFS/Hive/JMX spans
+        'server_timing': True,  # add a Server-Timing header to traced responses
+        'buckets_ms': [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000],
+        'flush_interval': 10,  # seconds between publishing a process's histograms to the cache
+        'retention': 3600  # seconds the histograms of an idle process stay visible
+    },
     'MONITORING': {
         'cluster_health_check': {
             'interval': 300,  # seconds
@@ -37,6 +122,22 @@ HADOOP_CONFIG = {
                 'namenode': 'http://localhost:50070/jmx',
                 'resourcemanager': 'http://localhost:8088/jmx',
                 'historyserver': 'http://localhost:19888/jmx'
+            },
+            # 'delta' stores a digest per health row and the full JMX payloads as compressed
+            # deltas against a keyframe; 'full' stores the whole payloads in every row
+            'storage': {
+                'mode': 'delta',
+                'keyframe_interval': 21600,  # seconds between keyframes
+                'max_delta_ratio': 0.5,  # start a keyframe once a delta is this large relative to it
+                'compression_level': 6,
+                # Beans kept whole in the digest, so recent health is readable without rebuilding
+                'key_beans': [
+                    'Hadoop:service=NameNode,name=FSNamesystemState',
+                    'Hadoop:service=ResourceManager,name=ClusterMetrics',
+                    'Hadoop:service=ResourceManager,name=RMNMInfo',
+                    'Hadoop:service=HistoryServer,name=JobHistoryStatistics',
+                    'java.lang:type=Memory'
+                ]
             }
         },
         'metrics_collection': {
@@ -48,8 +149,48 @@ HADOOP_CONFIG = {
                 'mapreduce_jobs',
                 'yarn_containers',
                 'hive_queries'
-            ]
+            ],
+            # Metric rows live in time partitions on PostgreSQL, so retention drops whole partitions
+            'retention_days': 90,
+            'partition_days': 7,
+            'partitions_ahead': 2,
+            'maintenance_interval': 3600  # seconds
+        },
+        # One pipeline collects health and metrics from a single fetch of each endpoint.
+        # Cycles run every metrics_collection interval, backing off to max_interval while
+        # endpoints are slow or unhealthy; health rows are stored every
+        # cluster_health_check interval or whenever a service changes status.
+        'collection': {
+            'tick': 15,  # seconds between beat checks for a due cycle
+            'max_interval': 600,  # seconds
+            'slow_threshold': 5,  # seconds; slower endpoints count as struggling
+            'request_timeout': 10,  # seconds per endpoint
+            'lock_timeout': 120  # seconds before a crashed cycle's lock expires
         }
+    },
+    'ALERTS': {
+        'enabled': True,
+        # Expressions: [avg|min|max|increase(]metric[, window)] <op> threshold [for duration],
+        # with metrics named '<collected metric>.<field>'. clear sets the hysteresis threshold.
+        'rules': [
+            {
+                'name': 'hdfs_nearly_full',
+                'expression': 'hdfs_used.used_percent > 85 for 10m',
+                'clear': 80,
+                'severity': 'critical'
+            },
+            {
+                'name': 'failed_jobs_spike',
+                'expression': 'increase(mapreduce_jobs.failed_jobs, 10m) > 5',
+                'clear': 1,
+                'severity': 'warning'
+            }
+        ],
+        'repeat_interval': 3600,  # seconds between reminders while an alert keeps firing
+        'notifiers': [
+            {'class': 'hadoop_app.alerts.LogNotifier'}
+            # {'class': 'hadoop_app.alerts.WebhookNotifier', 'url': 'https://hooks.example.com/hadoop'}
+        ]
     }
 }
 
@@ -0,0 +1,89 @@
+import hashlib
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from .models import HDFSContent, HDFSFile
+import logging
+
+logger = logging.getLogger(__name__)
+
+def content_digest(chunks):
+    """Compute the SHA-256 digest of a stream of chunks"""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def find_content(client, digest, codec, owner):
+    """Find content with the same digest and codec already stored by the owner"""
+    content = HDFSContent.objects.filter(owner=owner, digest=digest, codec=codec).first()
+    if content is None:
+        return None
+    if client.status(content.path, strict=False) is None:
+        # The bytes were removed behind our back, forget about them
+        logger.warning(f"Content {digest} is indexed at {content.path} but no longer exists")
+        content.delete()
+        return None
+    return content
+
+def register_content(client, digest, codec, path, size, original_size, owner):
+    """Index freshly written content by its digest.
+
+    When a concurrent upload of the same content by the same owner won the
+    race, its content is returned and the copy just written to path is
+    removed, unless another file record uses that path.
+    """
+    try:
+        with transaction.atomic():
+            return HDFSContent.objects.create(
+                digest=digest,
+                codec=codec,
+                path=path,
+                size=size,
+                original_size=original_size,
+                owner=owner
+            )
+    except IntegrityError:
+        content = HDFSContent.objects.get(owner=owner, digest=digest, codec=codec)
+        if content.path != path and not HDFSFile.objects.filter(path=path).exists():
+            client.delete(path)
+        return content
+
+def release_file(client, hdfs_file):
+    """Delete a file record, removing the HDFS bytes once nothing references them"""
+    with transaction.atomic():
+        content = hdfs_file.content
+        hdfs_file.delete()
+        if content is not None and content.files.exists():
+            return False
+        if content is not None:
+            content.delete()
+        if HDFSFile.objects.filter(path=hdfs_file.path).exists():
+            return False
+    client.delete(hdfs_file.path, recursive=True)
+    return True
+
+def shared_paths(paths):
+    """Get the paths whose content is referenced by more than one file"""
+    return set(
+        HDFSContent.objects.filter(path__in=paths)
+        .annotate(references=Count('files'))
+        .filter(references__gt=1)
+        .values_list('path', flat=True)
+    )
+
+def dedup_stats(files):
+    """Report how much storage deduplication saves for a set of files"""
+    logical_bytes = files.aggregate(total=Sum('size'))['total'] or 0
+    unique_bytes = files.filter(content__isnull=True).aggregate(total=Sum('size'))['total'] or 0
+    unique_bytes += (
+        HDFSContent.objects.filter(files__in=files).distinct()
+        .aggregate(total=Sum('size'))['total'] or 0
+    )
+    return {
+        'files': files.count(),
+        'unique_contents': HDFSContent.objects.filter(files__in=files).distinct().count(),
+        'logical_bytes': logical_bytes,
+        'stored_bytes': unique_bytes,
+        'bytes_saved': logical_bytes - unique_bytes,
+        'dedup_ratio': round(logical_bytes / unique_bytes, 2) if unique_bytes else 1.0
+    }
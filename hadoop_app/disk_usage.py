@@ -0,0 +1,145 @@
+import hashlib
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from django.core.cache import cache
+from .config import HADOOP_CONFIG
+from .clients import get_hdfs_client
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HDFSDiskUsage:
+    """Disk usage tree for HDFS directories built on WebHDFS GETCONTENTSUMMARY.
+
+    Summaries and directory listings are cached per directory, so repeated
+    views of the same tree never make the NameNode walk it again until the
+    cache entry expires.
+    """
+
+    def __init__(self):
+        self.config = HADOOP_CONFIG['HDFS']['disk_usage']
+
+    def _cache_key(self, kind, path):
+        digest = hashlib.md5(path.encode('utf-8')).hexdigest()
+        return f'hdfs_du:{kind}:{digest}'
+
+    def _format_summary(self, path, content):
+        """Turn a GETCONTENTSUMMARY response into a du node"""
+        quota = content.get('quota', -1)
+        space_quota = content.get('spaceQuota', -1)
+        names = content['fileCount'] + content['directoryCount']
+        return {
+            'path': path,
+            'length': content['length'],
+            'space_consumed': content['spaceConsumed'],
+            'file_count': content['fileCount'],
+            'directory_count': content['directoryCount'],
+            'quota': quota,
+            'quota_used_percent': round(names * 100.0 / quota, 2) if quota > 0 else None,
+            'space_quota': space_quota,
+            'space_quota_used_percent': (
+                round(content['spaceConsumed'] * 100.0 / space_quota, 2) if space_quota > 0 else None
+            ),
+            'computed_at': datetime.now().isoformat()
+        }
+
+    def _fetch(self, client, path, with_children):
+        """Fetch the summary (and optionally the subdirectories) of a directory"""
+        summary = self._format_summary(path, client.content(path))
+        children = None
+        if with_children:
+            children = sorted(
+                posixpath.join(path, name)
+                for name, status in client.list(path, status=True)
+                if status['type'] == 'DIRECTORY'
+            )
+        return path, summary, children
+
+    def _load_level(self, client, paths, with_children, refresh):
+        """Load summaries (and listings) for one tree level, fanning out cache misses"""
+        summary_keys = {path: self._cache_key('summary', path) for path in paths}
+        children_keys = {path: self._cache_key('children', path) for path in paths}
+
+        cached = {}
+        if not refresh:
+            keys = list(summary_keys.values())
+            if with_children:
+                keys += list(children_keys.values())
+            cached = cache.get_many(keys)
+
+        summaries = {}
+        children = {}
+        misses = []
+        for path in paths:
+            summary = cached.get(summary_keys[path])
+            listing = cached.get(children_keys[path]) if with_children else []
+            if summary is None or listing is None:
+                misses.append(path)
+            else:
+                summaries[path] = summary
+                children[path] = listing
+
+        if misses:
+            workers = min(self.config['max_workers'], len(misses))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(lambda p: self._fetch(client, p, with_children), misses))
+
+            fresh = {}
+            for path, summary, listing in results:
+                summaries[path] = summary
+                fresh[summary_keys[path]] = summary
+                if with_children:
+                    children[path] = listing
+                    fresh[children_keys[path]] = listing
+            cache.set_many(fresh, timeout=self.config['cache_ttl'])
+
+        return summaries, children
+
+    def tree(self, path, depth=1, refresh=False):
+        """Get the disk usage tree of a directory down to the given depth"""
+        depth = max(0, min(depth, self.config['max_depth']))
+        path = posixpath.normpath(path)
+        client = get_hdfs_client()
+
+        root = None
+        nodes = {}
+        level = [path]
+        for current_depth in range(depth + 1):
+            if not level:
+                break
+            with_children = current_depth < depth
+            summaries, children = self._load_level(client, level, with_children, refresh)
+
+            next_level = []
+            for directory in level:
+                node = dict(summaries[directory])
+                nodes[directory] = node
+                if root is None:
+                    root = node
+                else:
+                    nodes[posixpath.dirname(directory)]['children'].append(node)
+                if with_children:
+                    node['children'] = []
+                    next_level.extend(children[directory])
+            level = next_level
+
+        for node in nodes.values():
+            if 'children' in node:
+                node['children'].sort(key=lambda child: child['space_consumed'], reverse=True)
+
+        return root
+
+    def precompute(self):
+        """Refresh cached disk usage for the configured top-level directories"""
+        refreshed = 0
+        for path in self.config['precompute_paths']:
+            try:
+                self.tree(path, depth=self.config['precompute_depth'], refresh=True)
+                refreshed += 1
+            except Exception as e:
+                logger.error(f"Failed to precompute disk usage for {path}: {e}")
+        return refreshed
+
+# Singleton instance of the disk usage calculator
+hdfs_disk_usage = HDFSDiskUsage()
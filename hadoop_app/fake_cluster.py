@@ -0,0 +1,609 @@
+import json
+import posixpath
+import re
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from thrift.protocol import TBinaryProtocol
+from thrift.transport import TSocket, TTransport
+from TCLIService import TCLIService, ttypes
+from .config import HADOOP_CONFIG
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Local stand-ins for the Hadoop services this app talks to, for tests and
+# benchmarks. Each speaks just enough of the real wire protocol for the
+# unmodified clients (hdfs, requests/httpx, pyhive) to work against it:
+#   FakeNameNode        WebHDFS REST and /jmx
+#   FakeResourceManager cluster REST, NodeManager log REST and /jmx
+#   FakeHistoryServer   MapReduce history REST and /jmx
+#   FakeHiveServer      HiveServer2 thrift (NOSASL transport)
+
+def _now_millis():
+    return int(time.time() * 1000)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    # Skip trailers up to the blank line ending the body
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        with self.server.service.lock:
+            self.server.service.hits[url.path] += 1
+        try:
+            status, payload, headers = self.server.service.dispatch(
+                self.command, unquote(url.path), query, self._read_body()
+            )
+        except Exception as e:
+            logger.exception(f"Fake {type(self.server.service).__name__} failed")
+            status, payload, headers = 500, {'error': str(e)}, {}
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream' if isinstance(payload, bytes) else 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_PUT = do_POST = do_DELETE = _dispatch
+
+class _HTTPService:
+    """Base of the fake HTTP services: a threaded server on an ephemeral port"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.lock = threading.Lock()
+        # Requests served per path
+        self.hits = Counter()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.service = self
+        self.thread = None
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f'{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def jmx(self):
+        return []
+
+    def dispatch(self, method, path, query, body):
+        if path == '/jmx':
+            return 200, {'beans': self.jmx()}, {}
+        return 404, {'error': f'Unknown path {path}'}, {}
+
+class FakeNameNode(_HTTPService):
+    """In-memory WebHDFS file system"""
+
+    PREFIX = '/webhdfs/v1'
+    CAPACITY = 1 << 40
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.files = {}
+        self.dirs = {'/': _now_millis()}
+
+    def _error(self, status, exception, message):
+        return status, {'RemoteException': {'exception': exception, 'javaClassName': exception, 'message': message}}, {}
+
+    def _status(self, path, suffix=''):
+        if path in self.files:
+            data, modified = self.files[path]
+            kind, length = 'FILE', len(data)
+        else:
+            kind, length, modified = 'DIRECTORY', 0, self.dirs[path]
+        return {
+            'accessTime': modified, 'blockSize': 134217728, 'group': 'supergroup', 'length': length,
+            'modificationTime': modified, 'owner': 'hdfs', 'pathSuffix': suffix,
+            'permission': '644' if kind == 'FILE' else '755', 'replication': 1 if kind == 'FILE' else 0,
+            'type': kind
+        }
+
+    def _children(self, path):
+        prefix = path.rstrip('/') + '/'
+        return sorted(
+            entry[len(prefix):] for entry in list(self.files) + list(self.dirs)
+            if entry.startswith(prefix) and '/' not in entry[len(prefix):] and entry != path
+        )
+
+    def _makedirs(self, path):
+        while path not in self.dirs:
+            self.dirs[path] = _now_millis()
+            path = posixpath.dirname(path)
+
+    def _exists(self, path):
+        return path in self.files or path in self.dirs
+
+    def used(self):
+        with self.lock:
+            return sum(len(data) for data, _ in self.files.values())
+
+    def jmx(self):
+        used = self.used()
+        return [{
+            'name': 'Hadoop:service=NameNode,name=FSNamesystemState',
+            'CapacityTotal': self.CAPACITY,
+            'CapacityUsed': used,
+            'CapacityRemaining': self.CAPACITY - used,
+            'PercentUsed': used * 100 / self.CAPACITY,
+            'NumLiveDataNodes': 1,
+            'NumDeadDataNodes': 0
+        }]
+
+    def dispatch(self, method, path, query, body):
+        if not path.startswith(self.PREFIX):
+            return super().dispatch(method, path, query, body)
+        path = posixpath.normpath(path[len(self.PREFIX):] or '/')
+        op = query.get('op', '').upper()
+        handler = getattr(self, f'_op_{op.lower()}', None)
+        if handler is None:
+            return 400, {'RemoteException': {'exception': 'IllegalArgumentException', 'message': f'Invalid op {op}'}}, {}
+        with self.lock:
+            return handler(method, path, query, body)
+
+    def _op_getfilestatus(self, method, path, query, body):
+        if not self._exists(path):
+            return self._error(404, 'FileNotFoundException', f'File does not exist: {path}')
+        return 200, {'FileStatus': self._status(path)}, {}
+
+    def _op_liststatus(self, method, path, query, body):
+        if not self._exists(path):
+            return self._error(404, 'FileNotFoundException', f'File {path} does not exist.')
+        if path in self.files:
+            statuses = [self._status(path)]
+        else:
+            statuses = [self._status(posixpath.join(path, name), name) for name in self._children(path)]
+        return 200, {'FileStatuses': {'FileStatus': statuses}}, {}
+
+    def _op_getcontentsummary(self, method, path, query, body):
+        if not self._exists(path):
+            return self._error(404, 'FileNotFoundException', f'File does not exist: {path}')
+        prefix = path.rstrip('/') + '/'
+        files = [data for name, (data, _) in self.files.items() if name == path or name.startswith(prefix)]
+        directories = [name for name in self.dirs if name == path or name.startswith(prefix)]
+        length = sum(len(data) for data in files)
+        return 200, {'ContentSummary': {
+            'directoryCount': len(directories), 'fileCount': len(files), 'length': length,
+            'quota': -1, 'spaceConsumed': length, 'spaceQuota': -1
+        }}, {}
+
+    def _op_gethomedirectory(self, method, path, query, body):
+        return 200, {'Path': f"/user/{query.get('user.name', 'hdfs')}"}, {}
+
+    def _op_mkdirs(self, method, path, query, body):
+        if path in self.files:
+            return self._error(403, 'FileAlreadyExistsException', f'Path is not a directory: {path}')
+        self._makedirs(path)
+        return 200, {'boolean': True}, {}
+
+    def _op_create(self, method, path, query, body):
+        if query.get('data') != 'true':
+            # Like the NameNode, send the client on to a "DataNode" for the bytes
+            return 307, b'', {'Location': f'http://{self.address}{self.PREFIX}{path}?op=CREATE&data=true&overwrite={query.get("overwrite", "false")}'}
+        if self._exists(path) and query.get('overwrite', 'false').lower() != 'true':
+            return self._error(403, 'FileAlreadyExistsException', f'{path} already exists')
+        self._makedirs(posixpath.dirname(path))
+        self.files[path] = (body, _now_millis())
+        return 201, b'', {}
+
+    def _op_append(self, method, path, query, body):
+        if query.get('data') != 'true':
+            return 307, b'', {'Location': f'http://{self.address}{self.PREFIX}{path}?op=APPEND&data=true'}
+        if path not in self.files:
+            return self._error(404, 'FileNotFoundException', f'File does not exist: {path}')
+        self.files[path] = (self.files[path][0] + body, _now_millis())
+        return 200, b'', {}
+
+    def _op_open(self, method, path, query, body):
+        if path not in self.files:
+            return self._error(404, 'FileNotFoundException', f'File does not exist: {path}')
+        data = self.files[path][0]
+        offset = int(query.get('offset', 0))
+        length = query.get('length')
+        return 200, data[offset:offset + int(length) if length is not None else None], {}
+
+    def _op_rename(self, method, path, query, body):
+        destination = posixpath.normpath(query['destination'])
+        if not self._exists(path) or self._exists(destination) or posixpath.dirname(destination) not in self.dirs:
+            return 200, {'boolean': False}, {}
+        prefix = path.rstrip('/') + '/'
+        for table in (self.files, self.dirs):
+            for name in [name for name in table if name == path or name.startswith(prefix)]:
+                table[destination + name[len(path):]] = table.pop(name)
+        return 200, {'boolean': True}, {}
+
+    def _op_delete(self, method, path, query, body):
+        if not self._exists(path) or path == '/':
+            return 200, {'boolean': False}, {}
+        prefix = path.rstrip('/') + '/'
+        if path in self.dirs and self._children(path) and query.get('recursive', 'false').lower() != 'true':
+            return self._error(403, 'PathIsNotEmptyDirectoryException', f'{path} is non empty')
+        for table in (self.files, self.dirs):
+            for name in [name for name in table if name == path or name.startswith(prefix)]:
+                del table[name]
+        return 200, {'boolean': True}, {}
+
+class FakeResourceManager(_HTTPService):
+    """YARN ResourceManager REST API whose applications succeed after app_runtime seconds.
+
+    It also answers the NodeManager log endpoints, as every application
+    master "runs" on this node.
+    """
+
+    def __init__(self, *args, app_runtime=0.5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.app_runtime = app_runtime
+        self.cluster_timestamp = _now_millis()
+        self.apps = {}
+        self.counter = 0
+        self.submissions = 0
+
+    def _report(self, app):
+        report = dict(app)
+        elapsed = (_now_millis() - app['startedTime']) / 1000
+        if app['state'] == 'KILLED':
+            report['finalStatus'] = 'KILLED'
+        elif elapsed < self.app_runtime:
+            report['state'], report['finalStatus'] = 'RUNNING', 'UNDEFINED'
+        else:
+            report['state'], report['finalStatus'] = 'FINISHED', 'SUCCEEDED'
+            report['finishedTime'] = app['startedTime'] + int(self.app_runtime * 1000)
+        if report['state'] != 'RUNNING':
+            runtime = (report['finishedTime'] - app['startedTime']) / 1000
+            report['memorySeconds'] = int(app['memory'] * runtime)
+            report['vcoreSeconds'] = int(app['vcores'] * runtime)
+        return report
+
+    def jmx(self):
+        with self.lock:
+            reports = [self._report(app) for app in self.apps.values()]
+        running = sum(1 for report in reports if report['state'] == 'RUNNING')
+        return [{
+            'name': 'Hadoop:service=ResourceManager,name=RMNMInfo',
+            'TotalContainers': len(reports),
+            'ActiveContainers': running
+        }]
+
+    def reports(self):
+        with self.lock:
+            return [self._report(app) for app in self.apps.values()]
+
+    def dispatch(self, method, path, query, body):
+        with self.lock:
+            if path == '/ws/v1/cluster/apps/new-application' and method == 'POST':
+                self.counter += 1
+                return 200, {
+                    'application-id': f'application_{self.cluster_timestamp}_{self.counter:04d}',
+                    'maximum-resource-capability': {'memory': 8192, 'vCores': 4}
+                }, {}
+            if path == '/ws/v1/cluster/apps' and method == 'POST':
+                context = json.loads(body)
+                if context['application-id'] in self.apps:
+                    # Like YARN, a second submission of a known application is a no-op
+                    return 202, b'', {}
+                self.submissions += 1
+                self.apps[context['application-id']] = {
+                    'id': context['application-id'],
+                    'name': context.get('application-name', ''),
+                    'applicationType': context.get('application-type', 'YARN'),
+                    'applicationTags': ','.join(context.get('application-tags', {}).get('tag', [])),
+                    'queue': context.get('queue', 'default'),
+                    'state': 'ACCEPTED',
+                    'startedTime': _now_millis(),
+                    'finishedTime': 0,
+                    'memory': context.get('resource', {}).get('memory', 1024),
+                    'vcores': context.get('resource', {}).get('vCores', 1),
+                    'diagnostics': ''
+                }
+                return 202, b'', {}
+            if path == '/ws/v1/cluster/apps' and method == 'GET':
+                apps = [self._report(app) for app in self.apps.values()]
+                if 'applicationTags' in query:
+                    tags = set(query['applicationTags'].split(','))
+                    apps = [app for app in apps if tags & set(app['applicationTags'].split(','))]
+                if 'startedTimeBegin' in query:
+                    apps = [app for app in apps if app['startedTime'] >= int(query['startedTimeBegin'])]
+                return 200, {'apps': {'app': apps} if apps else None}, {}
+
+            match = re.match(r'^/ws/v1/cluster/apps/([^/]+)(/appattempts|/state)?$', path)
+            if match:
+                app = self.apps.get(match.group(1))
+                if app is None:
+                    return 404, {'RemoteException': {'exception': 'NotFoundException', 'message': 'app not found'}}, {}
+                if match.group(2) == '/state' and method == 'PUT':
+                    app['state'], app['finishedTime'] = 'KILLED', _now_millis()
+                    return 202, {'state': 'KILLED'}, {}
+                if match.group(2) == '/appattempts':
+                    suffix = app['id'][len('application_'):]
+                    return 200, {'appAttempts': {'appAttempt': [{
+                        'id': 1,
+                        'containerId': f'container_{suffix}_01_000001',
+                        'nodeHttpAddress': self.address,
+                        'startTime': app['startedTime']
+                    }]}}, {}
+                return 200, {'app': self._report(app)}, {}
+
+            match = re.match(r'^/ws/v1/node/containers/([^/]+)/logs(?:/([^/]+))?$', path)
+            if match:
+                log = f"Log of {match.group(1)}\n".encode() * 10
+                if match.group(2) is None:
+                    return 200, {'containerLogsInfo': [{
+                        'logAggregationType': 'LOCAL',
+                        'containerLogInfo': [{'fileName': name, 'fileSize': str(len(log))} for name in ('stdout', 'stderr')]
+                    }]}, {}
+                size = int(query.get('size', len(log)))
+                return 200, log[size:] if size < 0 else log[:size], {}
+
+        return super().dispatch(method, path, query, body)
+
+class FakeHistoryServer(_HTTPService):
+    """MapReduce JobHistory server reporting the ResourceManager's finished applications"""
+
+    def __init__(self, resource_manager, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resource_manager = resource_manager
+
+    def jmx(self):
+        finished = [report for report in self.resource_manager.reports() if report['state'] != 'RUNNING']
+        succeeded = sum(1 for report in finished if report['finalStatus'] == 'SUCCEEDED')
+        return [{
+            'name': 'Hadoop:service=HistoryServer,name=JobHistoryStatistics',
+            'TotalJobs': len(finished),
+            'FailedJobs': len(finished) - succeeded,
+            'SuccessfulJobs': succeeded
+        }]
+
+    def dispatch(self, method, path, query, body):
+        if re.match(r'^/ws/v1/history/mapreduce/jobs/[^/]+/counters$', path):
+            return 200, {'jobCounters': {'counterGroup': []}}, {}
+        return super().dispatch(method, path, query, body)
+
+def _ok():
+    return ttypes.TStatus(statusCode=ttypes.TStatusCode.SUCCESS_STATUS)
+
+def _error(message):
+    return ttypes.TStatus(statusCode=ttypes.TStatusCode.ERROR_STATUS, errorMessage=message, sqlState='42000')
+
+def _handle_id():
+    return ttypes.THandleIdentifier(guid=uuid.uuid4().bytes, secret=uuid.uuid4().bytes)
+
+class FakeHiveServer:
+    """HiveServer2 thrift service backed by in-memory string tables.
+
+    Understands USE, SHOW TABLES, CREATE TABLE name (col TYPE, ...) and
+    SELECT ... FROM name [LIMIT n]; other statements succeed without a
+    result set. Every statement is recorded in statements.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.lock = threading.Lock()
+        self.tables = {'sample': (['id', 'name'], [(str(i), f'row-{i}') for i in range(10)])}
+        self.statements = []
+        self.operations = {}
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+        self.socket.listen(128)
+        # Wake up regularly so stop() does not hang in accept()
+        self.socket.settimeout(0.2)
+        self.stopped = threading.Event()
+
+    @property
+    def address(self):
+        host, port = self.socket.getsockname()[:2]
+        return host, port
+
+    def start(self):
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
+        self.socket.close()
+
+    def _serve(self):
+        while not self.stopped.is_set():
+            try:
+                connection, _ = self.socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            connection.settimeout(None)
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection):
+        client = TSocket.TSocket()
+        client.handle = connection
+        transport = TTransport.TBufferedTransport(client)
+        protocol = TBinaryProtocol.TBinaryProtocol(transport)
+        processor = TCLIService.Processor(self)
+        try:
+            while not self.stopped.is_set():
+                processor.process(protocol, protocol)
+        except (TTransport.TTransportException, OSError, EOFError):
+            pass
+        finally:
+            transport.close()
+
+    def _run(self, statement):
+        """Return (columns, rows) for statements with a result set, None otherwise"""
+        sql = ' '.join(statement.strip().rstrip(';').split())
+        if re.match(r'(?i)^show tables', sql):
+            return ['tab_name'], [(name,) for name in sorted(self.tables)]
+        match = re.match(r'(?i)^create table (?:if not exists )?`?(\w+)`?\s*\((.*?)\)', sql)
+        if match:
+            columns = [column.split()[0].strip('`') for column in match.group(2).split(',')]
+            self.tables.setdefault(match.group(1), (columns, []))
+            return None
+        match = re.match(r'(?i)^select .* from `?(?:\w+\.)?(\w+)`?(?: limit (\d+))?', sql)
+        if match:
+            if match.group(1) not in self.tables:
+                raise LookupError(f"Table not found '{match.group(1)}'")
+            columns, rows = self.tables[match.group(1)]
+            return columns, rows[:int(match.group(2))] if match.group(2) else rows
+        return None
+
+    def OpenSession(self, req):
+        return ttypes.TOpenSessionResp(
+            status=_ok(),
+            serverProtocolVersion=req.client_protocol,
+            sessionHandle=ttypes.TSessionHandle(sessionId=_handle_id()),
+            configuration={}
+        )
+
+    def CloseSession(self, req):
+        return ttypes.TCloseSessionResp(status=_ok())
+
+    def ExecuteStatement(self, req):
+        with self.lock:
+            self.statements.append(req.statement)
+            try:
+                result = self._run(req.statement)
+            except LookupError as e:
+                return ttypes.TExecuteStatementResp(status=_error(str(e)))
+            handle = ttypes.TOperationHandle(
+                operationId=_handle_id(),
+                operationType=ttypes.TOperationType.EXECUTE_STATEMENT,
+                hasResultSet=result is not None
+            )
+            if result is not None:
+                self.operations[handle.operationId.guid] = {'columns': result[0], 'rows': result[1], 'position': 0}
+        return ttypes.TExecuteStatementResp(status=_ok(), operationHandle=handle)
+
+    def GetOperationStatus(self, req):
+        return ttypes.TGetOperationStatusResp(status=_ok(), operationState=ttypes.TOperationState.FINISHED_STATE)
+
+    def GetResultSetMetadata(self, req):
+        operation = self.operations[req.operationHandle.operationId.guid]
+        string_type = ttypes.TTypeDesc(types=[
+            ttypes.TTypeEntry(primitiveEntry=ttypes.TPrimitiveTypeEntry(type=ttypes.TTypeId.STRING_TYPE))
+        ])
+        return ttypes.TGetResultSetMetadataResp(status=_ok(), schema=ttypes.TTableSchema(columns=[
+            ttypes.TColumnDesc(columnName=name, typeDesc=string_type, position=index + 1)
+            for index, name in enumerate(operation['columns'])
+        ]))
+
+    def FetchResults(self, req):
+        with self.lock:
+            operation = self.operations[req.operationHandle.operationId.guid]
+            start = operation['position']
+            rows = operation['rows'][start:start + req.maxRows]
+            operation['position'] = start + len(rows)
+        columns = [
+            ttypes.TColumn(stringVal=ttypes.TStringColumn(
+                values=[row[index] for row in rows], nulls=bytes((len(rows) + 7) // 8)
+            ))
+            for index in range(len(operation['columns']))
+        ]
+        return ttypes.TFetchResultsResp(
+            status=_ok(),
+            hasMoreRows=False,
+            results=ttypes.TRowSet(startRowOffset=start, rows=[], columns=columns)
+        )
+
+    def CloseOperation(self, req):
+        with self.lock:
+            self.operations.pop(req.operationHandle.operationId.guid, None)
+        return ttypes.TCloseOperationResp(status=_ok())
+
+    def CancelOperation(self, req):
+        return ttypes.TCancelOperationResp(status=_ok())
+
+    def GetLog(self, req):
+        return ttypes.TGetLogResp(status=_ok(), log='')
+
+class FakeHadoopCluster:
+    """Start every fake service and point HADOOP_CONFIG at them while in use.
+
+        with FakeHadoopCluster() as cluster:
+            ...  # views, tasks and clients now talk to the fakes
+    """
+
+    def __init__(self, app_runtime=0.5):
+        self.namenode = FakeNameNode()
+        self.resourcemanager = FakeResourceManager(app_runtime=app_runtime)
+        self.historyserver = FakeHistoryServer(self.resourcemanager)
+        self.hiveserver = FakeHiveServer()
+        self._saved = []
+
+    def _override(self, section, key, value):
+        self._saved.append((section, key, section[key]))
+        section[key] = value
+
+    def configure(self):
+        """Point the Hadoop configuration at the fake services"""
+        hive_host, hive_port = self.hiveserver.address
+        namenode_host, namenode_port = self.namenode.address.split(':')
+        self._override(HADOOP_CONFIG['HDFS'], 'host', namenode_host)
+        self._override(HADOOP_CONFIG['HDFS'], 'port', int(namenode_port))
+        self._override(HADOOP_CONFIG['HIVE'], 'host', hive_host)
+        self._override(HADOOP_CONFIG['HIVE'], 'port', hive_port)
+        self._override(HADOOP_CONFIG['HIVE'], 'auth', 'NOSASL')
+        self._override(HADOOP_CONFIG['MAPREDUCE'], 'jobtracker', self.resourcemanager.address)
+        self._override(HADOOP_CONFIG['MAPREDUCE'], 'historyserver', self.historyserver.address)
+        self._override(HADOOP_CONFIG['MONITORING']['cluster_health_check'], 'endpoints', {
+            'namenode': f'http://{self.namenode.address}/jmx',
+            'resourcemanager': f'http://{self.resourcemanager.address}/jmx',
+            'historyserver': f'http://{self.historyserver.address}/jmx'
+        })
+        self._reset_clients()
+
+    def restore(self):
+        """Put the original configuration back"""
+        while self._saved:
+            section, key, value = self._saved.pop()
+            section[key] = value
+        self._reset_clients()
+
+    def _reset_clients(self):
+        # The ResourceManager client resolves its URL once, on first use
+        from .yarn import job_submitter
+        job_submitter._client = None
+
+    def start(self):
+        for service in (self.namenode, self.resourcemanager, self.historyserver, self.hiveserver):
+            service.start()
+        self.configure()
+        return self
+
+    def stop(self):
+        self.restore()
+        for service in (self.namenode, self.resourcemanager, self.historyserver, self.hiveserver):
+            service.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,215 @@
+import json
+import zlib
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .config import HADOOP_CONFIG
+from .models import HadoopMetric, HealthSnapshot
+import logging
+
+logger = logging.getLogger(__name__)
+
+def diff(old, new):
+    """Delta turning old into new, or None when they are equal.
+
+    Dicts are diffed key by key ('~' changed, '-' removed, 'order' when the
+    key order moved), lists of the same length index by index ('#'), and
+    anything else is replaced whole ('=').
+    """
+    if old == new:
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        delta = {}
+        changed = {}
+        for key, value in new.items():
+            if key not in old:
+                changed[key] = {'=': value}
+                continue
+            child = diff(old[key], value)
+            if child is not None:
+                changed[key] = child
+        removed = [key for key in old if key not in new]
+        if changed:
+            delta['~'] = changed
+        if removed:
+            delta['-'] = removed
+        expected = [key for key in old if key in new] + [key for key in new if key not in old]
+        if expected != list(new):
+            delta['order'] = list(new)
+        return delta
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        return {'#': {str(index): diff(a, b) for index, (a, b) in enumerate(zip(old, new)) if a != b}}
+    return {'=': new}
+
+def apply_delta(base, delta):
+    """Apply a delta made by diff to a copy of base"""
+    if delta is None:
+        return base
+    if '=' in delta:
+        return delta['=']
+    if '#' in delta:
+        result = list(base)
+        for index, child in delta['#'].items():
+            result[int(index)] = apply_delta(result[int(index)], child)
+        return result
+    removed = set(delta.get('-', ()))
+    result = {key: value for key, value in base.items() if key not in removed}
+    for key, child in delta.get('~', {}).items():
+        result[key] = apply_delta(result.get(key), child)
+    if 'order' in delta:
+        result = {key: result[key] for key in delta['order']}
+    return result
+
+def _pack(health):
+    """Key each service's JMX beans by name, so beans diff on their own rather than by position"""
+    packed = {}
+    for service, entry in health.items():
+        beans = (entry.get('metrics') or {}).get('beans')
+        if isinstance(beans, list):
+            names = [bean.get('name') if isinstance(bean, dict) else None for bean in beans]
+            if None not in names and len(set(names)) == len(names):
+                entry = {**entry, 'metrics': {**entry['metrics'], 'beans': dict(zip(names, beans))}}
+        packed[service] = entry
+    return packed
+
+def _unpack(packed):
+    health = {}
+    for service, entry in packed.items():
+        beans = (entry.get('metrics') or {}).get('beans')
+        if isinstance(beans, dict):
+            entry = {**entry, 'metrics': {**entry['metrics'], 'beans': list(beans.values())}}
+        health[service] = entry
+    return health
+
+class HealthSnapshotStore:
+    """Store cluster health checks as a compact digest plus delta-compressed JMX payloads.
+
+    Successive JMX dumps are nearly identical, so in 'delta' mode each
+    CLUSTER_HEALTH row only keeps status, latency and the key beans, while
+    the full payloads go to HealthSnapshot rows: a zlib-compressed keyframe
+    every keyframe_interval seconds and, in between, a compressed delta
+    against that keyframe. Rebuilding any snapshot takes its keyframe and
+    at most one delta.
+    """
+
+    def __init__(self):
+        self.config = HADOOP_CONFIG['MONITORING']['cluster_health_check']['storage']
+        # (stored bytes, content) of the last keyframe written to, so each delta skips decompressing it
+        self._keyframe = None
+
+    def _serialize(self, data):
+        return json.dumps(data, separators=(',', ':')).encode()
+
+    def _compress(self, raw):
+        return zlib.compress(raw, self.config['compression_level'])
+
+    def _decode(self, data):
+        return json.loads(zlib.decompress(bytes(data)))
+
+    def _keyframe_content(self, keyframe):
+        data = bytes(keyframe.data)
+        if self._keyframe is None or self._keyframe[0] != data:
+            self._keyframe = (data, self._decode(data))
+        return self._keyframe[1]
+
+    def digest(self, health):
+        """Status, latency and key beans of each service"""
+        key_beans = set(self.config['key_beans'])
+        digest = {}
+        for service, entry in health.items():
+            summary = {key: value for key, value in entry.items() if key != 'metrics'}
+            beans = (entry.get('metrics') or {}).get('beans') or []
+            summary['beans'] = {
+                bean['name']: bean for bean in beans
+                if isinstance(bean, dict) and bean.get('name') in key_beans
+            }
+            digest[service] = summary
+        return digest
+
+    def save_snapshot(self, health, timestamp=None, cluster_name='default'):
+        """Store the full health as a keyframe or as a delta against the current keyframe"""
+        timestamp = timestamp or timezone.now()
+        raw = self._serialize(_pack(health))
+        # Diff a parsed copy, so the cached keyframe matches what was stored exactly
+        packed = json.loads(raw)
+        keyframe = (
+            HealthSnapshot.objects.filter(cluster_name=cluster_name, keyframe__isnull=True, timestamp__lte=timestamp)
+            .order_by('-timestamp').first()
+        )
+        if keyframe is not None and (timestamp - keyframe.timestamp).total_seconds() < self.config['keyframe_interval']:
+            data = self._compress(self._serialize(diff(self._keyframe_content(keyframe), packed)))
+            # Deltas grow as the cluster drifts from the keyframe; past a point a new keyframe is cheaper
+            if len(data) <= keyframe.size * self.config['max_delta_ratio']:
+                return HealthSnapshot.objects.create(
+                    timestamp=timestamp, cluster_name=cluster_name, keyframe=keyframe,
+                    data=data, size=len(data), original_size=len(raw)
+                )
+
+        data = self._compress(raw)
+        self._keyframe = (data, packed)
+        return HealthSnapshot.objects.create(
+            timestamp=timestamp, cluster_name=cluster_name, data=data, size=len(data), original_size=len(raw)
+        )
+
+    def store(self, health, cluster_name='default'):
+        """Record a health check as a CLUSTER_HEALTH row, per the configured storage mode"""
+        if self.config['mode'] != 'delta':
+            return HadoopMetric.objects.create(metric_type='CLUSTER_HEALTH', value=health, cluster_name=cluster_name)
+        with transaction.atomic():
+            self.save_snapshot(health, cluster_name=cluster_name)
+            return HadoopMetric.objects.create(
+                metric_type='CLUSTER_HEALTH', value=self.digest(health), cluster_name=cluster_name
+            )
+
+    def rebuild(self, at=None, cluster_name='default'):
+        """Full health as of a timestamp (the latest by default), or None if nothing was stored by then.
+
+        Returns {'timestamp', 'keyframe', 'health'}. Health checks from
+        before snapshots were kept are read from their full CLUSTER_HEALTH rows.
+        """
+        at = at or timezone.now()
+        snapshots = HealthSnapshot.objects.filter(cluster_name=cluster_name)
+        snapshot = snapshots.filter(timestamp__lte=at).select_related('keyframe').order_by('-timestamp').first()
+        if snapshot is not None:
+            if snapshot.keyframe is None:
+                packed = self._decode(snapshot.data)
+            else:
+                packed = apply_delta(self._decode(snapshot.keyframe.data), self._decode(snapshot.data))
+            return {'timestamp': snapshot.timestamp, 'keyframe': snapshot.keyframe is None, 'health': _unpack(packed)}
+
+        rows = HadoopMetric.objects.filter(metric_type='CLUSTER_HEALTH', cluster_name=cluster_name, timestamp__lte=at)
+        first = snapshots.order_by('timestamp').first()
+        if first is not None:
+            rows = rows.filter(timestamp__lt=first.timestamp)
+        row = rows.order_by('-timestamp').first()
+        if row is None:
+            return None
+        return {'timestamp': row.timestamp, 'keyframe': True, 'health': row.value}
+
+    def drop_expired(self, now=None):
+        """Delete snapshots past metric retention, keeping keyframes that newer deltas still need"""
+        now = now or timezone.now()
+        cutoff = now - timedelta(days=HADOOP_CONFIG['MONITORING']['metrics_collection']['retention_days'])
+        deltas, _ = HealthSnapshot.objects.filter(timestamp__lt=cutoff, keyframe__isnull=False).delete()
+        needed = HealthSnapshot.objects.filter(keyframe__isnull=False).values('keyframe_id')
+        keyframes, _ = (
+            HealthSnapshot.objects.filter(timestamp__lt=cutoff, keyframe__isnull=True)
+            .exclude(pk__in=needed).delete()
+        )
+        return deltas + keyframes
+
+    def stats(self, cluster_name='default'):
+        """Stored size of the kept snapshots against their full uncompressed size"""
+        snapshots = HealthSnapshot.objects.filter(cluster_name=cluster_name)
+        keyframes = snapshots.filter(keyframe__isnull=True).count()
+        totals = snapshots.aggregate(size=Sum('size'), original_size=Sum('original_size'))
+        return {
+            'snapshots': snapshots.count(),
+            'keyframes': keyframes,
+            'stored_bytes': totals['size'] or 0,
+            'uncompressed_bytes': totals['original_size'] or 0
+        }
+
+# Singleton instance of the health snapshot store
+health_snapshots = HealthSnapshotStore()
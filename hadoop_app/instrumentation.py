@@ -0,0 +1,311 @@
+import contextvars
+import copy
+import os
+import random
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from .config import HADOOP_CONFIG
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Span categories, in Server-Timing order
+CATEGORIES = ('db', 'hdfs', 'hive', 'jmx')
+
+REGISTRY_KEY = 'hadoop_instrumentation:processes'
+
+_current_trace = contextvars.ContextVar('hadoop_request_trace', default=None)
+
+class RequestTrace:
+    """Time spent per backend during one request, as {category: [seconds, calls]}"""
+
+    __slots__ = ('spans',)
+
+    def __init__(self):
+        self.spans = {}
+
+    def add(self, category, elapsed):
+        totals = self.spans.get(category)
+        if totals is None:
+            self.spans[category] = [elapsed, 1]
+        else:
+            totals[0] += elapsed
+            totals[1] += 1
+
+@contextmanager
+def span(category):
+    """Count the time spent in the block against the current request, if it is traced"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(category, time.perf_counter() - started)
+
+def _trace_queries(execute, sql, params, many, context):
+    trace = _current_trace.get()
+    if trace is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        trace.add('db', time.perf_counter() - started)
+
+def _install_query_tracing(sender, connection, **kwargs):
+    # Wrappers live on the connection object, which outlives reconnects
+    if _trace_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_trace_queries)
+
+connection_created.connect(_install_query_tracing)
+
+def _observe(histogram, value, bounds):
+    if not histogram:
+        histogram.update(count=0, total_ms=0.0, max_ms=0.0, buckets=[0] * (len(bounds) + 1))
+    histogram['buckets'][bisect_left(bounds, value)] += 1
+    histogram['count'] += 1
+    histogram['total_ms'] += value
+    histogram['max_ms'] = max(histogram['max_ms'], value)
+
+def _merge(histogram, other):
+    if not histogram:
+        histogram.update(copy.deepcopy(other))
+        return
+    if len(histogram['buckets']) != len(other['buckets']):
+        # Published before a change of buckets_ms; not comparable
+        return
+    histogram['buckets'] = [a + b for a, b in zip(histogram['buckets'], other['buckets'])]
+    histogram['count'] += other['count']
+    histogram['total_ms'] += other['total_ms']
+    histogram['max_ms'] = max(histogram['max_ms'], other['max_ms'])
+
+def _percentile(histogram, fraction, bounds):
+    """Upper bound of the bucket holding the percentile; the maximum for the overflow bucket"""
+    rank = histogram['count'] * fraction
+    seen = 0
+    for index, count in enumerate(histogram['buckets']):
+        seen += count
+        if seen >= rank and count:
+            return bounds[index] if index < len(bounds) else round(histogram['max_ms'], 2)
+    return None
+
+def _summary(histogram, bounds):
+    return {
+        'count': histogram['count'],
+        'mean_ms': round(histogram['total_ms'] / histogram['count'], 2),
+        'p50_ms': _percentile(histogram, 0.5, bounds),
+        'p95_ms': _percentile(histogram, 0.95, bounds),
+        'p99_ms': _percentile(histogram, 0.99, bounds),
+        'max_ms': round(histogram['max_ms'], 2),
+        'buckets': histogram['buckets']
+    }
+
+class LatencyHistograms:
+    """Per-endpoint request and span latency histograms.
+
+    Each process records into memory and publishes a copy to the cache
+    every flush_interval seconds, so the report merges all workers.
+    Request latency is recorded for every request; span histograms only
+    for the sampled ones.
+    """
+
+    def __init__(self):
+        self.config = HADOOP_CONFIG['INSTRUMENTATION']
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.last_flush = time.monotonic()
+
+    def _process_key(self):
+        # Computed on use: workers forked from a preloaded parent get their own key
+        return f'hadoop_instrumentation:{socket.gethostname()}:{os.getpid()}'
+
+    def record(self, endpoint, elapsed, trace=None):
+        bounds = self.config['buckets_ms']
+        with self.lock:
+            entry = self.endpoints.get(endpoint)
+            if entry is None:
+                entry = self.endpoints[endpoint] = {'requests': {}, 'traced': 0, 'spans': {}}
+            _observe(entry['requests'], elapsed * 1000, bounds)
+            if trace is not None:
+                entry['traced'] += 1
+                for category, (seconds, _) in trace.spans.items():
+                    _observe(entry['spans'].setdefault(category, {}), seconds * 1000, bounds)
+            due = time.monotonic() - self.last_flush >= self.config['flush_interval']
+            if due:
+                self.last_flush = time.monotonic()
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Publish this process's histograms to the cache"""
+        with self.lock:
+            snapshot = copy.deepcopy(self.endpoints)
+        key = self._process_key()
+        try:
+            cache.set(key, snapshot, timeout=self.config['retention'])
+            processes = cache.get(REGISTRY_KEY, set())
+            if key not in processes:
+                cache.set(REGISTRY_KEY, processes | {key}, timeout=None)
+        except Exception as e:
+            logger.warning(f"Failed to publish request histograms: {e}")
+
+    def report(self):
+        """Merge the histograms of every live process into percentiles per endpoint"""
+        self.flush()
+        processes = cache.get(REGISTRY_KEY, set())
+        snapshots = cache.get_many(processes)
+        if set(snapshots) != processes:
+            # Forget processes whose histograms expired
+            cache.set(REGISTRY_KEY, set(snapshots), timeout=None)
+
+        merged = {}
+        for snapshot in snapshots.values():
+            for endpoint, entry in snapshot.items():
+                target = merged.setdefault(endpoint, {'requests': {}, 'traced': 0, 'spans': {}})
+                _merge(target['requests'], entry['requests'])
+                target['traced'] += entry['traced']
+                for category, histogram in entry['spans'].items():
+                    _merge(target['spans'].setdefault(category, {}), histogram)
+
+        bounds = self.config['buckets_ms']
+        return {
+            'processes': len(snapshots),
+            'sample_rate': self.config['sample_rate'],
+            'buckets_ms': bounds,
+            'endpoints': {
+                endpoint: {
+                    **_summary(entry['requests'], bounds),
+                    'traced': entry['traced'],
+                    'spans': {
+                        category: _summary(histogram, bounds)
+                        for category, histogram in sorted(entry['spans'].items())
+                    }
+                }
+                for endpoint, entry in sorted(merged.items())
+            }
+        }
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return f'{request.method} <unmatched>'
+    # Router views have names; the async URLs are told apart by route
+    return f'{request.method} {match.view_name if match.url_name else match.route}'
+
+def _server_timing(trace, elapsed):
+    entries = [
+        f'{category};desc="{trace.spans[category][1]} calls";dur={trace.spans[category][0] * 1000:.1f}'
+        for category in CATEGORIES if category in trace.spans
+    ]
+    entries.append(f'total;dur={elapsed * 1000:.1f}')
+    return ', '.join(entries)
+
+class _TracedStream:
+    """Streaming content read under the request's trace, recorded once the stream closes"""
+
+    def __init__(self, content, trace, record):
+        self.content = content
+        self.trace = trace
+        self.record = record
+        self.closed = False
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.record()
+
+class _TracedIterator(_TracedStream):
+    def __iter__(self):
+        self.iterator = iter(self.content)
+        return self
+
+    def __next__(self):
+        token = _current_trace.set(self.trace)
+        try:
+            return next(self.iterator)
+        except StopIteration:
+            self.close()
+            raise
+        finally:
+            _current_trace.reset(token)
+
+class _TracedAsyncIterator(_TracedStream):
+    def __aiter__(self):
+        self.iterator = aiter(self.content)
+        return self
+
+    async def __anext__(self):
+        token = _current_trace.set(self.trace)
+        try:
+            return await anext(self.iterator)
+        except StopAsyncIteration:
+            self.close()
+            raise
+        finally:
+            _current_trace.reset(token)
+
+class InstrumentationMiddleware:
+    """Time every request per endpoint, breaking sampled ones down into DB, HDFS, Hive and JMX spans"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = HADOOP_CONFIG['INSTRUMENTATION']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        sampled = random.random() < self.config['sample_rate']
+        trace = RequestTrace() if sampled else None
+        return trace, _current_trace.set(trace), time.perf_counter()
+
+    def _finish(self, request, response, trace, started):
+        if response.streaming:
+            # The body is produced after the view returns and its headers are already sent,
+            # so streams are timed until they close and carry no Server-Timing header
+            def record():
+                request_histograms.record(_endpoint(request), time.perf_counter() - started, trace)
+            wrapper = _TracedAsyncIterator if response.is_async else _TracedIterator
+            response.streaming_content = wrapper(response.streaming_content, trace, record)
+            return response
+        elapsed = time.perf_counter() - started
+        request_histograms.record(_endpoint(request), elapsed, trace)
+        if trace is not None and self.config['server_timing']:
+            response['Server-Timing'] = _server_timing(trace, elapsed)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.config['enabled']:
+            return self.get_response(request)
+        trace, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_trace.reset(token)
+        return self._finish(request, response, trace, started)
+
+    async def __acall__(self, request):
+        if not self.config['enabled']:
+            return await self.get_response(request)
+        trace, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_trace.reset(token)
+        return self._finish(request, response, trace, started)
+
+# Singleton instance of the request latency histograms
+request_histograms = LatencyHistograms()
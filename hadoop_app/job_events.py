@@ -0,0 +1,130 @@
+import asyncio
+import json
+import time
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from .config import HADOOP_CONFIG
+from .models import HadoopJob
+
+def _status_key(job_id):
+    return f'hadoop_job_status:{job_id}'
+
+def _events_key(owner_id):
+    return f'hadoop_job_events:{owner_id}'
+
+def _changes_key(owner_id, version):
+    return f'hadoop_job_events:{owner_id}:{version}'
+
+def _ttl():
+    # Long enough for any waiting client to see a change, short enough not to pile up per job
+    return HADOOP_CONFIG['MAPREDUCE']['notifications']['key_ttl']
+
+def publish_status_changes(jobs):
+    """Make job status changes visible to long-polling and streaming clients.
+
+    Every change bumps the owner's event version and records which jobs
+    changed under that version, so streams only re-read those jobs.
+    """
+    if not jobs:
+        return
+    ttl = _ttl()
+    cache.set_many({_status_key(job.pk): job.status for job in jobs}, timeout=ttl)
+    owners = {}
+    for job in jobs:
+        owners.setdefault(job.owner_id, []).append(job.pk)
+    for owner_id, job_ids in owners.items():
+        key = _events_key(owner_id)
+        cache.add(key, 0, timeout=ttl)
+        version = cache.incr(key)
+        cache.touch(key, ttl)
+        cache.set(_changes_key(owner_id, version), job_ids, timeout=ttl)
+
+async def await_status_change(job, known_status, timeout):
+    """Wait without blocking a thread until the job leaves known_status or the timeout expires"""
+    interval = HADOOP_CONFIG['MAPREDUCE']['notifications']['check_interval']
+    key = _status_key(job.pk)
+    await cache.aadd(key, job.status, timeout=_ttl())
+    deadline = time.monotonic() + timeout
+    while True:
+        current = await cache.aget(key, job.status)
+        if current != known_status or time.monotonic() >= deadline:
+            return current
+        await asyncio.sleep(interval)
+
+def wait_for_status_change(job, known_status, timeout):
+    """Wait on this thread until the job leaves known_status or the timeout expires"""
+    interval = HADOOP_CONFIG['MAPREDUCE']['notifications']['check_interval']
+    key = _status_key(job.pk)
+    cache.add(key, job.status, timeout=_ttl())
+    deadline = time.monotonic() + timeout
+    while True:
+        current = cache.get(key, job.status)
+        if current != known_status or time.monotonic() >= deadline:
+            return current
+        time.sleep(interval)
+
+async def _snapshot(owner, job_ids=None):
+    """Statuses of the given jobs of the owner, or of all of them"""
+    jobs = HadoopJob.objects.filter(owner=owner)
+    if job_ids is not None:
+        jobs = jobs.filter(pk__in=job_ids)
+    return {job_id: job_status async for job_id, job_status in jobs.values_list('id', 'status')}
+
+async def _changed_statuses(owner, version, current_version):
+    """Statuses of the jobs changed after version, or None when the changes are no longer known"""
+    keys = [_changes_key(owner.pk, number) for number in range(version + 1, current_version + 1)]
+    if not keys or len(keys) > 1000:
+        return None
+    changes = await cache.aget_many(keys)
+    if len(changes) != len(keys):
+        return None
+    job_ids = {job_id for ids in changes.values() for job_id in ids}
+    cached = await cache.aget_many([_status_key(job_id) for job_id in job_ids])
+    statuses = {job_id: cached[_status_key(job_id)] for job_id in job_ids if _status_key(job_id) in cached}
+    missing = job_ids - set(statuses)
+    if missing:
+        statuses.update(await _snapshot(owner, missing))
+    return statuses
+
+def _event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+async def status_event_stream(owner):
+    """Yield Server-Sent Events for every status change of the owner's jobs"""
+    config = HADOOP_CONFIG['MAPREDUCE']['notifications']
+    key = _events_key(owner.pk)
+    version = await cache.aget(key, 0)
+    statuses = await _snapshot(owner)
+    started = last_sent = time.monotonic()
+
+    yield f"retry: {int(config['check_interval'] * 1000)}\n\n"
+    while time.monotonic() - started < config['stream_timeout']:
+        await asyncio.sleep(config['check_interval'])
+        current_version = await cache.aget(key, 0)
+        if current_version != version:
+            changed = await _changed_statuses(owner, version, current_version)
+            if changed is None:
+                # The counter was reset or the changes expired: compare everything once
+                changed = await _snapshot(owner)
+            version = current_version
+            for job_id, job_status in sorted(changed.items()):
+                if statuses.get(job_id) != job_status:
+                    statuses[job_id] = job_status
+                    yield _event('status', {'id': job_id, 'status': job_status})
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= config['heartbeat_interval']:
+            yield ': keepalive\n\n'
+            last_sent = time.monotonic()
+
+def sync_status_event_stream(owner):
+    """Yield the events of status_event_stream on a synchronous worker thread, which it holds throughout"""
+    events = status_event_stream(owner)
+
+    async def next_event():
+        return await anext(events)
+
+    while True:
+        try:
+            yield async_to_sync(next_event)()
+        except StopAsyncIteration:
+            return
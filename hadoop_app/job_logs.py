@@ -0,0 +1,259 @@
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from .clients import get_async_http_client
+from .config import HADOOP_CONFIG
+from .models import HadoopJob
+from .yarn import TERMINAL_STATUSES, job_submitter
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONTAINER_ID = re.compile(r'^container_[A-Za-z0-9_]+$')
+LOG_FILE_NAME = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+# Bytes held in the log cache, shared by every process writing to it
+CACHE_SIZE_KEY = 'hadoop_job_logs:cache_bytes'
+
+def _listed_size(listing, filename):
+    """Size of a log file in a NodeManager container log listing"""
+    # One entry per log aggregation type (LOCAL, AGGREGATED)
+    if isinstance(listing, dict):
+        listing = listing.get('containerLogsInfo', [listing])
+    for entry in listing:
+        for info in entry.get('containerLogInfo', []):
+            if info['fileName'] == filename:
+                return int(info['fileSize'])
+    return 0
+
+class JobLogFetcher:
+    """Stream YARN container logs in chunks, caching logs of finished jobs on disk.
+
+    Running jobs are read straight from the NodeManager log endpoint, which
+    redirects to the JobHistory log server once logs are aggregated. Logs of
+    finished jobs are downloaded once into a size-bounded local cache and
+    byte ranges are then served from disk. The master container of a
+    finished job is remembered next to its logs, so repeat reads make no
+    call to the cluster.
+    """
+
+    def __init__(self, submitter):
+        self.submitter = submitter
+        self.config = HADOOP_CONFIG['MAPREDUCE']['logs']
+
+    def _master_container(self, job):
+        """Find the application master container and the node it ran on"""
+        attempts = self.submitter.client.application_attempts(job.application_id)
+        if not attempts:
+            raise LookupError(f"No attempts found for {job.application_id}")
+        attempt = attempts[-1]
+        return attempt['containerId'], attempt['nodeHttpAddress']
+
+    def _master_path(self, job):
+        # Dot files are neither served nor evicted
+        return Path(self.config['cache_dir']) / job.application_id / '.master'
+
+    def _finished_master_container(self, job):
+        """Master container of a finished job, resolved from the cluster only once"""
+        path = self._master_path(job)
+        try:
+            master = json.loads(path.read_text())
+            return master['container'], master['node']
+        except (OSError, ValueError, KeyError):
+            pass
+        container, node = self._master_container(job)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f'.master.{uuid.uuid4().hex}')
+        partial.write_text(json.dumps({'container': container, 'node': node}))
+        os.replace(partial, path)
+        return container, node
+
+    def _container_url(self, node, container):
+        return f'http://{node}/ws/v1/node/containers/{container}/logs'
+
+    def _get(self, url, **params):
+        response = self.submitter.client.session.get(
+            url, params=params, stream=True, timeout=self.config['timeout']
+        )
+        response.raise_for_status()
+        return response
+
+    def _iter_response(self, response, skip=0, limit=None):
+        """Yield a response body chunk by chunk, dropping the first skip bytes"""
+        with response:
+            for chunk in response.iter_content(self.config['chunk_size']):
+                if skip:
+                    if len(chunk) <= skip:
+                        skip -= len(chunk)
+                        continue
+                    chunk = chunk[skip:]
+                    skip = 0
+                if limit is not None:
+                    chunk = chunk[:limit]
+                    limit -= len(chunk)
+                if chunk:
+                    yield chunk
+                if limit == 0:
+                    return
+
+    def _file_size(self, node, container, filename):
+        """Get the current size of a container log file"""
+        return _listed_size(self._get(self._container_url(node, container)).json(), filename)
+
+    def _cache_path(self, job, container, filename):
+        return Path(self.config['cache_dir']) / job.application_id / container / filename
+
+    def _download(self, url, path):
+        """Download a log into the cache without holding it in memory"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f'.{path.name}.{uuid.uuid4().hex}')
+        try:
+            with open(partial, 'wb') as output:
+                for chunk in self._iter_response(self._get(url)):
+                    output.write(chunk)
+            os.replace(partial, path)
+        finally:
+            if partial.exists():
+                partial.unlink()
+        if self._cache_size(path.stat().st_size) > self.config['cache_max_bytes']:
+            self._evict()
+
+    def _cached_files(self):
+        return [
+            (entry.stat(), entry) for entry in Path(self.config['cache_dir']).rglob('*')
+            if entry.is_file() and not entry.name.startswith('.')
+        ]
+
+    def _cache_size(self, added):
+        """Add a download to the running cache size and return the new total"""
+        try:
+            return cache.incr(CACHE_SIZE_KEY, added)
+        except ValueError:
+            # Not tracked yet, or evicted from the cache: count what is on disk
+            total = sum(stat.st_size for stat, _ in self._cached_files())
+            cache.set(CACHE_SIZE_KEY, total, timeout=None)
+            return total
+
+    def _evict(self):
+        """Drop least recently read cached logs until the cache fits its size limit"""
+        files = self._cached_files()
+        total = sum(stat.st_size for stat, _ in files)
+        for stat, entry in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= self.config['cache_max_bytes']:
+                break
+            entry.unlink(missing_ok=True)
+            total -= stat.st_size
+        cache.set(CACHE_SIZE_KEY, total, timeout=None)
+
+    def _iter_file(self, path, offset, length, tail):
+        """Yield a byte range of a cached log"""
+        # Reading counts as use for the least-recently-used eviction
+        os.utime(path)
+        size = path.stat().st_size
+        start = max(0, size - tail) if tail is not None else min(offset, size)
+        remaining = size - start if length is None else min(length, size - start)
+        with open(path, 'rb') as log:
+            log.seek(start)
+            while remaining > 0:
+                chunk = log.read(min(self.config['chunk_size'], remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def _follow(self, job, node, container, filename, sent):
+        """Keep yielding bytes appended to a running job's log"""
+        # This holds a worker thread, so stop well before the worker timeout; the client resumes from its offset
+        deadline = time.monotonic() + self.config['sync_follow_timeout']
+        url = f'{self._container_url(node, container)}/{filename}'
+        while time.monotonic() < deadline:
+            time.sleep(self.config['follow_interval'])
+            size = self._file_size(node, container, filename)
+            if size > sent:
+                for chunk in self._iter_response(self._get(url, size=sent - size)):
+                    sent += len(chunk)
+                    yield chunk
+            if HadoopJob.objects.filter(pk=job.pk, status__in=TERMINAL_STATUSES).exists():
+                return
+
+    def _validate(self, filename, container):
+        if not LOG_FILE_NAME.match(filename) or filename.startswith('.'):
+            raise ValueError(f"Invalid log file name: {filename}")
+        if container is not None and not CONTAINER_ID.match(container):
+            raise ValueError(f"Invalid container id: {container}")
+
+    def stream(self, job, filename='stdout', container=None, offset=0, length=None, tail=None, follow=False):
+        """Stream a byte range of a container log, optionally following it"""
+        self._validate(filename, container)
+
+        if job.status in TERMINAL_STATUSES:
+            master, node = self._finished_master_container(job)
+            container = container or master
+            path = self._cache_path(job, container, filename)
+            if not path.exists():
+                self._download(f'{self._container_url(node, container)}/{filename}', path)
+            yield from self._iter_file(path, offset, length, tail)
+            return
+
+        # The master container of a running job changes when an attempt fails
+        master, node = self._master_container(job)
+        container = container or master
+        url = f'{self._container_url(node, container)}/{filename}'
+        # The NodeManager size parameter reads the first (or with a negative value, last) bytes
+        if tail is not None:
+            response, skip = self._get(url, size=-tail), 0
+        elif length is not None:
+            response, skip = self._get(url, size=offset + length), offset
+        else:
+            response, skip = self._get(url), offset
+
+        sent = offset if tail is None else None
+        for chunk in self._iter_response(response, skip=skip, limit=length):
+            if sent is not None:
+                sent += len(chunk)
+            yield chunk
+
+        if follow:
+            if sent is None:
+                sent = self._file_size(node, container, filename)
+            yield from self._follow(job, node, container, filename, sent)
+
+    async def alocate(self, job, filename='stdout', container=None):
+        """Check a log request and find the node and container holding the log of a running job"""
+        self._validate(filename, container)
+        master, node = await sync_to_async(self._master_container)(job)
+        return node, container or master
+
+    async def afollow(self, job, node, container, filename='stdout', offset=0, tail=None):
+        """Yield a running job's log from offset (or its last tail bytes) on as it grows, without holding a thread"""
+        client = get_async_http_client()
+        url = f'{self._container_url(node, container)}/{filename}'
+        deadline = time.monotonic() + self.config['follow_timeout']
+        sent = offset if tail is None else None
+        while True:
+            response = await client.get(self._container_url(node, container), timeout=self.config['timeout'])
+            response.raise_for_status()
+            size = _listed_size(response.json(), filename)
+            if sent is None:
+                sent = max(0, size - tail)
+            if size > sent:
+                # Aggregated logs redirect to the JobHistory log server
+                async with client.stream(
+                    'GET', url, params={'size': sent - size}, timeout=self.config['timeout'], follow_redirects=True
+                ) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes(self.config['chunk_size']):
+                        sent += len(chunk)
+                        yield chunk
+            if time.monotonic() >= deadline or await HadoopJob.objects.filter(pk=job.pk, status__in=TERMINAL_STATUSES).aexists():
+                return
+            await asyncio.sleep(self.config['follow_interval'])
+
+# Singleton instance of the job log fetcher
+job_log_fetcher = JobLogFetcher(job_submitter)
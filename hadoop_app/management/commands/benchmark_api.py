@@ -0,0 +1,108 @@
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from hadoop_app.benchmark import SCENARIOS, APIBenchmark, compare, create_fixtures
+from hadoop_app.fake_cluster import FakeHadoopCluster
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+class Command(BaseCommand):
+    help = 'Benchmark the API endpoints against a fake Hadoop cluster and report latency, throughput and memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per endpoint before measuring')
+        parser.add_argument('--endpoints', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS), help='Endpoints to benchmark')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='Fail if results regress against this JSON baseline')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Allowed regression as a fraction (default 0.2)')
+        parser.add_argument('--live', action='store_true', help='Use the configured cluster instead of the fakes')
+        parser.add_argument('--locmem-cache', action='store_true', help='Use a local memory cache instead of the configured one')
+        parser.add_argument('--no-trace-memory', action='store_true', help='Skip tracemalloc, which slows requests down')
+
+    def _git_revision(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _run(self, options):
+        user = User.objects.create_user('benchmark')
+        fixtures = create_fixtures(user)
+        benchmark = APIBenchmark(
+            user,
+            concurrency=options['concurrency'],
+            requests_per_scenario=options['requests'],
+            warmup=options['warmup'],
+            trace_memory=not options['no_trace_memory']
+        )
+        return benchmark.run(options['endpoints'], fixtures)
+
+    def handle(self, *args, **options):
+        # Benchmark against a throwaway database so fixtures never touch real data
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        temporary = None
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # The API threads need a file database, not a per-connection in-memory one
+            temporary = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False).name
+            test_settings['NAME'] = temporary
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        cluster = None if options['live'] else FakeHadoopCluster().start()
+        try:
+            caches = {'CACHES': LOCMEM_CACHES} if options['locmem_cache'] else {}
+            with override_settings(ALLOWED_HOSTS=['127.0.0.1'], **caches):
+                results = self._run(options)
+        finally:
+            if cluster is not None:
+                cluster.stop()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if temporary is not None:
+                test_settings.pop('NAME')
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+
+        report = {
+            'meta': {
+                'revision': self._git_revision(),
+                'timestamp': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cluster': 'live' if options['live'] else 'fake',
+                'concurrency': options['concurrency'],
+                'requests': options['requests']
+            },
+            'results': results
+        }
+
+        for name, result in results.items():
+            memory = f", peak {result['memory_peak_kb']} KiB" if 'memory_peak_kb' in result else ''
+            self.stdout.write(
+                f"{name}: {result['per_second']}/s, p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+                f"p99 {result['p99_ms']} ms, {result['errors']} errors{memory}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Successfully wrote results to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = compare(baseline, report, options['threshold'])
+            if regressions:
+                raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from hadoop_app.benchmark import summarize
+from hadoop_app.models import HadoopMetric
+
+BENCHMARK_CLUSTER = 'benchmark'
+
+class Command(BaseCommand):
+    help = 'Measure metric write and read throughput of the configured database under concurrent load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Threads inserting metrics')
+        parser.add_argument('--readers', type=int, default=8, help='Threads querying recent metrics')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def _write(self):
+        HadoopMetric.objects.create(
+            metric_type='HDFS_CAPACITY',
+            value={'total': 100, 'used': 40, 'remaining': 60},
+            cluster_name=BENCHMARK_CLUSTER
+        )
+
+    def _read(self):
+        list(
+            HadoopMetric.objects.filter(metric_type='HDFS_CAPACITY', cluster_name=BENCHMARK_CLUSTER)
+            .order_by('-timestamp')[:50]
+        )
+
+    def _worker(self, operation, deadline, results):
+        latencies, errors = [], []
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    operation()
+                    latencies.append(time.perf_counter() - started)
+                except Exception as e:
+                    # SQLite reports writer contention as "database is locked"
+                    errors.append(str(e))
+        finally:
+            connection.close()
+        results.append((latencies, errors))
+
+    def _summary(self, results, duration):
+        latencies = [latency for thread_latencies, _ in results for latency in thread_latencies]
+        errors = [error for _, thread_errors in results for error in thread_errors]
+        return summarize(latencies, errors, duration)
+
+    def handle(self, *args, **options):
+        # Benchmark against a throwaway database of the same backend so metric rows never touch real data
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        temporary = None
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # The worker threads need a file database, not a per-connection in-memory one
+            temporary = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False).name
+            test_settings['NAME'] = temporary
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if temporary is not None:
+                test_settings.pop('NAME')
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"{report['vendor']}: {report['writers']} writers, {report['readers']} readers, {report['duration']}s")
+        for name in ('writes', 'reads'):
+            summary = report[name]
+            self.stdout.write(
+                f"  {name}: {summary['per_second']}/s, p50 {summary['p50_ms']} ms, "
+                f"p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms, {summary['errors']} errors"
+            )
+
+    def _run(self, options):
+        duration = options['duration']
+        deadline = time.monotonic() + duration
+        write_results, read_results = [], []
+        threads = [
+            threading.Thread(target=self._worker, args=(self._write, deadline, write_results))
+            for _ in range(options['writers'])
+        ] + [
+            threading.Thread(target=self._worker, args=(self._read, deadline, read_results))
+            for _ in range(options['readers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return {
+            'vendor': connection.vendor,
+            'writers': options['writers'],
+            'readers': options['readers'],
+            'duration': duration,
+            'writes': self._summary(write_results, duration),
+            'reads': self._summary(read_results, duration)
+        }
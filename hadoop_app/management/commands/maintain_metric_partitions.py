@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from hadoop_app.partitions import metric_partitions
+
+class Command(BaseCommand):
+    help = 'Create upcoming HadoopMetric partitions and drop the ones past retention'
+
+    def handle(self, *args, **options):
+        if not metric_partitions.is_partitioned():
+            self.stdout.write('Metrics table is not partitioned; deleting expired rows only')
+        created, expired = metric_partitions.maintain()
+        for name in created:
+            self.stdout.write(f'Created {name}')
+        self.stdout.write(self.style.SUCCESS(f'Successfully maintained metric partitions ({expired} expired)'))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hadoop_app', '0002_hadoopmetric'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HDFSCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500)),
+                ('target_size', models.BigIntegerField()),
+                ('skip_header', models.BooleanField(default=False)),
+                ('status', models.CharField(default='PENDING', max_length=50)),
+                ('files_before', models.IntegerField(blank=True, null=True)),
+                ('files_after', models.IntegerField(blank=True, null=True)),
+                ('files_merged', models.IntegerField(default=0)),
+                ('bytes_merged', models.BigIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hadoop_app', '0003_hdfscompaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hdfsfile',
+            name='codec',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='hdfsfile',
+            name='original_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
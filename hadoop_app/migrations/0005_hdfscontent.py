@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hadoop_app', '0004_hdfsfile_compression'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HDFSContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64)),
+                ('codec', models.CharField(blank=True, default='', max_length=20)),
+                ('path', models.CharField(max_length=500)),
+                ('size', models.BigIntegerField()),
+                ('original_size', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('digest', 'codec'), name='unique_hdfs_content_digest')],
+            },
+        ),
+        migrations.AddField(
+            model_name='hdfsfile',
+            name='content',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='files', to='hadoop_app.hdfscontent'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hadoop_app', '0005_hdfscontent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hadoopjob',
+            name='application_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='hadoopjob',
+            name='diagnostics',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
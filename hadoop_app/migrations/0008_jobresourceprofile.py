@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hadoop_app', '0007_hadoopworkflow'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hadoopjob',
+            name='metrics',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='JobResourceProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('job_type', models.CharField(choices=[('MAPREDUCE', 'MapReduce'), ('SPARK', 'Spark'), ('PIG', 'Pig'), ('HIVE', 'Hive')], max_length=50)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('avg_runtime', models.FloatField(default=0)),
+                ('avg_memory_seconds', models.FloatField(default=0)),
+                ('avg_vcore_seconds', models.FloatField(default=0)),
+                ('avg_cpu_seconds', models.FloatField(blank=True, null=True)),
+                ('peak_memory_mb', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner', 'name', 'job_type'), name='unique_job_resource_profile')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hadoop_app', '0008_jobresourceprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hadoopjob',
+            index=models.Index(fields=['owner', 'created_at'], name='hadoopjob_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hadoopworkflow',
+            index=models.Index(fields=['owner', 'created_at'], name='workflow_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hdfscompaction',
+            index=models.Index(fields=['owner', 'created_at'], name='compaction_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hdfsfile',
+            index=models.Index(fields=['owner', 'created_at'], name='hdfsfile_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hivequery',
+            index=models.Index(fields=['owner', 'created_at'], name='hivequery_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations
+
+TABLE = 'hadoop_app_hadoopmetric'
+SEQUENCE = 'hadoop_app_hadoopmetric_partitioned_id_seq'
+
+
+def partition_metrics(apps, schema_editor):
+    """Turn the metrics table into a timestamp range-partitioned table on PostgreSQL.
+
+    The primary key becomes (id, timestamp), as PostgreSQL requires the
+    partition key in every unique constraint. Existing rows go to the
+    default partition; the partition maintenance task moves them into
+    dated partitions.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned')
+    schema_editor.execute(f'CREATE SEQUENCE {SEQUENCE}')
+    schema_editor.execute(f"""
+        CREATE TABLE {TABLE} (
+            id bigint NOT NULL DEFAULT nextval('{SEQUENCE}'),
+            metric_type varchar(50) NOT NULL,
+            value jsonb NOT NULL,
+            "timestamp" timestamp with time zone NOT NULL,
+            cluster_name varchar(255) NOT NULL,
+            PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """)
+    schema_editor.execute(f'ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id')
+    schema_editor.execute(f'CREATE INDEX {TABLE}_type_ts_idx ON {TABLE} (metric_type, "timestamp")')
+    schema_editor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+    schema_editor.execute(f"""
+        INSERT INTO {TABLE} (id, metric_type, value, "timestamp", cluster_name)
+        SELECT id, metric_type, value, "timestamp", cluster_name FROM {TABLE}_unpartitioned
+    """)
+    schema_editor.execute(f"SELECT setval('{SEQUENCE}', COALESCE((SELECT MAX(id) FROM {TABLE}), 0) + 1, false)")
+    schema_editor.execute(f'DROP TABLE {TABLE}_unpartitioned')
+
+
+def unpartition_metrics(apps, schema_editor):
+    """Copy the partitioned metrics back into a plain table"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"""
+        CREATE TABLE {TABLE}_unpartitioned (
+            id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            metric_type varchar(50) NOT NULL,
+            value jsonb NOT NULL,
+            "timestamp" timestamp with time zone NOT NULL,
+            cluster_name varchar(255) NOT NULL
+        )
+    """)
+    schema_editor.execute(f'INSERT INTO {TABLE}_unpartitioned SELECT id, metric_type, value, "timestamp", cluster_name FROM {TABLE}')
+    schema_editor.execute(f"""
+        SELECT setval(
+            pg_get_serial_sequence('{TABLE}_unpartitioned', 'id'),
+            COALESCE((SELECT MAX(id) FROM {TABLE}_unpartitioned), 0) + 1, false
+        )
+    """)
+    schema_editor.execute(f'DROP TABLE {TABLE}')
+    schema_editor.execute(f'ALTER TABLE {TABLE}_unpartitioned RENAME TO {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hadoop_app', '0009_owner_created_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_metrics, unpartition_metrics),
+    ]
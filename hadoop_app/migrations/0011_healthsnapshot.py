@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hadoop_app', '0010_partition_hadoopmetric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HealthSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(db_index=True)),
+                ('cluster_name', models.CharField(default='default', max_length=255)),
+                ('data', models.BinaryField()),
+                ('size', models.IntegerField()),
+                ('original_size', models.IntegerField()),
+                ('keyframe', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='deltas', to='hadoop_app.healthsnapshot')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+            },
+        ),
+    ]
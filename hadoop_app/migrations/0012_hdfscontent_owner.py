@@ -0,0 +1,55 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_owners(apps, schema_editor):
+    """Give each content row the owner of the file stored at its path.
+
+    Files of other users that pointed at it are detached: they keep their
+    path, which release_file still treats as in use, but no longer share
+    the content row.
+    """
+    HDFSContent = apps.get_model('hadoop_app', 'HDFSContent')
+    HDFSFile = apps.get_model('hadoop_app', 'HDFSFile')
+    for content in HDFSContent.objects.all():
+        writer = (
+            HDFSFile.objects.filter(path=content.path).order_by('created_at').first()
+            or HDFSFile.objects.filter(content=content).order_by('created_at').first()
+        )
+        if writer is None:
+            content.delete()
+            continue
+        content.owner_id = writer.owner_id
+        content.save(update_fields=['owner'])
+        HDFSFile.objects.filter(content=content).exclude(owner_id=writer.owner_id).update(content=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('hadoop_app', '0011_healthsnapshot'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='hdfscontent',
+            name='unique_hdfs_content_digest',
+        ),
+        migrations.AddField(
+            model_name='hdfscontent',
+            name='owner',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(assign_owners, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='hdfscontent',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='hdfscontent',
+            constraint=models.UniqueConstraint(fields=('owner', 'digest', 'codec'), name='unique_hdfs_content_owner_digest'),
+        ),
+    ]
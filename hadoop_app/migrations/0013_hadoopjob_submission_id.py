@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hadoop_app', '0012_hdfscontent_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hadoopjob',
+            name='submission_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hadoop_app', '0013_hadoopjob_submission_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobresourceprofile',
+            name='avg_executors',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -1,14 +1,58 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+class HDFSContent(models.Model):
+    digest = models.CharField(max_length=64)
+    codec = models.CharField(max_length=20, blank=True, default='')
+    path = models.CharField(max_length=500)
+    size = models.BigIntegerField()
+    original_size = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Content is only shared between one owner's files, so nothing lands in another user's home
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'digest', 'codec'], name='unique_hdfs_content_owner_digest')
+        ]
+
 class HDFSFile(models.Model):
     name = models.CharField(max_length=255)
     path = models.CharField(max_length=500)
     size = models.BigIntegerField()
+    codec = models.CharField(max_length=20, blank=True, default='')
+    original_size = models.BigIntegerField(blank=True, null=True)
+    content = models.ForeignKey(
+        HDFSContent, on_delete=models.SET_NULL, blank=True, null=True, related_name='files'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='hdfsfile_owner_created_idx')
+        ]
+
+class HDFSCompaction(models.Model):
+    path = models.CharField(max_length=500)
+    target_size = models.BigIntegerField()
+    skip_header = models.BooleanField(default=False)
+    status = models.CharField(max_length=50, default='PENDING')
+    files_before = models.IntegerField(blank=True, null=True)
+    files_after = models.IntegerField(blank=True, null=True)
+    files_merged = models.IntegerField(default=0)
+    bytes_merged = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='compaction_owner_created_idx')
+        ]
+
 class HiveQuery(models.Model):
     query = models.TextField()
     result = models.TextField(blank=True, null=True)
@@ -17,6 +61,25 @@ class HiveQuery(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     status = models.CharField(max_length=50, default='PENDING')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='hivequery_owner_created_idx')
+        ]
+
+class HadoopWorkflow(models.Model):
+    name = models.CharField(max_length=255)
+    status = models.CharField(max_length=50, default='PENDING')
+    max_parallel = models.PositiveIntegerField(default=4)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='workflow_owner_created_idx')
+        ]
+
 class HadoopJob(models.Model):
     JOB_TYPES = (
         ('MAPREDUCE', 'MapReduce'),
@@ -29,10 +92,44 @@ class HadoopJob(models.Model):
     job_type = models.CharField(max_length=50, choices=JOB_TYPES)
     configuration = models.JSONField()
     status = models.CharField(max_length=50, default='PENDING')
+    application_id = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+    # New for every submission attempt; tags the attempt's YARN applications
+    submission_id = models.UUIDField(blank=True, null=True)
+    diagnostics = models.TextField(blank=True, null=True)
+    metrics = models.JSONField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     started_at = models.DateTimeField(blank=True, null=True)
     finished_at = models.DateTimeField(blank=True, null=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    workflow = models.ForeignKey(
+        HadoopWorkflow, on_delete=models.CASCADE, blank=True, null=True, related_name='jobs'
+    )
+    dependencies = models.ManyToManyField(
+        'self', symmetrical=False, blank=True, related_name='dependents'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='hadoopjob_owner_created_idx')
+        ]
+
+class JobResourceProfile(models.Model):
+    name = models.CharField(max_length=255)
+    job_type = models.CharField(max_length=50, choices=HadoopJob.JOB_TYPES)
+    samples = models.PositiveIntegerField(default=0)
+    avg_runtime = models.FloatField(default=0)  # seconds
+    avg_memory_seconds = models.FloatField(default=0)  # MB-seconds
+    avg_vcore_seconds = models.FloatField(default=0)
+    avg_cpu_seconds = models.FloatField(blank=True, null=True)
+    avg_executors = models.FloatField(blank=True, null=True)  # Spark executors the tasks kept busy
+    peak_memory_mb = models.FloatField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'name', 'job_type'], name='unique_job_resource_profile')
+        ]
 
 class HadoopMetric(models.Model):
     METRIC_TYPES = [
@@ -50,3 +147,16 @@ class HadoopMetric(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+
+class HealthSnapshot(models.Model):
+    timestamp = models.DateTimeField(db_index=True)
+    cluster_name = models.CharField(max_length=255, default='default')
+    keyframe = models.ForeignKey(
+        'self', on_delete=models.CASCADE, blank=True, null=True, related_name='deltas'
+    )
+    data = models.BinaryField()
+    size = models.IntegerField()
+    original_size = models.IntegerField()
+
+    class Meta:
+        ordering = ['-timestamp']
@@ -1,135 +1,236 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import json
 from datetime import datetime
 from .config import HADOOP_CONFIG
+from .instrumentation import span
 import logging
 
 logger = logging.getLogger(__name__)
 
+# JMX endpoint and parser behind each collected metric
+METRIC_SOURCES = {
+    'hdfs_capacity': ('namenode', '_parse_hdfs_capacity'),
+    'hdfs_used': ('namenode', '_parse_hdfs_used'),
+    'mapreduce_jobs': ('historyserver', '_parse_mapreduce_jobs'),
+    'yarn_containers': ('resourcemanager', '_parse_yarn_containers'),
+}
+
+def _find_bean(data, name):
+    for bean in data['beans']:
+        if bean['name'] == name:
+            return bean
+    return None
+
 class HadoopMonitor:
+    """Read cluster health and metrics from the Hadoop JMX endpoints.
+
+    Every metric has a blocking getter for WSGI views and Celery tasks and a
+    coroutine for async views; both share the same parsing.
+    """
+
     def __init__(self):
         self.config = HADOOP_CONFIG
         self.metrics = {}
-        
-    def check_cluster_health(self):
-        """Check overall Hadoop cluster health"""
-        health = {}
-        
-        for service, endpoint in self.config['MONITORING']['cluster_health_check']['endpoints'].items():
+
+    def _endpoint(self, service):
+        return self.config['MONITORING']['cluster_health_check']['endpoints'][service]
+
+    def _fetch(self, endpoint):
+        with span('jmx'):
+            return requests.get(endpoint, timeout=self.config['MONITORING']['collection']['request_timeout'])
+
+    async def _afetch(self, client, endpoint):
+        with span('jmx'):
+            return await client.get(endpoint)
+
+    def _services(self, services=None):
+        endpoints = self.config['MONITORING']['cluster_health_check']['endpoints']
+        return {service: endpoint for service, endpoint in endpoints.items() if services is None or service in services}
+
+    def _metric_services(self):
+        return {
+            METRIC_SOURCES[metric][0]
+            for metric in self.config['MONITORING']['metrics_collection']['metrics'] if metric in METRIC_SOURCES
+        }
+
+    def _jmx_response(self, service, started, response=None, error=None):
+        """What one endpoint fetch returned: status code, parsed payload, error and latency"""
+        latency = time.perf_counter() - started
+        payload = None
+        if response is not None:
+            try:
+                payload = response.json()
+            except ValueError as e:
+                error = error or f"Invalid JSON: {e}"
+        if error is not None:
+            logger.error(f"Failed to fetch {service} JMX: {error}")
+        return {
+            'status_code': response.status_code if response is not None else None,
+            'payload': payload,
+            'error': error,
+            'latency': latency
+        }
+
+    def fetch_endpoints(self, services=None):
+        """Fetch each JMX endpoint once, concurrently, as {service: response}"""
+        endpoints = self._services(services)
+
+        def fetch(service, endpoint):
+            started = time.perf_counter()
+            try:
+                return self._jmx_response(service, started, self._fetch(endpoint))
+            except Exception as e:
+                return self._jmx_response(service, started, error=str(e))
+
+        if len(endpoints) <= 1:
+            return {service: fetch(service, endpoint) for service, endpoint in endpoints.items()}
+        with ThreadPoolExecutor(max_workers=len(endpoints)) as executor:
+            # Copy the context so JMX time still counts against the current request
+            futures = {
+                service: executor.submit(contextvars.copy_context().run, fetch, service, endpoint)
+                for service, endpoint in endpoints.items()
+            }
+        return {service: future.result() for service, future in futures.items()}
+
+    async def afetch_endpoints(self, client, services=None):
+        """Fetch each JMX endpoint once, concurrently, as {service: response}"""
+        async def fetch(service, endpoint):
+            started = time.perf_counter()
             try:
-                response = requests.get(endpoint)
-                if response.status_code == 200:
-                    health[service] = {
-                        'status': 'HEALTHY',
-                        'timestamp': datetime.now().isoformat(),
-                        'metrics': response.json()
-                    }
-                else:
-                    health[service] = {
-                        'status': 'UNHEALTHY',
-                        'timestamp': datetime.now().isoformat(),
-                        'error': f"HTTP {response.status_code}"
-                    }
+                return self._jmx_response(service, started, await self._afetch(client, endpoint))
             except Exception as e:
-                health[service] = {
-                    'status': 'UNHEALTHY',
-                    'timestamp': datetime.now().isoformat(),
-                    'error': str(e)
-                }
-                logger.error(f"Failed to check {service} health: {e}")
-        
+                return self._jmx_response(service, started, error=str(e))
+
+        endpoints = self._services(services)
+        results = await asyncio.gather(*(fetch(service, endpoint) for service, endpoint in endpoints.items()))
+        return dict(zip(endpoints, results))
+
+    def health_from(self, responses):
+        """Cluster health from fetched JMX responses"""
+        health = {}
+        for service, response in responses.items():
+            entry = {'timestamp': datetime.now().isoformat(), 'latency_ms': round(response['latency'] * 1000, 1)}
+            if response['error'] is None and response['status_code'] == 200:
+                entry.update(status='HEALTHY', metrics=response['payload'])
+            else:
+                entry.update(status='UNHEALTHY', error=response['error'] or f"HTTP {response['status_code']}")
+            health[service] = entry
         return health
 
-    def collect_metrics(self):
-        """Collect Hadoop cluster metrics"""
+    def metrics_from(self, responses):
+        """Cluster metrics parsed from fetched JMX responses"""
         metrics = {}
-        
         if not self.config['MONITORING']['metrics_collection']['enabled']:
             return metrics
-            
+
         for metric in self.config['MONITORING']['metrics_collection']['metrics']:
             try:
-                if metric == 'hdfs_capacity':
-                    metrics['hdfs_capacity'] = self._get_hdfs_capacity()
-                elif metric == 'hdfs_used':
-                    metrics['hdfs_used'] = self._get_hdfs_used()
-                elif metric == 'mapreduce_jobs':
-                    metrics['mapreduce_jobs'] = self._get_mapreduce_jobs()
-                elif metric == 'yarn_containers':
-                    metrics['yarn_containers'] = self._get_yarn_containers()
-                elif metric == 'hive_queries':
-                    metrics['hive_queries'] = self._get_hive_queries()
+                if metric == 'hive_queries':
+                    metrics[metric] = self._get_hive_queries()
+                    continue
+                if metric not in METRIC_SOURCES:
+                    continue
+                service, parser = METRIC_SOURCES[metric]
+                response = responses[service]
+                if response['error'] is not None or response['status_code'] != 200:
+                    raise RuntimeError(response['error'] or f"HTTP {response['status_code']}")
+                metrics[metric] = getattr(self, parser)(response['payload'])
             except Exception as e:
                 logger.error(f"Failed to collect {metric} metrics: {e}")
                 metrics[metric] = {'error': str(e)}
-        
         return metrics
 
+    def check_cluster_health(self):
+        """Check overall Hadoop cluster health"""
+        return self.health_from(self.fetch_endpoints())
+
+    async def acheck_cluster_health(self, client):
+        """Check overall Hadoop cluster health, querying all services concurrently"""
+        return self.health_from(await self.afetch_endpoints(client))
+
+    def collect_metrics(self):
+        """Collect Hadoop cluster metrics, fetching each endpoint once"""
+        if not self.config['MONITORING']['metrics_collection']['enabled']:
+            return {}
+        return self.metrics_from(self.fetch_endpoints(self._metric_services()))
+
+    async def acollect_metrics(self, client):
+        """Collect Hadoop cluster metrics, fetching each endpoint once and all of them concurrently"""
+        if not self.config['MONITORING']['metrics_collection']['enabled']:
+            return {}
+        return self.metrics_from(await self.afetch_endpoints(client, self._metric_services()))
+
+    async def aget_metric(self, client, metric):
+        """Fetch and parse a single JMX-backed metric"""
+        service, parser = METRIC_SOURCES[metric]
+        response = await self._afetch(client, self._endpoint(service))
+        return getattr(self, parser)(response.json())
+
+    def _parse_hdfs_capacity(self, data):
+        bean = _find_bean(data, 'Hadoop:service=NameNode,name=FSNamesystemState')
+        if bean:
+            return {
+                'total': bean['CapacityTotal'],
+                'used': bean['CapacityUsed'],
+                'remaining': bean['CapacityRemaining'],
+                'timestamp': datetime.now().isoformat()
+            }
+        return {'error': 'HDFS capacity metrics not found'}
+
+    def _parse_hdfs_used(self, data):
+        bean = _find_bean(data, 'Hadoop:service=NameNode,name=FSNamesystemState')
+        if bean:
+            return {
+                'used': bean['CapacityUsed'],
+                'used_percent': bean['PercentUsed'],
+                'timestamp': datetime.now().isoformat()
+            }
+        return {'error': 'HDFS usage metrics not found'}
+
+    def _parse_mapreduce_jobs(self, data):
+        bean = _find_bean(data, 'Hadoop:service=HistoryServer,name=JobHistoryStatistics')
+        if bean:
+            return {
+                'total_jobs': bean['TotalJobs'],
+                'failed_jobs': bean['FailedJobs'],
+                'successful_jobs': bean['SuccessfulJobs'],
+                'timestamp': datetime.now().isoformat()
+            }
+        return {'error': 'MapReduce job metrics not found'}
+
+    def _parse_yarn_containers(self, data):
+        bean = _find_bean(data, 'Hadoop:service=ResourceManager,name=RMNMInfo')
+        if bean:
+            return {
+                'total_containers': bean['TotalContainers'],
+                'active_containers': bean['ActiveContainers'],
+                'timestamp': datetime.now().isoformat()
+            }
+        return {'error': 'YARN container metrics not found'}
+
     def _get_hdfs_capacity(self):
         """Get HDFS capacity metrics"""
-        endpoint = self.config['MONITORING']['cluster_health_check']['endpoints']['namenode']
-        response = requests.get(endpoint)
-        data = response.json()
-        
-        for bean in data['beans']:
-            if bean['name'] == 'Hadoop:service=NameNode,name=FSNamesystemState':
-                return {
-                    'total': bean['CapacityTotal'],
-                    'used': bean['CapacityUsed'],
-                    'remaining': bean['CapacityRemaining'],
-                    'timestamp': datetime.now().isoformat()
-                }
-        
-        return {'error': 'HDFS capacity metrics not found'}
+        response = self._fetch(self._endpoint('namenode'))
+        return self._parse_hdfs_capacity(response.json())
 
     def _get_hdfs_used(self):
         """Get HDFS usage metrics"""
-        endpoint = self.config['MONITORING']['cluster_health_check']['endpoints']['namenode']
-        response = requests.get(endpoint)
-        data = response.json()
-        
-        for bean in data['beans']:
-            if bean['name'] == 'Hadoop:service=NameNode,name=FSNamesystemState':
-                return {
-                    'used': bean['CapacityUsed'],
-                    'used_percent': bean['PercentUsed'],
-                    'timestamp': datetime.now().isoformat()
-                }
-        
-        return {'error': 'HDFS usage metrics not found'}
+        response = self._fetch(self._endpoint('namenode'))
+        return self._parse_hdfs_used(response.json())
 
     def _get_mapreduce_jobs(self):
         """Get MapReduce job metrics"""
-        endpoint = self.config['MONITORING']['cluster_health_check']['endpoints']['historyserver']
-        response = requests.get(endpoint)
-        data = response.json()
-        
-        for bean in data['beans']:
-            if bean['name'] == 'Hadoop:service=HistoryServer,name=JobHistoryStatistics':
-                return {
-                    'total_jobs': bean['TotalJobs'],
-                    'failed_jobs': bean['FailedJobs'],
-                    'successful_jobs': bean['SuccessfulJobs'],
-                    'timestamp': datetime.now().isoformat()
-                }
-        
-        return {'error': 'MapReduce job metrics not found'}
+        response = self._fetch(self._endpoint('historyserver'))
+        return self._parse_mapreduce_jobs(response.json())
 
     def _get_yarn_containers(self):
         """Get YARN container metrics"""
-        endpoint = self.config['MONITORING']['cluster_health_check']['endpoints']['resourcemanager']
-        response = requests.get(endpoint)
-        data = response.json()
-        
-        for bean in data['beans']:
-            if bean['name'] == 'Hadoop:service=ResourceManager,name=RMNMInfo':
-                return {
-                    'total_containers': bean['TotalContainers'],
-                    'active_containers': bean['ActiveContainers'],
-                    'timestamp': datetime.now().isoformat()
-                }
-        
-        return {'error': 'YARN container metrics not found'}
+        response = self._fetch(self._endpoint('resourcemanager'))
+        return self._parse_yarn_containers(response.json())
 
     def _get_hive_queries(self):
         """Get Hive query metrics"""
@@ -0,0 +1,11 @@
+from rest_framework.pagination import CursorPagination
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Keyset pagination on creation time, newest first.
+
+    Each page is a range scan of the (owner, created_at) index, so listing
+    costs the same whatever the size of a user's history.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 500
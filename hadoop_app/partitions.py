@@ -0,0 +1,143 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from django.db import connection, transaction
+from django.utils import timezone
+from .config import HADOOP_CONFIG
+from .models import HadoopMetric
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = HadoopMetric._meta.db_table
+DEFAULT_PARTITION = f'{PARENT_TABLE}_default'
+PARTITION_PREFIX = f'{PARENT_TABLE}_p'
+
+class MetricPartitionManager:
+    """Keep HadoopMetric time partitions ahead of the clock and drop expired ones.
+
+    On PostgreSQL the metrics table is range-partitioned on timestamp (see
+    migration 0010), so retention is a DROP TABLE per partition instead of a
+    bulk DELETE. Partitions are named after the dates they cover. Rows that
+    land in the default partition get a proper partition on the next run. On
+    other databases retention falls back to deleting old rows.
+    """
+
+    def __init__(self):
+        self.config = HADOOP_CONFIG['MONITORING']['metrics_collection']
+
+    def is_partitioned(self):
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass', [PARENT_TABLE]
+            )
+            return cursor.fetchone() is not None
+
+    def _bounds(self, day):
+        """Start and end date of the partition containing day"""
+        days = self.config['partition_days']
+        start = date.fromordinal(day.toordinal() // days * days)
+        return start, start + timedelta(days=days)
+
+    def _name(self, start, end):
+        return f'{PARTITION_PREFIX}{start:%Y%m%d}_{end:%Y%m%d}'
+
+    def _partitions(self, cursor):
+        """Map partition names to their (start, end) dates"""
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = %s::regclass', [PARENT_TABLE]
+        )
+        partitions = {}
+        for (name,) in cursor.fetchall():
+            if not name.startswith(PARTITION_PREFIX):
+                continue
+            start, end = name[len(PARTITION_PREFIX):].split('_')
+            partitions[name] = (
+                datetime.strptime(start, '%Y%m%d').date(), datetime.strptime(end, '%Y%m%d').date()
+            )
+        return partitions
+
+    def _create_partition(self, cursor, start, end):
+        """Create a partition, moving any of its rows out of the default partition first"""
+        name = self._name(start, end)
+        lower = datetime.combine(start, time.min, tzinfo=dt_timezone.utc)
+        upper = datetime.combine(end, time.min, tzinfo=dt_timezone.utc)
+        with transaction.atomic():
+            cursor.execute(f'CREATE TABLE "{name}" (LIKE "{PARENT_TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+            # Attaching fails while the default partition holds rows of the new range
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+                f'INSERT INTO "{name}" SELECT * FROM moved',
+                [lower, upper]
+            )
+            cursor.execute(
+                f'ALTER TABLE "{PARENT_TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+                [lower, upper]
+            )
+        logger.info(f"Created metric partition {name}")
+        return name
+
+    def ensure_partitions(self, now=None):
+        """Create partitions for the coming periods and for stray rows in the default partition"""
+        now = now or timezone.now()
+        with connection.cursor() as cursor:
+            existing = self._partitions(cursor)
+            covered = set(existing.values())
+
+            wanted = []
+            start, end = self._bounds(now.date())
+            for _ in range(self.config['partitions_ahead'] + 1):
+                wanted.append((start, end))
+                start, end = self._bounds(end)
+
+            # Rows past retention are deleted by drop_expired rather than given a partition
+            cutoff = now - timedelta(days=self.config['retention_days'])
+            cursor.execute(
+                f'SELECT MIN("timestamp"), MAX("timestamp") FROM "{DEFAULT_PARTITION}" WHERE "timestamp" >= %s',
+                [cutoff]
+            )
+            oldest, newest = cursor.fetchone()
+            if oldest is not None:
+                start, end = self._bounds(oldest.date())
+                while start <= newest.date():
+                    wanted.append((start, end))
+                    start, end = self._bounds(end)
+
+            created = []
+            for start, end in sorted(set(wanted)):
+                # Partitions made under a different partition_days may already cover the range
+                if any(start < other_end and other_start < end for other_start, other_end in covered):
+                    continue
+                created.append(self._create_partition(cursor, start, end))
+                covered.add((start, end))
+        return created
+
+    def drop_expired(self, now=None):
+        """Drop partitions older than the retention period, returning how many went.
+
+        Without partitioning the old rows are deleted instead and their count returned.
+        """
+        now = now or timezone.now()
+        cutoff = now - timedelta(days=self.config['retention_days'])
+        if not self.is_partitioned():
+            deleted, _ = HadoopMetric.objects.filter(timestamp__lt=cutoff).delete()
+            return deleted
+
+        dropped = []
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{DEFAULT_PARTITION}" WHERE "timestamp" < %s', [cutoff])
+            for name, (_, end) in sorted(self._partitions(cursor).items()):
+                if end <= cutoff.date():
+                    cursor.execute(f'DROP TABLE "{name}"')
+                    dropped.append(name)
+                    logger.info(f"Dropped expired metric partition {name}")
+        return len(dropped)
+
+    def maintain(self):
+        """Create upcoming partitions and apply retention"""
+        created = self.ensure_partitions() if self.is_partitioned() else []
+        return created, self.drop_expired()
+
+# Singleton instance of the metric partition manager
+metric_partitions = MetricPartitionManager()
@@ -0,0 +1,16 @@
+import json
+from rest_framework.renderers import BaseRenderer
+
+class EventStreamRenderer(BaseRenderer):
+    """Renderer that lets views answer text/event-stream requests"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, (bytes, str)):
+            return data
+        # Errors raised before streaming starts are sent as a single event
+        return f'event: error\ndata: {json.dumps(data)}\n\n'.encode(self.charset)
@@ -1,21 +1,72 @@
 from rest_framework import serializers
-from .models import HDFSFile, HiveQuery, HadoopJob, HadoopMetric
+from .models import HDFSFile, HDFSCompaction, HiveQuery, HadoopJob, HadoopWorkflow, HadoopMetric
 
 class HDFSFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = HDFSFile
         fields = '__all__'
 
+class HDFSFileListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HDFSFile
+        fields = ['id', 'name', 'path', 'size', 'codec', 'created_at', 'owner']
+
+class HDFSCompactionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HDFSCompaction
+        fields = '__all__'
+
+class HDFSCompactionListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HDFSCompaction
+        fields = [
+            'id', 'path', 'status', 'files_before', 'files_after', 'files_merged', 'bytes_merged',
+            'created_at', 'finished_at', 'owner'
+        ]
+
 class HiveQuerySerializer(serializers.ModelSerializer):
     class Meta:
         model = HiveQuery
         fields = '__all__'
 
+class HiveQueryListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HiveQuery
+        fields = ['id', 'query', 'status', 'created_at', 'executed_at', 'owner']
+
 class HadoopJobSerializer(serializers.ModelSerializer):
     class Meta:
         model = HadoopJob
         fields = '__all__'
 
+class HadoopJobListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HadoopJob
+        fields = [
+            'id', 'name', 'job_type', 'status', 'application_id', 'workflow',
+            'created_at', 'started_at', 'finished_at', 'owner'
+        ]
+
+class HadoopWorkflowJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HadoopJob
+        fields = [
+            'id', 'name', 'job_type', 'status', 'application_id', 'dependencies',
+            'started_at', 'finished_at', 'diagnostics'
+        ]
+
+class HadoopWorkflowSerializer(serializers.ModelSerializer):
+    jobs = HadoopWorkflowJobSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = HadoopWorkflow
+        fields = '__all__'
+
+class HadoopWorkflowListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HadoopWorkflow
+        fields = ['id', 'name', 'status', 'max_parallel', 'created_at', 'started_at', 'finished_at', 'owner']
+
 class HadoopMetricSerializer(serializers.ModelSerializer):
     class Meta:
         model = HadoopMetric
@@ -1,39 +1,167 @@
 from celery import shared_task
-from .models import HadoopMetric
-from .monitoring import hadoop_monitor
+from django.utils import timezone
+from .models import HDFSCompaction, HadoopJob
+from .disk_usage import hdfs_disk_usage
+from .compaction import hdfs_compactor
+from .config import HADOOP_CONFIG
+from .yarn import job_submitter, job_status_poller, TERMINAL_STATUSES
+from .workflows import workflow_scheduler
+from .advisor import resource_advisor
+from .job_events import publish_status_changes
+from .partitions import metric_partitions
+from .health_snapshots import health_snapshots
+from .collection import collection_pipeline
+import requests
 import json
+import uuid
 from datetime import datetime
 
+@shared_task
+def run_collection_cycle():
+    """Periodic task running the health and metrics collection pipeline when a cycle is due"""
+    try:
+        result = collection_pipeline.run()
+        if result is None:
+            return f"Successfully skipped collection at {datetime.now()}: not due or already running"
+        return (
+            f"Successfully collected cluster health and {len(result['metrics'])} metrics at {datetime.now()}: "
+            f"{len(result['alerts'])} alerts, next cycle in {result['interval']:.0f}s"
+        )
+    except Exception as e:
+        return f"Error running collection cycle: {str(e)}"
+
 @shared_task
 def collect_metrics():
-    """Periodic task to collect and store Hadoop metrics"""
-    try:
-        metrics = hadoop_monitor.collect_metrics()
-        
-        for metric_type, value in metrics.items():
-            HadoopMetric.objects.create(
-                metric_type=metric_type.upper(),
-                value=value,
-                cluster_name='default'
-            )
-            
-        return f"Successfully collected metrics at {datetime.now()}"
+    """Run a collection cycle now, storing metrics and health from one fetch of each endpoint"""
+    try:
+        result = collection_pipeline.run(force=True)
+        if result is None:
+            return f"Successfully skipped collection at {datetime.now()}: another cycle is running"
+        return f"Successfully collected metrics at {datetime.now()}: {len(result['alerts'])} alerts"
     except Exception as e:
         return f"Error collecting metrics: {str(e)}"
 
 @shared_task
 def check_cluster_health():
-    """Periodic task to check cluster health"""
-    try:
-        health = hadoop_monitor.check_cluster_health()
-        
-        # Store health metrics
-        HadoopMetric.objects.create(
-            metric_type='CLUSTER_HEALTH',
-            value=health,
-            cluster_name='default'
-        )
-        
+    """Run a collection cycle now; kept for existing schedules and manual calls"""
+    try:
+        result = collection_pipeline.run(force=True)
+        if result is None:
+            return f"Successfully skipped health check at {datetime.now()}: another cycle is running"
         return f"Successfully checked cluster health at {datetime.now()}"
     except Exception as e:
         return f"Error checking cluster health: {str(e)}"
+
+@shared_task
+def precompute_disk_usage():
+    """Periodic task to refresh cached HDFS disk usage for top-level directories"""
+    try:
+        refreshed = hdfs_disk_usage.precompute()
+        return f"Successfully precomputed disk usage for {refreshed} paths at {datetime.now()}"
+    except Exception as e:
+        return f"Error precomputing disk usage: {str(e)}"
+
+@shared_task
+def compact_directory(compaction_id):
+    """Merge small files under an HDFS directory into target-sized files"""
+    compaction = HDFSCompaction.objects.get(pk=compaction_id)
+    try:
+        hdfs_compactor.compact(compaction)
+        return (
+            f"Successfully compacted {compaction.path}: "
+            f"{compaction.files_before} -> {compaction.files_after} files"
+        )
+    except Exception as e:
+        compaction.status = 'FAILED'
+        compaction.error = str(e)
+        compaction.finished_at = timezone.now()
+        compaction.save()
+        return f"Error compacting {compaction.path}: {str(e)}"
+
+@shared_task(
+    bind=True,
+    autoretry_for=(requests.ConnectionError, requests.Timeout),
+    retry_backoff=True,
+    max_retries=HADOOP_CONFIG['MAPREDUCE']['submission']['max_retries']
+)
+def submit_job(self, job_id):
+    """Submit a pending Hadoop job to the YARN ResourceManager"""
+    # Claiming a pending job starts a new attempt with its own application tag; retries and
+    # redelivered messages resume an attempt still in SUBMITTING, and submit() reuses its
+    # application id so YARN only runs it once
+    claimed = (
+        HadoopJob.objects.filter(pk=job_id, status='PENDING').update(status='SUBMITTING', submission_id=uuid.uuid4())
+        or HadoopJob.objects.filter(pk=job_id, status='SUBMITTING').exists()
+    )
+    if not claimed:
+        return f"Job {job_id} is no longer pending"
+
+    job = HadoopJob.objects.get(pk=job_id)
+    try:
+        application_id = job_submitter.submit(job)
+        return f"Successfully submitted job {job_id} as {application_id}"
+    except (requests.ConnectionError, requests.Timeout):
+        if self.request.retries >= self.max_retries:
+            _fail_submission(job, "ResourceManager unreachable")
+        raise
+    except Exception as e:
+        _fail_submission(job, str(e))
+        return f"Error submitting job {job_id}: {str(e)}"
+
+def _fail_submission(job, error):
+    job.status = 'FAILED'
+    job.diagnostics = error
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'diagnostics', 'finished_at'])
+    publish_status_changes([job])
+    if job.workflow_id:
+        advance_workflow.delay(job.workflow_id)
+
+@shared_task
+def poll_job_statuses():
+    """Periodic task to sync active Hadoop job statuses with YARN"""
+    try:
+        changed = job_status_poller.poll()
+        workflows = {job.workflow_id for job in changed if job.workflow_id and job.status in TERMINAL_STATUSES}
+        for workflow_id in workflows:
+            advance_workflow.delay(workflow_id)
+        for job in changed:
+            if job.status == 'SUCCEEDED':
+                record_job_usage.delay(job.pk)
+        return f"Successfully polled job statuses at {datetime.now()}: {len(changed)} changed"
+    except Exception as e:
+        return f"Error polling job statuses: {str(e)}"
+
+@shared_task
+def advance_workflow(workflow_id):
+    """Start every workflow job whose dependencies have succeeded"""
+    try:
+        job_ids = workflow_scheduler.advance(workflow_id)
+        for job_id in job_ids:
+            submit_job.delay(job_id)
+        return f"Successfully advanced workflow {workflow_id}: started {len(job_ids)} jobs"
+    except Exception as e:
+        return f"Error advancing workflow {workflow_id}: {str(e)}"
+
+@shared_task
+def record_job_usage(job_id):
+    """Record the resources a finished job used so future submissions can be sized"""
+    try:
+        job = HadoopJob.objects.get(pk=job_id)
+        usage = resource_advisor.collect_usage(job)
+        return f"Successfully recorded usage of job {job_id}: {usage['runtime']:.0f}s"
+    except Exception as e:
+        return f"Error recording usage of job {job_id}: {str(e)}"
+
+@shared_task
+def maintain_metric_partitions():
+    """Periodic task to create upcoming metric partitions and drop expired ones"""
+    try:
+        created, expired = metric_partitions.maintain()
+        snapshots = health_snapshots.drop_expired()
+        return (
+            f"Successfully maintained metric partitions: created {len(created)}, expired {expired}, "
+            f"expired health snapshots {snapshots}"
+        )
+    except Exception as e:
+        return f"Error maintaining metric partitions: {str(e)}"
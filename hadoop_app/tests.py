@@ -1,3 +1,1194 @@
-from django.test import TestCase
+import io
+import json
+import os
+import pickle
+import posixpath
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock, skipIf
+import requests
+from asgiref.sync import sync_to_async
+from hdfs.util import HdfsError
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache, RedisCacheClient
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from hadoop_project.celery import app as celery_app
+from .advisor import resource_advisor
+from .alerts import AlertEngine, RollingWindow, alert_engine
+from .authentication import token_cache
+from .benchmark import compare, summarize
+from .fake_cluster import FakeHadoopCluster
+from .instrumentation import request_histograms
+from .job_events import await_status_change, publish_status_changes, status_event_stream
+from .job_logs import CACHE_SIZE_KEY, job_log_fetcher
+from .models import HDFSCompaction, HDFSContent, HDFSFile, HiveQuery, HadoopJob, HadoopMetric, HadoopWorkflow, HealthSnapshot, JobResourceProfile
+from .disk_usage import hdfs_disk_usage
+from .compression import SNAPPY_BLOCK_SIZE, snappy
+from .collection import LOCK_KEY, RELEASE_SCRIPT, collection_pipeline
+from .clients import TracedInsecureClient, get_hdfs_client
+from .config import HADOOP_CONFIG
+from .deduplication import register_content
+from .health_snapshots import apply_delta, diff, health_snapshots
+from .tasks import collect_metrics, poll_job_statuses, precompute_disk_usage, submit_job
+from .workflows import topological_order, workflow_scheduler
+from .yarn import APPLICATION_TAG, ResourceManagerClient, job_status_poller, job_submitter, job_tag, prepare_job_configuration
 
-# Create your tests here.
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FakeClusterTestCase(TestCase):
+    """Runs the API against a fake Hadoop cluster with Celery tasks executed inline"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.cluster = FakeHadoopCluster(app_runtime=0.2).start()
+        cls.addClassCleanup(cls.cluster.stop)
+        celery_app.conf.task_always_eager = True
+        cls.addClassCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+class HDFSFileAPITests(FakeClusterTestCase):
+    def upload(self, name, data, codec=''):
+        upload = io.BytesIO(data)
+        upload.name = name
+        return self.api.post('/api/hdfs-files/upload/', {'file': upload, 'codec': codec}, format='multipart')
+
+    def test_upload_download_roundtrip(self):
+        data = b'id,value\n' + b'1,2\n' * 1000
+        response = self.upload('data.csv', data, codec='gzip')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['original_size'], len(data))
+        self.assertLess(response.data['size'], len(data))
+        self.assertIn('/user/alice/data.csv.gz', self.cluster.namenode.files)
+
+        response = self.api.get(f"/api/hdfs-files/{response.data['id']}/download/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), data)
+
+    @skipIf(snappy is None, 'python-snappy is not installed')
+    def test_snappy_uploads_use_the_hadoop_block_format(self):
+        data = bytes(range(256)) * 2500
+        response = self.upload('blocks.bin', data, codec='snappy')
+        self.assertEqual(response.status_code, 201, response.data)
+        stored, _ = self.cluster.namenode.files['/user/alice/blocks.bin.snappy']
+        # Blocks of at most 256 KiB, each prefixed with its uncompressed length, as SnappyCodec expects
+        self.assertEqual(int.from_bytes(stored[:4], 'big'), SNAPPY_BLOCK_SIZE)
+        self.assertEqual(snappy.HadoopStreamDecompressor().decompress(stored), data)
+
+        response = self.api.get(f"/api/hdfs-files/{response.data['id']}/download/")
+        self.assertEqual(b''.join(response.streaming_content), data)
+
+    def test_duplicate_upload_is_not_written_again(self):
+        self.assertFalse(self.upload('a.csv', b'same content').data['deduplicated'])
+        response = self.upload('b.csv', b'same content')
+        self.assertTrue(response.data['deduplicated'])
+        self.assertNotIn('/user/alice/b.csv', self.cluster.namenode.files)
+
+    def test_content_is_not_shared_between_users(self):
+        self.upload('shared.csv', b'shared content')
+        bob = User.objects.create_user('bob', password='secret')
+        self.api.force_authenticate(bob)
+        response = self.upload('shared.csv', b'shared content')
+        self.assertFalse(response.data['deduplicated'])
+        self.assertEqual(HDFSFile.objects.get(owner=bob).path, '/user/bob/shared.csv')
+        self.assertIn('/user/bob/shared.csv', self.cluster.namenode.files)
+        self.assertEqual(HDFSContent.objects.filter(digest=HDFSContent.objects.first().digest).count(), 2)
+
+    def test_losing_register_race_removes_the_extra_copy(self):
+        self.upload('raced.csv', b'raced content')
+        content = HDFSContent.objects.get()
+        client = get_hdfs_client()
+        client.write('/user/alice/copy.csv', data=b'raced content')
+        winner = register_content(client, content.digest, '', '/user/alice/copy.csv', 13, 13, self.user)
+        self.assertEqual(winner, content)
+        self.assertNotIn('/user/alice/copy.csv', self.cluster.namenode.files)
+
+    def test_list_directory(self):
+        self.upload('listed.csv', b'x')
+        response = self.api.get('/api/hdfs-files/list_directory/', {'path': '/user/alice'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_directory'])
+        self.assertIn('listed.csv', response.data['contents'])
+
+        response = self.api.get('/api/hdfs-files/list_directory/', {'path': '/user/nobody'})
+        self.assertFalse(response.data['exists'])
+
+    def test_list_is_paginated_by_cursor(self):
+        HDFSFile.objects.bulk_create(
+            HDFSFile(name=f'f{i}', path=f'/user/alice/f{i}', size=i, owner=self.user) for i in range(5)
+        )
+        response = self.api.get('/api/hdfs-files/', {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        response = self.api.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+
+class DiskUsageTests(FakeClusterTestCase):
+    ROOT = '/du-tree'
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # The fake NameNode outlives each test
+        namenode = self.cluster.namenode
+        for entries in (namenode.files, namenode.dirs):
+            for path in [path for path in entries if path.startswith(self.ROOT)]:
+                del entries[path]
+        files = {'a/x': 60, 'a/w': 40, 'b/y': 300, 'b/c/z': 50}
+        for name, size in files.items():
+            path = f'{self.ROOT}/{name}'
+            self.cluster.namenode.files[path] = (b'x' * size, 0)
+            self.cluster.namenode._makedirs(posixpath.dirname(path))
+        self.cluster.namenode.hits.clear()
+        # The tree lies outside alice's home directory
+        self.user.is_staff = True
+        self.user.save()
+
+    def hits(self, directory=''):
+        return self.cluster.namenode.hits[f'/webhdfs/v1{self.ROOT}{directory}']
+
+    def test_tree_fans_out_one_level_at_a_time(self):
+        with mock.patch('hadoop_app.disk_usage.ThreadPoolExecutor', wraps=ThreadPoolExecutor) as pool:
+            response = self.api.get('/api/hdfs-files/disk_usage/', {'path': self.ROOT, 'depth': 2})
+        self.assertEqual(response.status_code, 200, response.data)
+        tree = response.data
+        self.assertEqual((tree['length'], tree['file_count'], tree['directory_count']), (450, 4, 4))
+        # Children come largest first
+        self.assertEqual([child['path'] for child in tree['children']], [f'{self.ROOT}/b', f'{self.ROOT}/a'])
+        self.assertEqual([child['length'] for child in tree['children'][0]['children']], [50])
+        self.assertNotIn('children', tree['children'][0]['children'][0])
+        # One pool per level, sized to the directories of that level
+        self.assertEqual([call.kwargs['max_workers'] for call in pool.call_args_list], [1, 2, 1])
+        # A summary and a listing per directory above the last level, only a summary below it
+        self.assertEqual([self.hits(), self.hits('/a'), self.hits('/b'), self.hits('/b/c')], [2, 2, 2, 1])
+
+    def test_tree_is_cached_until_the_ttl_or_a_refresh(self):
+        with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            first = hdfs_disk_usage.tree(self.ROOT, depth=1)
+        timeouts = {call.kwargs['timeout'] for call in set_many.call_args_list}
+        self.assertEqual(timeouts, {HADOOP_CONFIG['HDFS']['disk_usage']['cache_ttl']})
+        self.cluster.namenode.hits.clear()
+        self.assertEqual(hdfs_disk_usage.tree(self.ROOT, depth=1), first)
+        self.assertEqual(sum(self.cluster.namenode.hits.values()), 0)
+
+        self.cluster.namenode.files[f'{self.ROOT}/a/new'] = (b'x' * 1000, 0)
+        self.assertEqual(hdfs_disk_usage.tree(self.ROOT, depth=1)['length'], 450)
+        response = self.api.get('/api/hdfs-files/disk_usage/', {'path': self.ROOT, 'refresh': 'true'})
+        self.assertEqual(response.data['length'], 1450)
+        self.assertEqual(self.hits('/a'), 1)
+
+    def test_users_only_see_the_cached_usage_of_their_home(self):
+        self.user.is_staff = False
+        self.user.save()
+        for params in ({'path': self.ROOT}, {'path': '/user/alice/../bob'}, {'refresh': 'true'}):
+            response = self.api.get('/api/hdfs-files/disk_usage/', params)
+            self.assertEqual(response.status_code, 403, params)
+        self.assertEqual(sum(self.cluster.namenode.hits.values()), 0)
+        self.cluster.namenode._makedirs('/user/alice')
+        response = self.api.get('/api/hdfs-files/disk_usage/', {'path': '/user/alice/'})
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_precompute_refreshes_the_configured_paths(self):
+        hdfs_disk_usage.tree(self.ROOT, depth=1)
+        self.cluster.namenode.files[f'{self.ROOT}/b/new'] = (b'x' * 1000, 0)
+        with mock.patch.dict(hdfs_disk_usage.config, {'precompute_paths': [self.ROOT, '/du-missing'], 'precompute_depth': 1}), \
+                self.assertLogs('hadoop_app.disk_usage', 'ERROR'):
+            self.assertIn('for 1 paths', precompute_disk_usage())
+        self.cluster.namenode.hits.clear()
+        tree = hdfs_disk_usage.tree(self.ROOT, depth=1)
+        self.assertEqual((tree['length'], tree['children'][0]['length']), (1450, 1350))
+        self.assertEqual(sum(self.cluster.namenode.hits.values()), 0)
+
+class CompactionTests(FakeClusterTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = get_hdfs_client()
+
+    def write_files(self, directory, owners):
+        """Write one small CSV per owner into a fresh directory and track it"""
+        for index, owner in enumerate(owners):
+            path = f'{directory}/part-{index}.csv'
+            self.client.write(path, data=f'id\n{index}\n'.encode(), overwrite=True)
+            HDFSFile.objects.create(name=posixpath.basename(path), path=path, size=5, owner=owner)
+
+    def compact(self, directory, **data):
+        response = self.api.post('/api/hdfs-files/compact/', {'path': directory, **data}, format='json')
+        self.assertEqual(response.status_code, 202, response.data)
+        return HDFSCompaction.objects.get(pk=response.data['id'])
+
+    def test_merges_through_staging_and_swaps_with_renames(self):
+        directory = '/user/alice/compact-swap'
+        self.write_files(directory, [self.user] * 3)
+        calls = []
+        rename = TracedInsecureClient.rename
+
+        def record_rename(client, source, destination):
+            calls.append((source, destination))
+            return rename(client, source, destination)
+
+        with mock.patch.object(TracedInsecureClient, 'rename', autospec=True, side_effect=record_rename):
+            compaction = self.compact(directory, skip_header='true')
+        self.assertEqual((compaction.status, compaction.files_merged, compaction.files_after), ('COMPLETED', 3, 1))
+
+        staging = f'{directory}/_compaction-{compaction.pk}'
+        output = f'{directory}/compacted-{compaction.pk}-00000'
+        # Originals move aside first, then the staged output moves in
+        self.assertEqual(calls[:3], [(f'{directory}/part-{i}.csv', f'{staging}/originals/part-{i}.csv') for i in range(3)])
+        self.assertEqual(calls[3:], [(f'{staging}/compacted-{compaction.pk}-00000', output)])
+        self.assertEqual(self.client.list(directory), [posixpath.basename(output)])
+        with self.client.read(output) as reader:
+            self.assertEqual(reader.read(), b'id\n0\n1\n2\n')
+        self.assertEqual(list(HDFSFile.objects.filter(path__startswith=directory).values_list('path', flat=True)), [output])
+
+    def test_skip_header_false_keeps_headers(self):
+        directory = '/user/alice/compact-headers'
+        self.write_files(directory, [self.user] * 2)
+        compaction = self.compact(directory, skip_header='false')
+        self.assertFalse(compaction.skip_header)
+        with self.client.read(f'{directory}/compacted-{compaction.pk}-00000') as reader:
+            self.assertEqual(reader.read(), b'id\n0\nid\n1\n')
+
+    def test_outputs_keep_their_sources_owner(self):
+        directory = '/user/alice/compact-owners'
+        bob = User.objects.create_user('bob')
+        self.write_files(directory, [self.user, bob, self.user, bob])
+        compaction = self.compact(directory)
+        self.assertEqual(compaction.files_after, 2)
+        outputs = HDFSFile.objects.filter(path__startswith=f'{directory}/compacted-')
+        self.assertEqual(sorted(outputs.values_list('owner__username', flat=True)), ['alice', 'bob'])
+        for output in outputs:
+            with self.client.read(output.path) as reader:
+                expected = b'id\n0\nid\n2\n' if output.owner == self.user else b'id\n1\nid\n3\n'
+                self.assertEqual(reader.read(), expected)
+
+    def test_failed_swap_restores_the_originals(self):
+        directory = '/user/alice/compact-rollback'
+        self.write_files(directory, [self.user] * 3)
+        rename = TracedInsecureClient.rename
+
+        def fail_on_output(client, source, destination):
+            if '/compacted-' in destination:
+                raise HdfsError('NameNode went away')
+            return rename(client, source, destination)
+
+        with mock.patch.object(TracedInsecureClient, 'rename', autospec=True, side_effect=fail_on_output):
+            compaction = self.compact(directory)
+        compaction.refresh_from_db()
+        self.assertEqual(compaction.status, 'FAILED')
+        self.assertEqual(self.client.list(directory), ['part-0.csv', 'part-1.csv', 'part-2.csv'])
+        self.assertEqual(HDFSFile.objects.filter(path__startswith=directory).count(), 3)
+
+class HiveQueryAPITests(FakeClusterTestCase):
+    def test_execute(self):
+        response = self.api.post('/api/hive-queries/execute/', {'query': 'SELECT * FROM sample LIMIT 2'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['status'], 'COMPLETED')
+        self.assertEqual(HiveQuery.objects.get().result, str([('0', 'row-0'), ('1', 'row-1')]))
+
+    def test_create_and_list_tables(self):
+        response = self.api.post('/api/hive-queries/create_table/', {
+            'table_name': 'events', 'hdfs_path': '/data/events', 'columns': ['id', 'payload']
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.cluster.hiveserver.tables['events'][0], ['id', 'payload'])
+
+        response = self.api.get('/api/hive-queries/get_tables/')
+        self.assertIn('events', response.data['tables'])
+
+class MonitoringAPITests(FakeClusterTestCase):
+    def test_metrics(self):
+        self.cluster.namenode.files['/data'] = (b'x' * 100, 0)
+        response = self.api.get('/api/monitoring/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['hdfs_capacity']['used'], 100)
+        self.assertIn('yarn_containers', response.data)
+
+    def test_cluster_health(self):
+        response = self.api.get('/api/monitoring/cluster_health/')
+        self.assertEqual({entry['status'] for entry in response.data.values()}, {'HEALTHY'})
+
+    def test_async_metrics_with_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        response = client.get('/api/async/monitoring/hdfs_capacity/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('total', response.json())
+        self.assertEqual(APIClient().get('/api/async/monitoring/metrics/').status_code, 401)
+
+class HadoopJobTests(FakeClusterTestCase):
+    def setUp(self):
+        super().setUp()
+        # Job ids restart with every test, and so would their application tags
+        self.cluster.resourcemanager.apps.clear()
+        self.cluster.resourcemanager.submissions = 0
+
+    def test_submit_and_poll_until_finished(self):
+        response = self.api.post('/api/hadoop-jobs/submit/', {
+            'configuration': {'type': 'HIVE', 'name': 'count rows', 'query': 'SELECT COUNT(*) FROM sample'}
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        job = HadoopJob.objects.get(pk=response.data['id'])
+        self.assertIsNotNone(job.application_id)
+        self.assertIn(job.application_id, self.cluster.resourcemanager.apps)
+
+        time.sleep(0.3)
+        poll_job_statuses()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'SUCCEEDED')
+        self.assertIsNotNone(job.finished_at)
+
+    def test_poll_keeps_a_concurrent_kill(self):
+        response = self.api.post('/api/hadoop-jobs/submit/', {
+            'configuration': {'type': 'HIVE', 'name': 'killed', 'query': 'SELECT 1'}
+        }, format='json')
+        job = HadoopJob.objects.get(pk=response.data['id'])
+        time.sleep(0.3)
+        applications = job_submitter.client.applications
+
+        def kill_during_poll(**params):
+            HadoopJob.objects.filter(pk=job.pk).update(status='KILLED')
+            return applications(**params)
+
+        with mock.patch.object(job_submitter.client, 'applications', side_effect=kill_during_poll):
+            self.assertEqual(job_status_poller.poll(), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'KILLED')
+
+    def test_invalid_configuration(self):
+        response = self.api.post('/api/hadoop-jobs/submit/', {'configuration': {'type': 'HIVE'}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def submit_with(self, submit_application):
+        client = job_submitter.client
+        with mock.patch.object(client, 'submit_application', side_effect=submit_application.__get__(client)):
+            response = self.api.post('/api/hadoop-jobs/submit/', {
+                'configuration': {'type': 'HIVE', 'name': 'once', 'query': 'SELECT 1'}
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        job = HadoopJob.objects.get(pk=response.data['id'])
+        apps = [app for app in self.cluster.resourcemanager.apps.values() if job_tag(job) in app['applicationTags']]
+        self.assertEqual([app['id'] for app in apps], [job.application_id])
+        self.assertEqual(self.cluster.resourcemanager.submissions, 1)
+        self.assertEqual(job.status, "SUBMITTED", job.diagnostics)
+
+    def test_redelivered_message_during_submission_submits_once(self):
+        submit = ResourceManagerClient.submit_application
+        redelivered = []
+
+        def submit_application(client, context):
+            if not redelivered:
+                # The message comes back to another worker while this one is still submitting
+                redelivered.append(None)
+                redelivered[0] = submit_job(HadoopJob.objects.get().pk)
+            submit(client, context)
+
+        self.submit_with(submit_application)
+        self.assertIn('Successfully submitted', redelivered[0])
+
+    def test_applications_of_other_deployments_are_not_adopted(self):
+        # Another instance sharing the ResourceManager submitted its job with the same id
+        client = job_submitter.client
+        foreign = client.new_application()['application-id']
+        next_id = HadoopJob.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        client.submit_application({
+            'application-id': foreign, 'application-name': 'other',
+            'application-tags': {'tag': [APPLICATION_TAG, f'{APPLICATION_TAG}-job-{next_id + 1}']}
+        })
+        response = self.api.post('/api/hadoop-jobs/submit/', {
+            'configuration': {'type': 'HIVE', 'name': 'mine', 'query': 'SELECT 1'}
+        }, format='json')
+        job = HadoopJob.objects.get(pk=response.data['id'])
+        self.assertEqual(job.pk, next_id + 1)
+        self.assertNotEqual(job.application_id, foreign)
+        self.assertEqual(self.cluster.resourcemanager.submissions, 2)
+        self.assertEqual([app['id'] for app in client.applications(applicationTags=job_tag(job))], [job.application_id])
+
+    def test_resumed_workflow_runs_the_failed_job_again(self):
+        response = self.api.post('/api/hadoop-workflows/submit/', {'jobs': [
+            {'key': 'load', 'configuration': {'type': 'HIVE', 'query': 'SELECT 1'}}
+        ]}, format='json')
+        workflow = HadoopWorkflow.objects.get(pk=response.data['id'])
+        job = workflow.jobs.get()
+        job_submitter.client.kill_application(job.application_id)
+        poll_job_statuses()
+        workflow.refresh_from_db()
+        self.assertEqual(workflow.status, 'FAILED')
+        first = job.application_id
+
+        self.assertEqual(self.api.post(f'/api/hadoop-workflows/{workflow.pk}/resume/').status_code, 200)
+        job.refresh_from_db()
+        self.assertNotEqual(job.application_id, first)
+        self.assertEqual(self.cluster.resourcemanager.submissions, 2)
+        time.sleep(0.3)
+        poll_job_statuses()
+        job.refresh_from_db()
+        workflow.refresh_from_db()
+        self.assertEqual((job.status, workflow.status), ('SUCCEEDED', 'SUCCEEDED'))
+
+    def test_retry_after_accepted_timeout_submits_once(self):
+        submit = ResourceManagerClient.submit_application
+        calls = []
+
+        def submit_application(client, context):
+            calls.append(context['application-id'])
+            submit(client, context)
+            if len(calls) == 1:
+                raise requests.Timeout('ResourceManager accepted the application but the response was lost')
+
+        self.submit_with(submit_application)
+        self.assertEqual(len(calls), 1)
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class JobEventTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.jobs = [
+            HadoopJob.objects.create(name=f'job {i}', job_type='HIVE', configuration={}, status='RUNNING', owner=self.user)
+            for i in range(3)
+        ]
+        patcher = mock.patch.dict(HADOOP_CONFIG['MAPREDUCE']['notifications'], {'check_interval': 0.01})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_long_poll_and_stream_are_served_in_process_under_wsgi(self):
+        job = self.jobs[0]
+        job.status = 'SUCCEEDED'
+        publish_status_changes([job])
+        response = self.api.get(f'/api/hadoop-jobs/{job.pk}/status/', {'wait': 5, 'known': 'RUNNING'})
+        self.assertEqual((response.status_code, response.data), (200, {'status': 'SUCCEEDED'}))
+        with mock.patch.dict(HADOOP_CONFIG['MAPREDUCE']['notifications'], {'stream_timeout': 0.05}):
+            response = self.api.get('/api/hadoop-jobs/events/', HTTP_ACCEPT='text/event-stream')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'retry:'))
+
+    async def test_long_poll_and_stream_move_to_the_async_endpoints_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        job = self.jobs[0]
+        response = await self.async_client.get(f'/api/hadoop-jobs/{job.pk}/status/', {'wait': 5, 'known': 'RUNNING'})
+        self.assertEqual(response.status_code, 307)
+        self.assertEqual(response['Location'], f'/api/async/hadoop-jobs/{job.pk}/status/?wait=5&known=RUNNING')
+        response = await self.async_client.get(f'/api/hadoop-jobs/{job.pk}/status/')
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get('/api/hadoop-jobs/events/', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual((response.status_code, response['Location']), (307, '/api/async/hadoop-jobs/events/'))
+
+    def test_long_poll_returns_at_once_for_skipped_jobs(self):
+        job = self.jobs[0]
+        HadoopJob.objects.filter(pk=job.pk).update(status='UPSTREAM_FAILED')
+        response = self.api.get(f'/api/hadoop-jobs/{job.pk}/status/', {'wait': 5})
+        self.assertEqual((response.status_code, response.data), (200, {'status': 'UPSTREAM_FAILED'}))
+
+    async def test_long_poll_returns_on_change(self):
+        job = self.jobs[0]
+        job.status = 'SUCCEEDED'
+        publish_status_changes([job])
+        self.assertEqual(await await_status_change(job, 'RUNNING', 5), 'SUCCEEDED')
+
+    async def test_stream_reads_only_the_changed_jobs(self):
+        stream = status_event_stream(self.user)
+        self.assertTrue((await anext(stream)).startswith('retry:'))
+        job = self.jobs[1]
+        job.status = 'SUCCEEDED'
+        await HadoopJob.objects.filter(pk=job.pk).aupdate(status='SUCCEEDED')
+        publish_status_changes([job])
+        with mock.patch('hadoop_app.job_events._snapshot') as snapshot:
+            event = await anext(stream)
+        snapshot.assert_not_called()
+        self.assertEqual(event, f'event: status\ndata: {json.dumps({"id": job.pk, "status": "SUCCEEDED"})}\n\n')
+        await stream.aclose()
+
+    async def test_async_stream_is_timed_until_it_closes(self):
+        await self.async_client.aforce_login(self.user)
+        with mock.patch.dict(HADOOP_CONFIG['MAPREDUCE']['notifications'], {'stream_timeout': 0.05}), \
+                mock.patch.dict(request_histograms.config, {'sample_rate': 1.0}), \
+                mock.patch.object(request_histograms, 'record') as record:
+            response = await self.async_client.get('/api/async/hadoop-jobs/events/')
+            record.assert_not_called()
+            self.assertTrue(b''.join([chunk async for chunk in response.streaming_content]).startswith(b'retry:'))
+            await sync_to_async(response.close)()
+        self.assertEqual(record.call_count, 1)
+        self.assertGreaterEqual(record.call_args.args[1], 0.05)
+
+    def test_keys_expire(self):
+        publish_status_changes(self.jobs)
+        with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            publish_status_changes(self.jobs[:1])
+        self.assertEqual(set_many.call_args.kwargs['timeout'], HADOOP_CONFIG['MAPREDUCE']['notifications']['key_ttl'])
+
+class JobLogTests(FakeClusterTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        patcher = mock.patch.dict(HADOOP_CONFIG['MAPREDUCE']['logs'], {'cache_dir': cache_dir, 'follow_interval': 0.05})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        response = self.api.post('/api/hadoop-jobs/submit/', {
+            'configuration': {'type': 'HIVE', 'name': 'logged', 'query': 'SELECT 1'}
+        }, format='json')
+        self.job = HadoopJob.objects.get(pk=response.data['id'])
+        self.container = f"container_{self.job.application_id[len('application_'):]}_01_000001"
+        self.log = f'Log of {self.container}\n'.encode() * 10
+
+    def read(self, **params):
+        response = self.api.get(f'/api/hadoop-jobs/{self.job.pk}/logs/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def finish(self):
+        HadoopJob.objects.filter(pk=self.job.pk).update(status='SUCCEEDED')
+
+    def test_ranges_of_a_running_job(self):
+        self.assertEqual(self.read(), self.log)
+        self.assertEqual(self.read(offset=5, length=10), self.log[5:15])
+        self.assertEqual(self.read(tail=20), self.log[-20:])
+
+    def test_follow_stops_when_the_job_finishes(self):
+        response = self.api.get(f'/api/hadoop-jobs/{self.job.pk}/logs/', {'follow': 'true'})
+        # The body streams lazily; the job finishes while it is being followed
+        self.finish()
+        self.assertEqual(b''.join(response.streaming_content), self.log)
+
+    def test_synchronous_follow_is_capped(self):
+        with mock.patch.dict(HADOOP_CONFIG['MAPREDUCE']['logs'], {'sync_follow_timeout': 0.1}):
+            response = self.api.get(f'/api/hadoop-jobs/{self.job.pk}/logs/', {'follow': 'true', 'offset': 5})
+            self.assertEqual(b''.join(response.streaming_content), self.log[5:])
+
+    async def test_follow_moves_to_the_async_endpoint_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(f'/api/hadoop-jobs/{self.job.pk}/logs/', {'follow': 'true', 'tail': 20})
+        self.assertEqual(response.status_code, 307)
+        self.assertEqual(response['Location'], f'/api/async/hadoop-jobs/{self.job.pk}/logs/?follow=true&tail=20')
+
+        response = await self.async_client.get(response['Location'])
+        self.assertEqual(response.status_code, 200)
+        # The body streams lazily; the job finishes while it is being followed
+        await HadoopJob.objects.filter(pk=self.job.pk).aupdate(status='SUCCEEDED')
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), self.log[-20:])
+        response = await self.async_client.get(f'/api/async/hadoop-jobs/{self.job.pk}/logs/', {'offset': 5})
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), self.log[5:])
+        response = await self.async_client.get(f'/api/async/hadoop-jobs/{self.job.pk}/logs/', {'file': '../secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_finished_job_is_served_from_the_cache(self):
+        self.finish()
+        self.assertEqual(self.read(offset=5, length=10), self.log[5:15])
+        hits = dict(self.cluster.resourcemanager.hits)
+        self.assertEqual(self.read(tail=20), self.log[-20:])
+        self.assertEqual(self.read(file='stdout'), self.log)
+        self.assertEqual(dict(self.cluster.resourcemanager.hits), hits)
+
+    def test_least_recently_read_logs_are_evicted(self):
+        self.finish()
+        with mock.patch.dict(HADOOP_CONFIG['MAPREDUCE']['logs'], {'cache_max_bytes': len(self.log) * 2}):
+            self.read(file='stdout')
+            self.read(file='stderr')
+            cached = job_log_fetcher._cache_path(self.job, self.container, 'stdout')
+            os.utime(cached, (0, 0))
+            self.read(file='syslog')
+        self.assertFalse(cached.exists())
+        self.assertTrue(cached.with_name('stderr').exists())
+        self.assertEqual(cache.get(CACHE_SIZE_KEY), len(self.log) * 2)
+
+class InstrumentationTests(FakeClusterTestCase):
+    def setUp(self):
+        super().setUp()
+        request_histograms.endpoints.clear()
+        patcher = mock.patch.dict(request_histograms.config, {'sample_rate': 1.0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_server_timing_breaks_down_backends(self):
+        response = self.api.get('/api/hdfs-files/list_directory/', {'path': '/'})
+        self.assertRegex(response['Server-Timing'], r'^hdfs;desc="2 calls";dur=[\d.]+, total;dur=[\d.]+$')
+
+        response = self.api.post('/api/hive-queries/execute/', {'query': 'SHOW TABLES'}, format='json')
+        self.assertIn('db;desc="1 calls"', response['Server-Timing'])
+        self.assertIn('hive;', response['Server-Timing'])
+        response = self.api.get('/api/monitoring/hdfs_capacity/')
+        self.assertIn('jmx;desc="1 calls"', response['Server-Timing'])
+
+    def test_report_is_admin_only(self):
+        self.api.get('/api/monitoring/metrics/')
+        self.assertEqual(self.api.get('/api/monitoring/instrumentation/').status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        report = self.api.get('/api/monitoring/instrumentation/').data
+        entry = report['endpoints']['GET monitoring-metrics']
+        self.assertEqual(entry['count'], 1)
+        self.assertEqual(entry['spans']['jmx']['count'], 1)
+        self.assertIn('GET monitoring-instrumentation', report['endpoints'])
+
+    def test_unsampled_requests_are_counted_without_spans(self):
+        with mock.patch.dict(request_histograms.config, {'sample_rate': 0}):
+            response = self.api.get('/api/monitoring/metrics/')
+        self.assertNotIn('Server-Timing', response)
+        entry = request_histograms.endpoints['GET monitoring-metrics']
+        self.assertEqual((entry['requests']['count'], entry['traced']), (1, 0))
+
+    def test_streams_are_traced_until_they_close(self):
+        path = '/user/alice/streamed.csv'
+        self.cluster.namenode.files[path] = (b'x' * 10, 0)
+        hdfs_file = HDFSFile.objects.create(name='streamed.csv', path=path, size=10, owner=self.user)
+        response = self.api.get(f'/api/hdfs-files/{hdfs_file.pk}/download/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotIn('GET hdfsfile-download', request_histograms.endpoints)
+
+        self.assertEqual(b''.join(response.streaming_content), b'x' * 10)
+        response.close()
+        entry = request_histograms.endpoints['GET hdfsfile-download']
+        self.assertEqual((entry['requests']['count'], entry['traced']), (1, 1))
+        # The WebHDFS read happens while the body streams, after the view returned
+        self.assertEqual(entry['spans']['hdfs']['count'], 1)
+
+class CachedTokenAuthenticationTests(FakeClusterTestCase):
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.token = self.api.get('/api/hdfs-files/get_token/').data['token']
+        self.token_client = APIClient()
+        self.token_client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_cached_token_needs_no_query(self):
+        self.assertEqual(self.token_client.get('/api/monitoring/hdfs_capacity/').status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.token_client.get('/api/monitoring/hdfs_capacity/').status_code, 200)
+
+    def test_rotation_revokes_the_old_token(self):
+        self.token_client.get('/api/monitoring/hdfs_capacity/')
+        # Reading the token never rotates it
+        self.assertEqual(self.api.get('/api/hdfs-files/get_token/', {'rotate': 'true'}).data['token'], self.token)
+        new_token = self.api.post('/api/hdfs-files/rotate_token/').data['token']
+        self.assertNotEqual(new_token, self.token)
+        self.assertEqual(self.token_client.get('/api/monitoring/hdfs_capacity/').status_code, 401)
+        self.token_client.credentials(HTTP_AUTHORIZATION=f'Token {new_token}')
+        self.assertEqual(self.token_client.get('/api/monitoring/hdfs_capacity/').status_code, 200)
+
+    def test_session_rotation_needs_a_csrf_token(self):
+        session = APIClient(enforce_csrf_checks=True)
+        session.login(username='alice', password='secret')
+        self.assertEqual(session.post('/api/hdfs-files/rotate_token/').status_code, 403)
+        self.assertEqual(self.token_client.get('/api/monitoring/hdfs_capacity/').status_code, 200)
+
+    def test_login_rotation(self):
+        response = self.token_client.post('/api/hdfs-files/get_token_for_user/', {
+            'username': 'alice', 'password': 'secret', 'rotate': True
+        }, format='json')
+        self.assertNotEqual(response.data['token'], self.token)
+
+    def test_deactivation_revokes_tokens(self):
+        self.token_client.get('/api/monitoring/hdfs_capacity/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.token_client.get('/api/monitoring/hdfs_capacity/').status_code, 401)
+        self.assertEqual(self.token_client.get('/api/async/monitoring/hdfs_capacity/').status_code, 401)
+
+    def test_expired_token_is_rejected_and_reissued(self):
+        self.token_client.get('/api/monitoring/hdfs_capacity/')
+        with mock.patch.dict(token_cache.config, {'token_expiry': 60}):
+            with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(minutes=2)):
+                self.assertEqual(self.token_client.get('/api/monitoring/hdfs_capacity/').status_code, 401)
+                response = self.api.get('/api/hdfs-files/get_token/')
+            self.assertNotEqual(response.data['token'], self.token)
+            self.assertIsNotNone(response.data['expires_at'])
+
+MEMORY_SINK = [{'class': 'hadoop_app.alerts.MemorySink'}]
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AlertEngineTests(SimpleTestCase):
+    def engine(self, *rules, repeat_interval=None):
+        patcher = mock.patch.dict(HADOOP_CONFIG['ALERTS'], {
+            'rules': list(rules), 'notifiers': MEMORY_SINK, 'repeat_interval': repeat_interval
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        engine = AlertEngine()
+        engine.reload()
+        return engine
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fires_after_duration_and_resolves_with_hysteresis(self):
+        engine = self.engine({'name': 'full', 'expression': 'hdfs_used.used_percent > 85 for 10m', 'clear': 80})
+        sink = engine.notifiers[0]
+        for minute, value in enumerate([90, 91, 92, 93, 94, 95, 96, 97, 98, 99]):
+            engine.observe({'hdfs_used.used_percent': value}, timestamp=minute * 60)
+        self.assertEqual(sink.alerts, [])
+        engine.observe({'hdfs_used.used_percent': 90}, timestamp=600)
+        self.assertEqual([alert['state'] for alert in sink.alerts], ['firing'])
+
+        # Dropping below the threshold but not below clear keeps it firing, without repeats
+        engine.observe({'hdfs_used.used_percent': 83}, timestamp=660)
+        self.assertEqual(len(sink.alerts), 1)
+        engine.observe({'hdfs_used.used_percent': 79}, timestamp=720)
+        self.assertEqual([alert['state'] for alert in sink.alerts], ['firing', 'resolved'])
+
+    def test_breach_must_be_continuous(self):
+        engine = self.engine({'name': 'full', 'expression': 'hdfs_used.used_percent > 85 for 10m'})
+        for minute, value in enumerate([90] * 9 + [50] + [90] * 9):
+            engine.observe({'hdfs_used.used_percent': value}, timestamp=minute * 60)
+        self.assertEqual(engine.notifiers[0].alerts, [])
+
+    def test_repeat_interval(self):
+        engine = self.engine({'name': 'busy', 'expression': 'yarn_containers.active_containers >= 10'}, repeat_interval=300)
+        for second in range(0, 700, 60):
+            engine.observe({'yarn_containers.active_containers': 12}, timestamp=second)
+        self.assertEqual([alert['timestamp'] for alert in engine.notifiers[0].alerts], [0, 300, 600])
+
+    def test_state_is_shared_between_processes(self):
+        rule = {'name': 'failed', 'expression': 'increase(mapreduce_jobs.failed_jobs, 10m) > 5'}
+        first = self.engine(rule)
+        first.observe({'mapreduce_jobs.failed_jobs': 100}, timestamp=0)
+        first.observe({'mapreduce_jobs.failed_jobs': 103}, timestamp=60)
+        second = AlertEngine()
+        second.observe({'mapreduce_jobs.failed_jobs': 107}, timestamp=120)
+        self.assertEqual(second.notifiers[0].alerts[0]['value'], 7)
+        self.assertEqual(first.status()[0]['state'], 'firing')
+
+    def test_only_sampled_rules_are_synced(self):
+        engine = self.engine(
+            {'name': 'full', 'expression': 'max(hdfs_used.used_percent, 1h) > 85'},
+            {'name': 'busy', 'expression': 'yarn_containers.active_containers >= 10'}
+        )
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            for minute in range(60):
+                engine.observe({'hdfs_used.used_percent': 80 + minute % 10}, timestamp=minute * 60)
+        self.assertEqual({key for call in get_many.call_args_list for key in call.args[0]}, {'hadoop_alerts:rule:full'})
+        saved = set_many.call_args.args[0]
+        self.assertEqual(list(saved), ['hadoop_alerts:rule:full'])
+        # A max only keeps the samples that can still become the maximum, not the whole hour
+        self.assertEqual(saved['hadoop_alerts:rule:full']['state']['window']['samples'], [])
+        self.assertEqual(len(saved['hadoop_alerts:rule:full']['state']['window']['extremes']), 1)
+        self.assertEqual(engine.status()[0]['value'], 89)
+
+    def test_rolling_window_aggregates(self):
+        increase, maximum, average = RollingWindow('increase', 300), RollingWindow('max', 300), RollingWindow('avg', 300)
+        for timestamp, value in [(0, 10), (100, 50), (200, 20), (300, 5), (400, 8)]:
+            for window in (increase, maximum, average):
+                window.add(timestamp, value)
+        # Samples from 100 on: 50, then counter resets to 20 and 5, then +3
+        self.assertEqual(increase.value(), 28)
+        self.assertEqual(maximum.value(), 50)
+        self.assertEqual(average.value(), 83 / 4)
+        maximum.add(550, 1)
+        self.assertEqual(maximum.value(), 8)
+
+class AlertPipelineTests(FakeClusterTestCase):
+    def test_collect_metrics_feeds_alerts(self):
+        self.cluster.namenode.files['/big'] = (b'x' * 1000, 0)
+        with mock.patch.object(self.cluster.namenode, 'CAPACITY', 1100), mock.patch.dict(HADOOP_CONFIG['ALERTS'], {
+            'rules': [{'name': 'full', 'expression': 'hdfs_used.used_percent > 85'}], 'notifiers': MEMORY_SINK
+        }):
+            alert_engine.reload()
+            self.addCleanup(alert_engine.reload)
+            collect_metrics()
+            self.assertEqual(alert_engine.notifiers[0].alerts[0]['rule'], 'full')
+            response = self.api.get('/api/monitoring/alerts/')
+        self.assertEqual([rule['name'] for rule in response.data['firing']], ['full'])
+
+class CollectionPipelineTests(FakeClusterTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.services = (self.cluster.namenode, self.cluster.resourcemanager, self.cluster.historyserver)
+        for service in self.services:
+            service.hits.clear()
+
+    def test_cycle_fetches_each_endpoint_once(self):
+        result = collection_pipeline.run()
+        self.assertEqual([service.hits['/jmx'] for service in self.services], [1, 1, 1])
+        self.assertEqual(result['metrics']['hdfs_used']['used'], 0)
+        self.assertEqual(HadoopMetric.objects.filter(metric_type='CLUSTER_HEALTH').count(), 1)
+        self.assertEqual(HadoopMetric.objects.exclude(metric_type='CLUSTER_HEALTH').count(), 5)
+
+    def test_cycles_do_not_overlap_or_run_early(self):
+        self.assertIsNotNone(collection_pipeline.run())
+        self.assertIsNone(collection_pipeline.run())
+        token = collection_pipeline._acquire()
+        self.assertIsNone(collection_pipeline.run(force=True))
+        collection_pipeline._release(token)
+        self.assertIsNotNone(collection_pipeline.run(force=True))
+
+    def test_cycle_finished_while_waiting_for_the_lock_is_not_repeated(self):
+        acquire = collection_pipeline._acquire
+
+        def acquire_after_another_cycle():
+            with mock.patch.object(collection_pipeline, '_acquire', acquire):
+                self.assertIsNotNone(collection_pipeline.run())
+            return acquire()
+
+        with mock.patch.object(collection_pipeline, '_acquire', side_effect=acquire_after_another_cycle):
+            self.assertIsNone(collection_pipeline.run())
+        self.assertEqual([service.hits['/jmx'] for service in self.services], [1, 1, 1])
+        self.assertIsNone(cache.get(LOCK_KEY))
+
+    def test_release_keeps_a_lock_taken_over_by_another_cycle(self):
+        token = collection_pipeline._acquire()
+        cache.set(LOCK_KEY, 'other', timeout=60)
+        collection_pipeline._release(token)
+        self.assertEqual(cache.get(LOCK_KEY), 'other')
+
+    def test_release_compares_and_deletes_on_redis(self):
+        redis_cache = RedisCache('redis://localhost:6379/1', {})
+        client = mock.Mock()
+        with mock.patch('hadoop_app.collection.cache', redis_cache), \
+                mock.patch.object(RedisCacheClient, 'get_client', return_value=client):
+            collection_pipeline._release('token')
+        client.eval.assert_called_once_with(
+            RELEASE_SCRIPT, 1, redis_cache.make_and_validate_key(LOCK_KEY), pickle.dumps('token', pickle.HIGHEST_PROTOCOL)
+        )
+        client.get.assert_not_called()
+
+    def test_health_is_stored_when_due_or_changed(self):
+        collection_pipeline.run()
+        collection_pipeline.run(force=True)
+        self.assertEqual(HadoopMetric.objects.filter(metric_type='CLUSTER_HEALTH').count(), 1)
+        endpoints = {**HADOOP_CONFIG['MONITORING']['cluster_health_check']['endpoints'], 'historyserver': 'http://127.0.0.1:9/jmx'}
+        with mock.patch.dict(HADOOP_CONFIG['MONITORING']['cluster_health_check'], {'endpoints': endpoints}), \
+                self.assertLogs('hadoop_app.monitoring', 'ERROR'):
+            collection_pipeline.run(force=True)
+        self.assertEqual(HadoopMetric.objects.filter(metric_type='CLUSTER_HEALTH').count(), 2)
+
+    def test_interval_backs_off_while_unhealthy(self):
+        endpoints = {**HADOOP_CONFIG['MONITORING']['cluster_health_check']['endpoints'], 'namenode': 'http://127.0.0.1:9/jmx'}
+        with mock.patch.dict(HADOOP_CONFIG['MONITORING']['cluster_health_check'], {'endpoints': endpoints}), \
+                self.assertLogs('hadoop_app.monitoring', 'ERROR'):
+            intervals = [collection_pipeline.run(force=True)['interval'] for _ in range(4)]
+        self.assertEqual(intervals, [120, 240, 480, 600])
+        intervals = [collection_pipeline.run(force=True)['interval'] for _ in range(4)]
+        self.assertEqual(intervals, [300, 150, 75, 60])
+
+def jmx_health(step, beans=200):
+    """Health of three daemons with JMX dumps the size of a real cluster's, changing a little per step"""
+    health = {}
+    for service in ('namenode', 'resourcemanager', 'historyserver'):
+        payload = [
+            {'name': f'Hadoop:service={service},name=Bean{index}', 'modelerType': f'Bean{index}',
+             **{f'Attribute{attribute}': index * attribute for attribute in range(20)}}
+            for index in range(beans)
+        ]
+        payload[0]['Uptime'] = step * 300000
+        payload[1]['Attribute3'] += step
+        health[service] = {
+            'timestamp': f'2026-01-01T00:{step:02d}:00', 'latency_ms': 12.5 + step,
+            'status': 'HEALTHY', 'metrics': {'beans': payload}
+        }
+    health['namenode']['metrics']['beans'].append({
+        'name': 'Hadoop:service=NameNode,name=FSNamesystemState', 'CapacityUsed': step * 1024
+    })
+    return health
+
+class HealthSnapshotTests(TestCase):
+    def setUp(self):
+        self.start = timezone.now() - timedelta(days=1)
+
+    def test_diff_roundtrip(self):
+        old = {'a': 1, 'b': {'c': [1, 2, 3], 'd': 'x'}, 'e': [1]}
+        new = {'b': {'d': 'y', 'c': [1, 5, 3]}, 'a': 1, 'e': [1, 2], 'f': None}
+        self.assertEqual(apply_delta(old, diff(old, new)), new)
+        self.assertEqual(list(apply_delta(old, diff(old, new))), list(new))
+        self.assertIsNone(diff(new, dict(new)))
+
+    def test_rebuild_any_timestamp(self):
+        checks = [jmx_health(step) for step in range(8)]
+        # A bean going away and an unhealthy daemon must survive too
+        del checks[5]['resourcemanager']['metrics']['beans'][7]
+        checks[6]['historyserver'] = {'timestamp': '2026-01-01T00:30:00', 'latency_ms': 10000.0,
+                                      'status': 'UNHEALTHY', 'error': 'timed out'}
+        for step, health in enumerate(checks):
+            health_snapshots.save_snapshot(health, timestamp=self.start + timedelta(minutes=5 * step))
+
+        self.assertEqual(HealthSnapshot.objects.filter(keyframe__isnull=True).count(), 1)
+        self.assertIsNone(health_snapshots.rebuild(self.start - timedelta(seconds=1)))
+        for step, health in enumerate(checks):
+            snapshot = health_snapshots.rebuild(self.start + timedelta(minutes=5 * step, seconds=30))
+            self.assertEqual(snapshot['health'], health)
+            self.assertEqual(snapshot['keyframe'], step == 0)
+
+    def test_storage_is_orders_of_magnitude_smaller(self):
+        full = 0
+        for step in range(12):
+            health = jmx_health(step)
+            full += len(json.dumps(health))
+            health_snapshots.save_snapshot(health, timestamp=self.start + timedelta(minutes=5 * step))
+            HadoopMetric.objects.create(metric_type='CLUSTER_HEALTH', value=health_snapshots.digest(health))
+        for size, original_size in HealthSnapshot.objects.filter(keyframe__isnull=False).values_list('size', 'original_size'):
+            self.assertLess(size * 100, original_size)
+        # The keyframe dominates over so few checks; it is shared by hours of them in practice
+        stored = sum(HealthSnapshot.objects.values_list('size', flat=True))
+        stored += sum(len(json.dumps(row.value)) for row in HadoopMetric.objects.all())
+        self.assertLess(stored * 50, full)
+
+    def test_keyframes_renew_and_expire(self):
+        interval = HADOOP_CONFIG['MONITORING']['cluster_health_check']['storage']['keyframe_interval']
+        first = health_snapshots.save_snapshot(jmx_health(0), timestamp=self.start - timedelta(days=200))
+        delta = health_snapshots.save_snapshot(jmx_health(1), timestamp=self.start - timedelta(days=200) + timedelta(seconds=interval - 1))
+        renewed = health_snapshots.save_snapshot(jmx_health(2), timestamp=self.start)
+        late = health_snapshots.save_snapshot(jmx_health(3), timestamp=self.start + timedelta(minutes=5))
+        self.assertEqual(delta.keyframe_id, first.pk)
+        self.assertIsNone(renewed.keyframe_id)
+        self.assertEqual(late.keyframe_id, renewed.pk)
+
+        self.assertEqual(health_snapshots.drop_expired(), 2)
+        self.assertEqual(health_snapshots.rebuild()['health'], jmx_health(3))
+
+class HealthSnapshotPipelineTests(FakeClusterTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_pipeline_stores_digest_and_api_rebuilds(self):
+        collection_pipeline.run()
+        digest = HadoopMetric.objects.get(metric_type='CLUSTER_HEALTH').value
+        self.assertNotIn('metrics', digest['namenode'])
+        self.assertIn('Hadoop:service=NameNode,name=FSNamesystemState', digest['namenode']['beans'])
+        self.assertEqual(HealthSnapshot.objects.count(), 1)
+
+        response = self.api.get('/api/monitoring/health_snapshot/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['health']['namenode']['metrics'], {'beans': self.cluster.namenode.jmx()})
+        self.assertEqual(response.data['storage']['snapshots'], 1)
+        response = self.api.get('/api/monitoring/health_snapshot/', {'at': '2000-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, 404)
+        response = self.api.get('/api/monitoring/health_snapshot/', {'at': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_full_mode_keeps_whole_payloads(self):
+        storage = HADOOP_CONFIG['MONITORING']['cluster_health_check']['storage']
+        with mock.patch.dict(storage, {'mode': 'full'}):
+            collection_pipeline.run()
+        self.assertIn('metrics', HadoopMetric.objects.get(metric_type='CLUSTER_HEALTH').value['namenode'])
+        self.assertFalse(HealthSnapshot.objects.exists())
+        response = self.api.get('/api/monitoring/health_snapshot/')
+        self.assertEqual(response.data['health']['namenode']['metrics'], {'beans': self.cluster.namenode.jmx()})
+
+class TopologicalOrderTests(SimpleTestCase):
+    def test_dependencies_come_first(self):
+        order = topological_order(['c', 'b', 'a'], {'c': ['b'], 'b': ['a']})
+        self.assertEqual(order, ['a', 'b', 'c'])
+
+    def test_cycle(self):
+        with self.assertRaises(ValueError):
+            topological_order(['a', 'b'], {'a': ['b'], 'b': ['a']})
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(ValueError):
+            topological_order(['a'], {'a': ['missing']})
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class WorkflowTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        patcher = mock.patch('hadoop_app.views.advance_workflow')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create(self, dependencies, max_parallel=None):
+        specs = [
+            {'key': key, 'depends_on': deps, 'configuration': {'type': 'HIVE', 'query': 'SELECT 1'}}
+            for key, deps in dependencies.items()
+        ]
+        workflow = workflow_scheduler.create(self.user, 'nightly', specs, max_parallel=max_parallel)
+        return workflow, {job.name: job for job in workflow.jobs.all()}
+
+    def set_status(self, jobs, status, *keys):
+        HadoopJob.objects.filter(pk__in=[jobs[key].pk for key in keys]).update(status=status)
+
+    def statuses(self, jobs):
+        return dict(HadoopJob.objects.filter(pk__in=[job.pk for job in jobs.values()]).values_list('name', 'status'))
+
+    def test_max_parallel_must_be_a_positive_integer(self):
+        jobs = [{'key': 'a', 'configuration': {'type': 'HIVE', 'query': 'SELECT 1'}}]
+        for max_parallel in (-1, 0, 'many', 2.5, True):
+            response = self.api.post('/api/hadoop-workflows/submit/', {'jobs': jobs, 'max_parallel': max_parallel}, format='json')
+            self.assertEqual(response.status_code, 400, max_parallel)
+        response = self.api.post('/api/hadoop-workflows/submit/', {'jobs': jobs, 'max_parallel': '2'}, format='json')
+        self.assertEqual((response.status_code, response.data['max_parallel']), (201, 2))
+        response = self.api.post('/api/hadoop-workflows/submit/', {'jobs': jobs}, format='json')
+        self.assertEqual(response.data['max_parallel'], HADOOP_CONFIG['WORKFLOW']['max_parallel'])
+
+    def test_advance_starts_the_critical_path_first_within_the_limit(self):
+        workflow, jobs = self.create({'a': [], 'b': [], 'c': [], 'd': ['c'], 'e': ['d']}, max_parallel=2)
+        started = workflow_scheduler.advance(workflow.pk)
+        self.assertEqual(started[0], jobs['c'].pk)
+        self.assertEqual(len(started), 2)
+        self.set_status(jobs, 'RUNNING', 'a', 'c')
+        self.assertEqual(workflow_scheduler.advance(workflow.pk), [])
+        self.set_status(jobs, 'SUCCEEDED', 'c')
+        self.assertEqual(workflow_scheduler.advance(workflow.pk), [jobs['d'].pk])
+
+    def test_failure_skips_everything_downstream(self):
+        workflow, jobs = self.create({'a': [], 'b': ['a'], 'c': ['b'], 'd': []})
+        workflow_scheduler.advance(workflow.pk)
+        self.set_status(jobs, 'FAILED', 'a')
+        self.set_status(jobs, 'SUCCEEDED', 'd')
+        self.assertEqual(workflow_scheduler.advance(workflow.pk), [])
+        self.assertEqual(self.statuses(jobs), {'a': 'FAILED', 'b': 'UPSTREAM_FAILED', 'c': 'UPSTREAM_FAILED', 'd': 'SUCCEEDED'})
+        workflow.refresh_from_db()
+        self.assertEqual(workflow.status, 'FAILED')
+
+    def test_resume_retries_failed_and_skipped_jobs(self):
+        workflow, jobs = self.create({'a': [], 'b': ['a'], 'c': []})
+        workflow_scheduler.advance(workflow.pk)
+        self.set_status(jobs, 'FAILED', 'a')
+        self.set_status(jobs, 'SUCCEEDED', 'c')
+        workflow_scheduler.advance(workflow.pk)
+
+        response = self.api.post(f'/api/hadoop-workflows/{workflow.pk}/resume/')
+        self.assertEqual((response.status_code, response.data['status']), (200, 'RUNNING'))
+        self.assertEqual(self.statuses(jobs), {'a': 'WAITING', 'b': 'WAITING', 'c': 'SUCCEEDED'})
+        self.assertEqual(workflow_scheduler.advance(workflow.pk), [jobs['a'].pk])
+        self.assertEqual(self.api.post(f'/api/hadoop-workflows/{workflow.pk}/resume/').status_code, 400)
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResourceAdvisorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def finished_job(self, configuration=None, advice=None, usage=None):
+        metrics = {key: value for key, value in (('advisor', advice), ('usage', usage)) if value is not None}
+        return HadoopJob.objects.create(
+            name='etl', job_type='MAPREDUCE', status='SUCCEEDED', owner=self.user,
+            configuration={'jar': 'etl.jar', 'memory': '1024', 'vcores': '1', **(configuration or {})},
+            metrics=metrics or None
+        )
+
+    def profile(self, **fields):
+        return JobResourceProfile.objects.create(
+            owner=self.user, name='etl', job_type='MAPREDUCE', samples=3,
+            avg_runtime=100, avg_memory_seconds=100000, avg_vcore_seconds=100, **fields
+        )
+
+    def advise(self, requested):
+        job_type, configuration = prepare_job_configuration({'type': 'MAPREDUCE', 'jar': 'etl.jar', **requested})
+        return resource_advisor.advise(self.user, job_type, 'etl', requested, configuration), configuration
+
+    def test_learn_keeps_exponentially_weighted_averages(self):
+        job = self.finished_job()
+        resource_advisor.learn(job, {'runtime': 100, 'memory_seconds': 1000, 'vcore_seconds': 10, 'peak_memory_mb': 800})
+        profile = resource_advisor.learn(job, {'runtime': 200, 'memory_seconds': 2000, 'vcore_seconds': 20, 'peak_memory_mb': 400})
+        alpha = HADOOP_CONFIG['ADVISOR']['smoothing']
+        self.assertEqual(profile.samples, 2)
+        self.assertAlmostEqual(profile.avg_runtime, (1 - alpha) * 100 + alpha * 200)
+        self.assertAlmostEqual(profile.avg_memory_seconds, (1 - alpha) * 1000 + alpha * 2000)
+        self.assertAlmostEqual(profile.peak_memory_mb, (1 - alpha) * 800 + alpha * 400)
+        # The peak never drops below the newest run's peak
+        profile = resource_advisor.learn(job, {'runtime': 200, 'memory_seconds': 2000, 'vcore_seconds': 20, 'peak_memory_mb': 900})
+        self.assertEqual(profile.peak_memory_mb, 900)
+
+    def test_suggest_only_reports_and_apply_fills_in_omitted_resources(self):
+        self.profile(peak_memory_mb=300, avg_cpu_seconds=50)
+        advice, configuration = self.advise({})
+        self.assertEqual(advice['suggested'], {'memory': '512', 'vcores': '1'})
+        self.assertEqual((advice['applied'], configuration['memory']), ({}, '1024'))
+
+        with mock.patch.dict(HADOOP_CONFIG['ADVISOR'], {'mode': 'apply'}):
+            advice, configuration = self.advise({'vcores': '2'})
+        self.assertEqual(advice['applied'], {'memory': '512'})
+        self.assertEqual(advice['replaced'], {'memory': '1024'})
+        self.assertEqual((configuration['memory'], configuration['vcores']), ('512', '2'))
+
+    def test_spark_is_sized_from_executor_usage_without_the_launcher(self):
+        now = timezone.now()
+        job = HadoopJob.objects.create(
+            name='etl', job_type='SPARK', status='SUCCEEDED', owner=self.user,
+            configuration={'application': 'etl.py', 'executor_memory': '2g', 'executor_cores': '1', 'num_executors': '2'},
+            started_at=now - timedelta(seconds=120), finished_at=now
+        )
+        apps = [
+            # The launcher and the driver's AM reserve plenty, which must not count as executor need
+            {'id': 'application_1_0001', 'applicationType': 'SPARK', 'applicationTags': f'{APPLICATION_TAG},{job_tag(job)}',
+             'memorySeconds': 10 ** 9, 'vcoreSeconds': 10 ** 6, 'startedTime': 0, 'finishedTime': 120000},
+            {'id': 'application_1_0002', 'applicationType': 'SPARK', 'applicationTags': job_tag(job),
+             'memorySeconds': 500000, 'vcoreSeconds': 400, 'startedTime': 10000, 'finishedTime': 110000},
+        ]
+        executors = [
+            {'id': 'driver', 'totalCores': 0, 'totalDuration': 0, 'peakMemoryMetrics': {'JVMHeapMemory': 3 << 30}},
+            {'id': '1', 'totalCores': 1, 'totalDuration': 70000, 'peakMemoryMetrics': {'JVMHeapMemory': 600 << 20}},
+            {'id': '2', 'totalCores': 1, 'totalDuration': 30000, 'peakMemoryMetrics': {'JVMHeapMemory': 400 << 20}},
+        ]
+        client = resource_advisor.submitter.client
+        with mock.patch.object(client, 'applications', return_value=apps), \
+                mock.patch.object(resource_advisor, '_spark_executors', return_value=executors) as spark_executors:
+            for _ in range(3):
+                usage = resource_advisor.collect_usage(job)
+        spark_executors.assert_called_with('application_1_0002')
+        self.assertEqual((usage['executors'], usage['peak_memory_mb'], usage['cpu_seconds']), (1, 600, 100))
+
+        configuration = {'application': 'etl.py', 'executor_memory': '2g', 'executor_cores': '1', 'num_executors': '2'}
+        with mock.patch.dict(HADOOP_CONFIG['ADVISOR'], {'mode': 'apply'}):
+            advice = resource_advisor.advise(self.user, 'SPARK', 'etl', {'application': 'etl.py'}, configuration)
+        # The tasks kept one executor busy; 600 MB of heap plus headroom rounds up to 1024 MB
+        self.assertEqual(advice['applied'], {'num_executors': '1', 'executor_memory': '1024m'})
+
+        profile = JobResourceProfile.objects.get(owner=self.user, name='etl', job_type='SPARK')
+        profile.peak_memory_mb, profile.avg_executors = 1900, 2
+        # Never more than the job already has, so applied advice cannot ratchet up
+        self.assertEqual(resource_advisor.suggest(profile, {'executor_memory': '2g'})['executor_memory'], '2048m')
+        self.assertEqual(resource_advisor.suggest(profile, {'executor_memory': '2g'})['num_executors'], '2')
+
+    def test_no_advice_before_enough_samples(self):
+        profile = self.profile(peak_memory_mb=300)
+        profile.samples = HADOOP_CONFIG['ADVISOR']['min_samples'] - 1
+        profile.save()
+        self.assertIsNone(self.advise({})[0])
+
+    def test_report_measures_savings_against_the_requested_resources(self):
+        usage = {'runtime': 90, 'memory_seconds': 5000, 'vcore_seconds': 10}
+        applied = {
+            'suggested': {'memory': '512'}, 'applied': {'memory': '512'},
+            'replaced': {'memory': '1024'}, 'predicted_runtime': 100
+        }
+        suggested = {'suggested': {'memory': '512'}, 'applied': {}, 'replaced': {}, 'predicted_runtime': 100}
+        self.finished_job({'memory': '512'}, applied, usage)
+        self.finished_job({}, suggested, usage)
+        self.finished_job()
+        # A profile average far above this run must not count as savings
+        self.profile()
+
+        report = self.api.get('/api/hadoop-jobs/advisor_report/').data
+        jobs = sorted(report['jobs'], key=lambda entry: entry['id'])
+        self.assertEqual([entry['saved'] for entry in jobs], [
+            {'memory_seconds': 5000, 'vcore_seconds': 0}, {'memory_seconds': 0, 'vcore_seconds': 0}
+        ])
+        self.assertEqual((report['memory_seconds_saved'], report['vcore_seconds_saved']), (5000, 0))
+        self.assertEqual(jobs[0]['actual_runtime'], 90)
+
+class BenchmarkTests(SimpleTestCase):
+    def test_summarize(self):
+        summary = summarize([i / 1000 for i in range(1, 101)], ['HTTP 500'], 2.0)
+        self.assertEqual(summary['operations'], 100)
+        self.assertEqual(summary['per_second'], 50.0)
+        self.assertEqual(summary['p50_ms'], 51.0)
+        self.assertEqual(summary['p99_ms'], 100.0)
+        self.assertEqual(summary['errors'], 1)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'results': {'jobs_list': {'p95_ms': 10.0, 'per_second': 100.0, 'errors': 0}}}
+        within_threshold = {'results': {'jobs_list': {'p95_ms': 11.0, 'per_second': 95.0, 'errors': 0}}}
+        slower = {'results': {'jobs_list': {'p95_ms': 15.0, 'per_second': 60.0, 'errors': 2}}}
+        self.assertEqual(compare(baseline, within_threshold, 0.2), [])
+        self.assertEqual(len(compare(baseline, slower, 0.2)), 3)
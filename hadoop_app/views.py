@@ -1,38 +1,62 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import get_object_or_404
-from .models import HDFSFile, HiveQuery, HadoopJob, HadoopMetric
-from .serializers import HDFSFileSerializer, HiveQuerySerializer, HadoopJobSerializer, HadoopMetricSerializer
-from pyhive import hive
-import hdfs
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import HDFSFile, HDFSCompaction, HiveQuery, HadoopJob, HadoopWorkflow, HadoopMetric
+from .serializers import (
+    HDFSFileSerializer, HDFSFileListSerializer, HDFSCompactionSerializer, HDFSCompactionListSerializer,
+    HiveQuerySerializer, HiveQueryListSerializer, HadoopJobSerializer, HadoopJobListSerializer,
+    HadoopWorkflowSerializer, HadoopWorkflowListSerializer, HadoopMetricSerializer
+)
 from datetime import datetime
 import json
-from .config import HADOOP_CONFIG, JOB_CONFIG_DEFAULTS
+from .config import HADOOP_CONFIG
 from .monitoring import hadoop_monitor
+from .alerts import alert_engine
+from .health_snapshots import health_snapshots
+from .instrumentation import request_histograms
+from .authentication import issue_token, token_expires_at
+from .clients import get_hdfs_client, get_hive_connection
+from .disk_usage import hdfs_disk_usage
+from .tasks import compact_directory, submit_job, advance_workflow
+from .workflows import workflow_scheduler
+from .advisor import resource_advisor
+from .yarn import job_submitter, prepare_job_configuration, ACTIVE_STATUSES, TERMINAL_STATUSES
+from .job_logs import job_log_fetcher
+from .job_events import sync_status_event_stream, wait_for_status_change
+import itertools
+from .renderers import EventStreamRenderer
+from .compression import CODEC_EXTENSIONS, CompressingStream, available_codecs, decompress_chunks
+from .deduplication import content_digest, find_content, register_content, release_file, dedup_stats
+import posixpath
 
-def get_hdfs_client():
-    """Get configured HDFS client"""
-    config = HADOOP_CONFIG['HDFS']
-    return hdfs.InsecureClient(
-        f'http://{config["host"]}:{config["port"]}',
-        user=config["user"],
-        timeout=config["timeout"]
-    )
-
-def get_hive_connection(database='default'):
-    """Get configured Hive connection"""
-    config = HADOOP_CONFIG['HIVE']
-    return hive.Connection(
-        host=config["host"],
-        port=config["port"],
-        username=config["user"],
-        database=database,
-        auth=config["auth"]
-    )
+def served_over_asgi(request):
+    """Whether the request came in through ASGI, where the async views wait without holding a thread"""
+    # Under WSGI an async view runs on the request's own thread, so redirecting to it frees nothing
+    return isinstance(request._request, ASGIRequest)
+
+class LeanListMixin:
+    """Serve list actions with a slim serializer that loads only the columns it renders"""
+    list_serializer_class = None
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self.list_serializer_class is not None:
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list' and self.list_serializer_class is not None:
+            queryset = queryset.only(*self.list_serializer_class.Meta.fields)
+        return queryset
 
 class MonitoringViewSet(viewsets.ViewSet):
     """Viewset for monitoring Hadoop cluster health and metrics"""
@@ -80,14 +104,53 @@ class MonitoringViewSet(viewsets.ViewSet):
         queries = hadoop_monitor._get_hive_queries()
         return Response(queries)
 
+    @action(detail=False, methods=['get'])
+    def alerts(self, request):
+        """Get the state of every alert rule"""
+        try:
+            rules = alert_engine.status()
+            return Response({
+                'firing': [rule for rule in rules if rule['state'] == 'firing'],
+                'rules': rules
+            })
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'])
+    def health_snapshot(self, request):
+        """Rebuild the full cluster health stored as of ?at=<ISO timestamp>, or the latest"""
+        at = request.query_params.get('at')
+        if at:
+            at = parse_datetime(at)
+            if at is None:
+                return Response({'error': 'at must be an ISO 8601 timestamp'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+        try:
+            snapshot = health_snapshots.rebuild(at)
+            if snapshot is None:
+                return Response({'error': 'No cluster health stored by then'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({**snapshot, 'storage': health_snapshots.stats()})
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def instrumentation(self, request):
+        """Get per-endpoint latency histograms with DB, HDFS, Hive and JMX breakdowns"""
+        try:
+            return Response(request_histograms.report())
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class HDFSFileViewSet(viewsets.ModelViewSet):
     queryset = HDFSFile.objects.all()
     serializer_class = HDFSFileSerializer
     permission_classes = [IsAuthenticated]
 
-class HDFSFileViewSet(viewsets.ModelViewSet):
+class HDFSFileViewSet(LeanListMixin, viewsets.ModelViewSet):
     queryset = HDFSFile.objects.all()
     serializer_class = HDFSFileSerializer
+    list_serializer_class = HDFSFileListSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -101,17 +164,77 @@ class HDFSFileViewSet(viewsets.ModelViewSet):
             if not file:
                 return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
             
-            hdfs_path = f'/user/{request.user.username}/{file.name}'
-            client.upload(hdfs_path, file)
+            compression = HADOOP_CONFIG['HDFS']['compression']
+            codec = request.data.get('codec', compression['default_codec']) or ''
+            if codec and codec not in available_codecs():
+                return Response({'error': f'Unsupported codec: {codec}'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Skip the WebHDFS write entirely when the user already stored identical content
+            dedup = HADOOP_CONFIG['HDFS']['deduplication']
+            digest = None
+            if dedup['enabled']:
+                digest = content_digest(file.chunks(dedup['hash_chunk_size']))
+                content = find_content(client, digest, codec, request.user)
+                if content is not None:
+                    hdfs_file = HDFSFile.objects.create(
+                        name=file.name,
+                        path=content.path,
+                        size=content.size,
+                        codec=codec,
+                        original_size=content.original_size,
+                        content=content,
+                        owner=request.user
+                    )
+                    return Response(
+                        {**HDFSFileSerializer(hdfs_file).data, 'deduplicated': True},
+                        status=status.HTTP_201_CREATED
+                    )
+
+            # Compress chunks as they flow to WebHDFS instead of buffering the file
+            hdfs_path = f'/user/{request.user.username}/{file.name}{CODEC_EXTENSIONS.get(codec, "")}'
+            stream = CompressingStream(file.chunks(compression['chunk_size']), codec)
+            client.write(hdfs_path, data=iter(stream))
+
+            content = None
+            if digest is not None:
+                content = register_content(
+                    client, digest, codec, hdfs_path, stream.compressed_size, stream.original_size, request.user
+                )
             
             hdfs_file = HDFSFile.objects.create(
                 name=file.name,
                 path=hdfs_path,
-                size=file.size,
+                size=stream.compressed_size,
+                codec=codec,
+                original_size=stream.original_size,
+                content=content,
                 owner=request.user
             )
             
-            return Response(HDFSFileSerializer(hdfs_file).data, status=status.HTTP_201_CREATED)
+            return Response(
+                {**HDFSFileSerializer(hdfs_file).data, 'deduplicated': False},
+                status=status.HTTP_201_CREATED
+            )
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Stream a file from HDFS, transparently decompressing it"""
+        try:
+            hdfs_file = get_object_or_404(HDFSFile, pk=pk, owner=request.user)
+            raw = request.query_params.get('raw', '').lower() in ('1', 'true', 'yes')
+            codec = '' if raw else hdfs_file.codec
+            chunk_size = HADOOP_CONFIG['HDFS']['compression']['chunk_size']
+
+            def stream():
+                with get_hdfs_client().read(hdfs_file.path, chunk_size=chunk_size) as reader:
+                    yield from decompress_chunks(reader, codec)
+
+            response = StreamingHttpResponse(stream(), content_type='application/octet-stream')
+            filename = posixpath.basename(hdfs_file.path) if raw else hdfs_file.name
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -138,21 +261,77 @@ class HDFSFileViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'])
+    def disk_usage(self, request):
+        """Get the cached disk usage tree of an HDFS directory"""
+        try:
+            home = f'/user/{request.user.username}'
+            path = posixpath.normpath(request.query_params.get('path', home))
+            depth = int(request.query_params.get('depth', 1))
+            refresh = request.query_params.get('refresh', '').lower() in ('1', 'true', 'yes')
+            # Refreshing walks the whole tree on the namenode, so only staff may force it
+            if not request.user.is_staff and (refresh or (path != home and not path.startswith(home + '/'))):
+                return Response({'error': 'You can only see the cached usage of your own directories'}, status=status.HTTP_403_FORBIDDEN)
+            return Response(hdfs_disk_usage.tree(path, depth=depth, refresh=refresh))
+        except ValueError:
+            return Response({'error': 'depth must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'])
+    def compact(self, request):
+        """Merge small files under an HDFS directory in the background"""
+        try:
+            home = f'/user/{request.user.username}'
+            path = posixpath.normpath(request.data.get('path', home))
+            if not request.user.is_staff and path != home and not path.startswith(home + '/'):
+                return Response({'error': 'You can only compact your own directories'}, status=status.HTTP_403_FORBIDDEN)
+
+            compaction = HDFSCompaction.objects.create(
+                path=path,
+                target_size=int(request.data.get('target_size', HADOOP_CONFIG['HDFS']['compaction']['target_size'])),
+                skip_header=str(request.data.get('skip_header', '')).lower() in ('1', 'true', 'yes'),
+                owner=request.user
+            )
+            compact_directory.delay(compaction.pk)
+
+            return Response(HDFSCompactionSerializer(compaction).data, status=status.HTTP_202_ACCEPTED)
+        except ValueError:
+            return Response({'error': 'target_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'])
+    def dedup_stats(self, request):
+        """Get deduplication ratio and bytes saved for the user's files"""
+        try:
+            return Response(dedup_stats(self.get_queryset()))
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=True, methods=['delete'])
     def delete(self, request, pk=None):
         try:
             hdfs_file = get_object_or_404(HDFSFile, pk=pk, owner=request.user)
-            client = get_hdfs_client()
-            client.delete(hdfs_file.path, recursive=True)
-            hdfs_file.delete()
+            release_file(get_hdfs_client(), hdfs_file)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def _token_response(self, token):
+        expires_at = token_expires_at(token)
+        return Response({'token': token.key, 'expires_at': expires_at.isoformat() if expires_at else None})
+
     @action(detail=False, methods=['get'])
     def get_token(self, request):
-        token, created = Token.objects.get_or_create(user=request.user)
-        return Response({'token': token.key})
+        """Get the user's API token"""
+        return self._token_response(issue_token(request.user))
+
+    @action(detail=False, methods=['post'])
+    def rotate_token(self, request):
+        """Replace the user's API token with a new one, revoking the old"""
+        # A POST, so session-authenticated requests need a CSRF token and other sites cannot revoke it
+        return self._token_response(issue_token(request.user, rotate=True))
 
     @action(detail=False, methods=['post'])
     def get_token_for_user(self, request):
@@ -161,15 +340,25 @@ class HDFSFileViewSet(viewsets.ModelViewSet):
         
         if username and password:
             user = get_object_or_404(User, username=username)
-            if user.check_password(password):
-                token, created = Token.objects.get_or_create(user=user)
-                return Response({'token': token.key})
+            if user.check_password(password) and user.is_active:
+                rotate = str(request.data.get('rotate', '')).lower() in ('1', 'true', 'yes')
+                return self._token_response(issue_token(user, rotate=rotate))
         
         return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
-class HiveQueryViewSet(viewsets.ModelViewSet):
+class HDFSCompactionViewSet(LeanListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = HDFSCompaction.objects.all()
+    serializer_class = HDFSCompactionSerializer
+    list_serializer_class = HDFSCompactionListSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return HDFSCompaction.objects.filter(owner=self.request.user)
+
+class HiveQueryViewSet(LeanListMixin, viewsets.ModelViewSet):
     queryset = HiveQuery.objects.all()
     serializer_class = HiveQuerySerializer
+    list_serializer_class = HiveQueryListSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -214,7 +403,7 @@ class HiveQueryViewSet(viewsets.ModelViewSet):
             if not all([table_name, hdfs_path, columns]):
                 return Response({'error': 'Missing required parameters'}, status=status.HTTP_400_BAD_REQUEST)
             
-            conn = hive.Connection(host='localhost', port=10000, username='hive')
+            conn = get_hive_connection()
             cursor = conn.cursor()
             
             columns_str = ', '.join([f'{col} STRING' for col in columns])
@@ -240,7 +429,7 @@ class HiveQueryViewSet(viewsets.ModelViewSet):
         try:
             database = request.query_params.get('database', 'default')
             
-            conn = hive.Connection(host='localhost', port=10000, username='hive', database=database)
+            conn = get_hive_connection(database)
             cursor = conn.cursor()
             
             cursor.execute('SHOW TABLES')
@@ -250,9 +439,10 @@ class HiveQueryViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class HadoopJobViewSet(viewsets.ModelViewSet):
+class HadoopJobViewSet(LeanListMixin, viewsets.ModelViewSet):
     queryset = HadoopJob.objects.all()
     serializer_class = HadoopJobSerializer
+    list_serializer_class = HadoopJobListSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -266,54 +456,102 @@ class HadoopJobViewSet(viewsets.ModelViewSet):
             if not config:
                 return Response({'error': 'No configuration provided'}, status=status.HTTP_400_BAD_REQUEST)
             
-            job_type = config.get('type', 'HIVE').upper()
-            
-            if job_type not in ['MAPREDUCE', 'SPARK', 'PIG', 'HIVE']:
-                return Response({'error': 'Invalid job type'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Get default configuration for job type
-            default_config = JOB_CONFIG_DEFAULTS.get(job_type, {})
-            
-            # Merge default and user-provided configurations
-            final_config = {**default_config, **config}
+            job_type, final_config = prepare_job_configuration(config)
+            name = config.get('name', 'Unnamed Job')
+            advice = resource_advisor.advise(request.user, job_type, name, config, final_config)
             
             job = HadoopJob.objects.create(
-                name=config.get('name', 'Unnamed Job'),
+                name=name,
                 job_type=job_type,
                 configuration=final_config,
+                metrics={'advisor': advice} if advice else None,
                 owner=request.user
             )
             
-            # Simulate job submission
-            job.status = 'SUBMITTED'
-            job.save()
-            
-            return Response(HadoopJobSerializer(job).data, status=status.HTTP_201_CREATED)
-            
-            # Simulate job submission
-            job.status = 'SUBMITTED'
-            job.save()
+            # Submission to the ResourceManager happens on a Celery worker
+            submit_job.delay(job.pk)
             
             return Response(HadoopJobSerializer(job).data, status=status.HTTP_201_CREATED)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'])
+    def advisor_report(self, request):
+        """Compare predicted and actual runtimes and report resources saved by sizing advice"""
+        try:
+            return Response(resource_advisor.report(request.user))
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     @action(detail=True, methods=['get'])
     def status(self, request, pk=None):
-        """Get job status"""
+        """Get job status, optionally long-polling until it changes"""
         try:
             job = get_object_or_404(HadoopJob, pk=pk, owner=request.user)
+            wait = min(
+                float(request.query_params.get('wait', 0)),
+                HADOOP_CONFIG['MAPREDUCE']['notifications']['long_poll_timeout']
+            )
+            if wait > 0 and job.status not in TERMINAL_STATUSES:
+                if served_over_asgi(request):
+                    url = f"{reverse('async-job-status', kwargs={'pk': job.pk})}?{request.GET.urlencode()}"
+                    return HttpResponseRedirect(url, status=status.HTTP_307_TEMPORARY_REDIRECT)
+                known = request.query_params.get('known', job.status)
+                return Response({'status': wait_for_status_change(job, known, wait)})
             return Response({'status': job.status})
+        except ValueError:
+            return Response({'error': 'wait must be a number'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'], renderer_classes=[EventStreamRenderer, JSONRenderer])
+    def events(self, request):
+        """Stream status changes of the user's jobs as Server-Sent Events"""
+        if served_over_asgi(request):
+            return HttpResponseRedirect(reverse('async-job-events'), status=status.HTTP_307_TEMPORARY_REDIRECT)
+        response = StreamingHttpResponse(sync_status_event_stream(request.user), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
     @action(detail=True, methods=['get'])
     def logs(self, request, pk=None):
-        """Get job logs"""
+        """Stream job logs, optionally as a byte range or following a running job"""
         try:
             job = get_object_or_404(HadoopJob, pk=pk, owner=request.user)
-            # TODO: Implement actual log retrieval
-            return Response({'logs': 'No logs available yet'})
+            if not job.application_id:
+                return Response({'logs': 'No logs available yet'})
+
+            params = request.query_params
+            offset = int(params.get('offset', 0))
+            length = int(params['length']) if 'length' in params else None
+            tail = int(params['tail']) if 'tail' in params else None
+            if offset < 0 or (length is not None and length < 0) or (tail is not None and tail < 0):
+                return Response({'error': 'offset, length and tail must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+            follow = params.get('follow', '').lower() in ('1', 'true', 'yes')
+            if follow and job.status not in TERMINAL_STATUSES and served_over_asgi(request):
+                url = f"{reverse('async-job-logs', kwargs={'pk': job.pk})}?{request.GET.urlencode()}"
+                return HttpResponseRedirect(url, status=status.HTTP_307_TEMPORARY_REDIRECT)
+
+            chunks = job_log_fetcher.stream(
+                job,
+                filename=params.get('file', 'stdout'),
+                container=params.get('container'),
+                offset=offset,
+                length=length,
+                tail=tail,
+                follow=follow
+            )
+            # Resolve the container before streaming so lookup errors still return JSON
+            first = next(chunks, b'')
+            response = StreamingHttpResponse(itertools.chain([first], chunks), content_type='text/plain')
+            response['X-Accel-Buffering'] = 'no'
+            return response
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -322,11 +560,53 @@ class HadoopJobViewSet(viewsets.ModelViewSet):
         """Kill a running job"""
         try:
             job = get_object_or_404(HadoopJob, pk=pk, owner=request.user)
-            if job.status in ['RUNNING', 'SUBMITTED']:
-                # TODO: Implement actual job killing
-                job.status = 'KILLED'
-                job.save()
+            if job.status in ['WAITING', 'PENDING'] + ACTIVE_STATUSES:
+                job_submitter.kill(job)
+                if job.workflow_id:
+                    advance_workflow.delay(job.workflow_id)
                 return Response({'message': 'Job killed successfully'})
             return Response({'error': 'Job is not in a state that can be killed'})
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class HadoopWorkflowViewSet(LeanListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = HadoopWorkflow.objects.all()
+    serializer_class = HadoopWorkflowSerializer
+    list_serializer_class = HadoopWorkflowListSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        workflows = HadoopWorkflow.objects.filter(owner=self.request.user)
+        if self.action == 'list':
+            return workflows
+        return workflows.prefetch_related('jobs__dependencies')
+
+    @action(detail=False, methods=['post'])
+    def submit(self, request):
+        """Submit a workflow of jobs with dependencies between them"""
+        try:
+            workflow = workflow_scheduler.create(
+                owner=request.user,
+                name=request.data.get('name', 'Unnamed Workflow'),
+                specs=request.data.get('jobs', []),
+                max_parallel=request.data.get('max_parallel')
+            )
+            advance_workflow.delay(workflow.pk)
+            return Response(HadoopWorkflowSerializer(workflow).data, status=status.HTTP_201_CREATED)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """Retry the failed jobs of a workflow and everything that was skipped after them"""
+        try:
+            workflow = get_object_or_404(HadoopWorkflow, pk=pk, owner=request.user)
+            if workflow.status != 'FAILED':
+                return Response({'error': 'Only failed workflows can be resumed'}, status=status.HTTP_400_BAD_REQUEST)
+            workflow_scheduler.resume(workflow)
+            advance_workflow.delay(workflow.pk)
+            return Response(HadoopWorkflowSerializer(workflow).data)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
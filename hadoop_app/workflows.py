@@ -0,0 +1,193 @@
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from .config import HADOOP_CONFIG
+from .models import HadoopJob, HadoopWorkflow
+from .yarn import ACTIVE_STATUSES, prepare_job_configuration
+from .job_events import publish_status_changes
+from .advisor import resource_advisor
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Statuses that stop every job depending on them from running
+FAILED_STATUSES = ['FAILED', 'KILLED', 'UPSTREAM_FAILED']
+
+# Statuses of jobs that hold one of the workflow's parallel slots
+IN_FLIGHT_STATUSES = ['PENDING', 'SUBMITTING'] + ACTIVE_STATUSES
+
+def topological_order(nodes, dependencies):
+    """Order nodes so every node comes after its dependencies"""
+    remaining = {node: set(dependencies.get(node, ())) for node in nodes}
+    unknown = {dep for deps in remaining.values() for dep in deps} - set(remaining)
+    if unknown:
+        raise ValueError(f"Unknown dependencies: {', '.join(sorted(map(str, unknown)))}")
+
+    dependents = defaultdict(list)
+    for node, deps in remaining.items():
+        for dep in deps:
+            dependents[dep].append(node)
+
+    order = []
+    ready = [node for node in nodes if not remaining[node]]
+    while ready:
+        node = ready.pop(0)
+        order.append(node)
+        for dependent in dependents[node]:
+            remaining[dependent].discard(node)
+            if not remaining[dependent]:
+                ready.append(dependent)
+
+    if len(order) != len(remaining):
+        raise ValueError('Workflow dependencies contain a cycle')
+    return order
+
+class WorkflowScheduler:
+    """Run the jobs of a workflow as soon as their dependencies succeed.
+
+    Ready jobs are started longest-remaining-chain first, so the critical
+    path is never held back by jobs that have plenty of slack.
+    """
+
+    def create(self, owner, name, specs, max_parallel=None):
+        """Validate a workflow definition and store its jobs"""
+        if not specs:
+            raise ValueError('A workflow needs at least one job')
+        if max_parallel is None:
+            max_parallel = HADOOP_CONFIG['WORKFLOW']['max_parallel']
+        elif not str(max_parallel).isdigit() or int(max_parallel) < 1:
+            raise ValueError('max_parallel must be a positive integer')
+        keys = [spec.get('key') for spec in specs]
+        if not all(keys) or len(set(keys)) != len(keys):
+            raise ValueError('Every workflow job needs a unique key')
+
+        dependencies = {spec['key']: list(spec.get('depends_on', [])) for spec in specs}
+        order = topological_order(keys, dependencies)
+        specs_by_key = {spec['key']: spec for spec in specs}
+        prepared = {
+            key: prepare_job_configuration(specs_by_key[key].get('configuration') or {})
+            for key in keys
+        }
+
+        with transaction.atomic():
+            workflow = HadoopWorkflow.objects.create(
+                name=name,
+                max_parallel=int(max_parallel),
+                owner=owner
+            )
+            jobs = {}
+            for key in order:
+                job_type, configuration = prepared[key]
+                name = configuration.get('name', key)
+                advice = resource_advisor.advise(
+                    owner, job_type, name, specs_by_key[key].get('configuration') or {}, configuration
+                )
+                jobs[key] = HadoopJob.objects.create(
+                    name=name,
+                    job_type=job_type,
+                    configuration=configuration,
+                    metrics={'advisor': advice} if advice else None,
+                    status='WAITING',
+                    workflow=workflow,
+                    owner=owner
+                )
+                jobs[key].dependencies.set([jobs[dep].pk for dep in dependencies[key]])
+        return workflow
+
+    def _dependencies(self, workflow):
+        through = HadoopJob.dependencies.through
+        dependencies = defaultdict(list)
+        for job_id, dependency_id in through.objects.filter(
+            from_hadoopjob__workflow=workflow
+        ).values_list('from_hadoopjob_id', 'to_hadoopjob_id'):
+            dependencies[job_id].append(dependency_id)
+        return dependencies
+
+    def _chain_lengths(self, order, dependencies):
+        """Length of the longest chain of jobs starting at each job"""
+        dependents = defaultdict(list)
+        for job_id, deps in dependencies.items():
+            for dep in deps:
+                dependents[dep].append(job_id)
+        lengths = {}
+        for job_id in reversed(order):
+            lengths[job_id] = 1 + max((lengths[child] for child in dependents[job_id]), default=0)
+        return lengths
+
+    def advance(self, workflow_id):
+        """Propagate failures, pick the jobs to start and update the workflow status.
+
+        Returns the ids of the jobs that should now be submitted.
+        """
+        with transaction.atomic():
+            workflow = HadoopWorkflow.objects.select_for_update().get(pk=workflow_id)
+            jobs = {job.pk: job for job in workflow.jobs.only('id', 'owner_id', 'status', 'finished_at')}
+            dependencies = self._dependencies(workflow)
+            order = topological_order(list(jobs), dependencies)
+            now = timezone.now()
+            changed = []
+
+            for job_id in order:
+                job = jobs[job_id]
+                if job.status == 'WAITING' and any(
+                    jobs[dep].status in FAILED_STATUSES for dep in dependencies[job_id]
+                ):
+                    job.status = 'UPSTREAM_FAILED'
+                    job.finished_at = now
+                    changed.append(job)
+
+            in_flight = sum(1 for job in jobs.values() if job.status in IN_FLIGHT_STATUSES)
+            lengths = self._chain_lengths(order, dependencies)
+            ready = sorted(
+                (
+                    job_id for job_id in order
+                    if jobs[job_id].status == 'WAITING'
+                    and all(jobs[dep].status == 'SUCCEEDED' for dep in dependencies[job_id])
+                ),
+                key=lambda job_id: -lengths[job_id]
+            )
+            dispatch = ready[:max(0, workflow.max_parallel - in_flight)]
+            for job_id in dispatch:
+                jobs[job_id].status = 'PENDING'
+                changed.append(jobs[job_id])
+
+            HadoopJob.objects.bulk_update(changed, ['status', 'finished_at'])
+
+            statuses = [job.status for job in jobs.values()]
+            if all(job_status == 'SUCCEEDED' for job_status in statuses):
+                workflow.status = 'SUCCEEDED'
+                workflow.finished_at = now
+            elif not any(job_status in IN_FLIGHT_STATUSES + ['WAITING'] for job_status in statuses):
+                workflow.status = 'FAILED'
+                workflow.finished_at = now
+            else:
+                workflow.status = 'RUNNING'
+                workflow.started_at = workflow.started_at or now
+            workflow.save(update_fields=['status', 'started_at', 'finished_at'])
+
+        publish_status_changes(changed)
+        logger.info(f"Workflow {workflow_id} is {workflow.status}, starting jobs {dispatch}")
+        return dispatch
+
+    def resume(self, workflow):
+        """Reset failed and skipped jobs so the workflow continues from where it failed"""
+        with transaction.atomic():
+            retried = list(workflow.jobs.filter(status__in=FAILED_STATUSES))
+            for job in retried:
+                job.status = 'WAITING'
+                job.application_id = None
+                job.submission_id = None
+                job.diagnostics = None
+                job.started_at = None
+                job.finished_at = None
+            HadoopJob.objects.bulk_update(
+                retried, ['status', 'application_id', 'submission_id', 'diagnostics', 'started_at', 'finished_at']
+            )
+            workflow.status = 'RUNNING'
+            workflow.finished_at = None
+            workflow.save(update_fields=['status', 'finished_at'])
+        publish_status_changes(retried)
+        return retried
+
+# Singleton instance of the workflow scheduler
+workflow_scheduler = WorkflowScheduler()
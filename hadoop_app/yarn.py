@@ -0,0 +1,344 @@
+import shlex
+from datetime import datetime, timedelta, timezone as dt_timezone
+import requests
+from requests.adapters import HTTPAdapter
+from django.utils import timezone
+from .config import HADOOP_CONFIG, JOB_CONFIG_DEFAULTS
+from .models import HadoopJob
+from .job_events import publish_status_changes
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration keys each job type needs to build its launch command
+REQUIRED_KEYS = {
+    'MAPREDUCE': ['jar'],
+    'SPARK': ['application'],
+    'PIG': ['script'],
+    'HIVE': [],
+}
+
+# Tag put on every application we submit, so polls only see our applications
+APPLICATION_TAG = 'hadoop-app'
+
+# Job statuses that still need to be polled from the ResourceManager
+ACTIVE_STATUSES = ['SUBMITTED', 'ACCEPTED', 'RUNNING']
+
+# Job statuses after which nothing changes any more
+TERMINAL_STATUSES = ['SUCCEEDED', 'FAILED', 'KILLED', 'UPSTREAM_FAILED']
+
+class ResourceManagerClient:
+    """Client for the YARN ResourceManager REST API"""
+
+    def __init__(self):
+        self.config = HADOOP_CONFIG['MAPREDUCE']
+        self.base_url = f"http://{self.config['jobtracker']}/ws/v1/cluster"
+        self.timeout = self.config['submission']['timeout']
+        # Keep connections to the ResourceManager alive across bursts of requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.config['submission']['pool_size'])
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _request(self, method, path, **kwargs):
+        response = self.session.request(method, f'{self.base_url}/{path}', timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def new_application(self):
+        """Reserve a new application id"""
+        return self._request('POST', 'apps/new-application').json()
+
+    def submit_application(self, context):
+        """Submit an application submission context"""
+        self._request('POST', 'apps', json=context)
+
+    def application(self, application_id):
+        """Get the report of a single application"""
+        return self._request('GET', f'apps/{application_id}').json()['app']
+
+    def applications(self, **params):
+        """List applications matching the given filters"""
+        apps = self._request('GET', 'apps', params=params).json().get('apps') or {}
+        return apps.get('app', [])
+
+    def application_attempts(self, application_id):
+        """List the attempts of an application, oldest first"""
+        attempts = self._request('GET', f'apps/{application_id}/appattempts').json().get('appAttempts') or {}
+        return attempts.get('appAttempt', [])
+
+    def kill_application(self, application_id):
+        """Ask the ResourceManager to kill an application"""
+        self._request('PUT', f'apps/{application_id}/state', json={'state': 'KILLED'})
+
+def job_tag(job):
+    """Tag identifying every YARN application started by one submission attempt of a job.
+
+    The attempt's random submission id keeps tags apart across resubmissions
+    and across deployments whose job ids overlap on a shared ResourceManager.
+    """
+    if job.submission_id is None:
+        # Jobs submitted before attempts had ids
+        return f'{APPLICATION_TAG}-job-{job.pk}'
+    return f'{APPLICATION_TAG}-job-{job.pk}-{job.submission_id.hex}'
+
+def prepare_job_configuration(config):
+    """Merge a user job configuration with the job type defaults and validate it"""
+    job_type = config.get('type', 'HIVE').upper()
+    if job_type not in REQUIRED_KEYS:
+        raise ValueError('Invalid job type')
+
+    # Merge default and user-provided configurations
+    final_config = {**JOB_CONFIG_DEFAULTS.get(job_type, {}), **config}
+    validate_job_configuration(job_type, final_config)
+    return job_type, final_config
+
+def validate_job_configuration(job_type, configuration):
+    """Check that a job configuration has what its launch command needs"""
+    missing = [key for key in REQUIRED_KEYS[job_type] if not configuration.get(key)]
+    if job_type == 'HIVE' and not (configuration.get('query') or configuration.get('script')):
+        missing.append('query or script')
+    if missing:
+        raise ValueError(f"Missing {job_type} configuration: {', '.join(missing)}")
+
+def _arguments(configuration):
+    return [str(argument) for argument in configuration.get('arguments', [])]
+
+def _defines(flag, properties):
+    return [f'{flag}{key}={value}' for key, value in properties.items() if value is not None]
+
+def build_command(job_type, configuration, tag=None):
+    """Build the shell command the launcher container runs for a job.
+
+    The tag is passed on to the applications the launcher starts, so their
+    resource usage can be traced back to the job.
+    """
+    if job_type == 'MAPREDUCE':
+        command = ['hadoop', 'jar', configuration['jar']]
+        if configuration.get('main_class'):
+            command.append(configuration['main_class'])
+        command += _defines('-D', {
+            'mapreduce.job.queuename': configuration.get('queue', 'default'),
+            'mapreduce.map.memory.mb': configuration.get('memory'),
+            'mapreduce.reduce.memory.mb': configuration.get('memory'),
+            'mapreduce.map.cpu.vcores': configuration.get('vcores'),
+            'mapreduce.reduce.cpu.vcores': configuration.get('vcores'),
+            'mapreduce.job.tags': tag,
+            **configuration.get('properties', {})
+        })
+        command += _arguments(configuration)
+    elif job_type == 'SPARK':
+        command = [
+            'spark-submit',
+            '--master', configuration.get('master', 'yarn'),
+            '--deploy-mode', configuration.get('deploy_mode', 'cluster'),
+            '--name', configuration.get('name', 'Unnamed Job'),
+            '--queue', configuration.get('queue', 'default'),
+            '--executor-memory', str(configuration.get('executor_memory')),
+            '--executor-cores', str(configuration.get('executor_cores')),
+        ]
+        if configuration.get('num_executors'):
+            command += ['--num-executors', str(configuration['num_executors'])]
+        if configuration.get('main_class'):
+            command += ['--class', configuration['main_class']]
+        monitoring = configuration.get('monitoring', {})
+        properties = {**configuration.get('properties', {})}
+        if monitoring.get('event_log_enabled'):
+            properties.setdefault('spark.eventLog.enabled', 'true')
+            properties.setdefault('spark.eventLog.dir', monitoring['event_log_dir'])
+        if tag:
+            properties.setdefault('spark.yarn.tags', tag)
+        for option in _defines('', properties):
+            command += ['--conf', option]
+        command.append(configuration['application'])
+        command += _arguments(configuration)
+    elif job_type == 'PIG':
+        command = ['pig', '-x', 'mapreduce']
+        command += _defines('-D', {'mapreduce.job.tags': tag, **configuration.get('pig_properties', {})})
+        for key, value in configuration.get('parameters', {}).items():
+            command += ['-param', f'{key}={value}']
+        command += ['-f', configuration['script']]
+    else:
+        command = ['hive']
+        properties = {
+            'mapreduce.job.tags': tag,
+            'tez.application.tags': tag,
+            **configuration.get('hive_properties', {})
+        }
+        for option in _defines('', properties):
+            command += ['--hiveconf', option]
+        if configuration.get('query'):
+            command += ['-e', configuration['query']]
+        else:
+            command += ['-f', configuration['script']]
+
+    log_dir = HADOOP_CONFIG['MAPREDUCE']['submission']['log_dir']
+    return f"{shlex.join(command)} 1>{log_dir}/stdout 2>{log_dir}/stderr"
+
+def _launcher_resource(configuration, maximum):
+    """Size the launcher container, capped at the cluster maximum"""
+    submission = HADOOP_CONFIG['MAPREDUCE']['submission']
+    memory = int(configuration.get('am_memory', submission['am_memory']))
+    vcores = int(configuration.get('am_vcores', submission['am_vcores']))
+    if maximum:
+        memory = min(memory, maximum.get('memory', memory))
+        vcores = min(vcores, maximum.get('vCores', vcores))
+    return {'memory': memory, 'vCores': vcores}
+
+def build_submission_context(job, application_id, maximum=None):
+    """Build the ResourceManager application submission context for a job"""
+    configuration = job.configuration
+    return {
+        'application-id': application_id,
+        'application-name': job.name,
+        'application-type': job.job_type,
+        'queue': configuration.get('queue', 'default'),
+        'am-container-spec': {
+            'commands': {'command': build_command(job.job_type, configuration, job_tag(job))},
+            'environment': {
+                'entry': [
+                    {'key': key, 'value': str(value)}
+                    for key, value in configuration.get('environment', {}).items()
+                ]
+            }
+        },
+        'resource': _launcher_resource(configuration, maximum),
+        'max-app-attempts': HADOOP_CONFIG['MAPREDUCE']['submission']['max_app_attempts'],
+        'unmanaged-AM': False,
+        'keep-containers-across-application-attempts': False,
+        'application-tags': {'tag': [APPLICATION_TAG, job_tag(job)]}
+    }
+
+class JobSubmitter:
+    """Turn HadoopJob rows into ResourceManager submissions"""
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        # Created lazily so every worker process gets its own connection pool
+        if self._client is None:
+            self._client = ResourceManagerClient()
+        return self._client
+
+    def _launched_application(self, job):
+        """Id of the launcher application this submission attempt already started, if any"""
+        # Applications the launcher starts carry the job tag too, but not APPLICATION_TAG
+        apps = [
+            app for app in self.client.applications(applicationTags=job_tag(job))
+            if APPLICATION_TAG in app.get('applicationTags', '').split(',')
+        ]
+        ids = [app['id'] for app in apps]
+        if job.application_id in ids:
+            return job.application_id
+        return ids[0] if ids else None
+
+    def submit(self, job):
+        """Submit a job to YARN and record its application id.
+
+        Safe to run again for the same attempt, from a retry or a redelivered
+        message: the application id is saved before submitting and reused
+        afterwards, which the ResourceManager accepts only once, and an
+        application already started under the attempt's tag is adopted.
+        """
+        application_id = self._launched_application(job)
+        if application_id is None:
+            # Also read for the resource cap when an id was reserved by an earlier attempt
+            new_application = self.client.new_application()
+            HadoopJob.objects.filter(pk=job.pk, application_id__isnull=True).update(
+                application_id=new_application['application-id']
+            )
+            job.refresh_from_db(fields=['application_id'])
+            application_id = job.application_id
+            maximum = new_application.get('maximum-resource-capability')
+            self.client.submit_application(build_submission_context(job, application_id, maximum))
+
+        job.application_id = application_id
+        job.status = 'SUBMITTED'
+        job.started_at = timezone.now()
+        job.save(update_fields=['application_id', 'status', 'started_at'])
+        publish_status_changes([job])
+        logger.info(f"Submitted job {job.pk} as {application_id}")
+        return application_id
+
+    def kill(self, job):
+        """Kill a job's YARN application"""
+        if job.application_id:
+            self.client.kill_application(job.application_id)
+        job.status = 'KILLED'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'finished_at'])
+        publish_status_changes([job])
+
+def _from_epoch_millis(value):
+    if not value:
+        return None
+    return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+
+def application_status(app):
+    """Map a YARN application report onto a HadoopJob status"""
+    state = app['state']
+    if state == 'FINISHED':
+        return {'SUCCEEDED': 'SUCCEEDED', 'KILLED': 'KILLED'}.get(app.get('finalStatus'), 'FAILED')
+    if state in ('FAILED', 'KILLED', 'ACCEPTED', 'RUNNING'):
+        return state
+    return 'SUBMITTED'
+
+class JobStatusPoller:
+    """Sync active HadoopJob rows with the ResourceManager in one call per cycle"""
+
+    def __init__(self, submitter):
+        self.submitter = submitter
+
+    def poll(self):
+        """Fetch all our applications at once and write back only what changed"""
+        jobs = list(
+            HadoopJob.objects.filter(status__in=ACTIVE_STATUSES, application_id__isnull=False)
+            .only(
+                'id', 'owner_id', 'workflow_id', 'status', 'application_id',
+                'started_at', 'finished_at', 'diagnostics'
+            )
+        )
+        if not jobs:
+            return []
+
+        # Applications start shortly before we record started_at, so leave some slack
+        oldest = min(job.started_at or timezone.now() for job in jobs) - timedelta(minutes=5)
+        apps = self.submitter.client.applications(
+            applicationTags=APPLICATION_TAG,
+            startedTimeBegin=int(oldest.timestamp() * 1000)
+        )
+        reports = {app['id']: app for app in apps}
+
+        changed = []
+        for job in jobs:
+            app = reports.get(job.application_id)
+            if app is None:
+                continue
+            new_status = application_status(app)
+            if new_status == job.status:
+                continue
+            previous_status = job.status
+            job.status = new_status
+            job.started_at = _from_epoch_millis(app.get('startedTime')) or job.started_at
+            if new_status in TERMINAL_STATUSES:
+                job.finished_at = _from_epoch_millis(app.get('finishedTime')) or timezone.now()
+                if new_status != 'SUCCEEDED':
+                    job.diagnostics = app.get('diagnostics') or job.diagnostics
+            # Only write rows still in the status we read, so a kill that landed meanwhile is kept
+            updated = HadoopJob.objects.filter(pk=job.pk, status=previous_status).update(
+                status=job.status, started_at=job.started_at,
+                finished_at=job.finished_at, diagnostics=job.diagnostics
+            )
+            if updated:
+                changed.append(job)
+
+        publish_status_changes(changed)
+        return changed
+
+# Singleton instance of the job submitter
+job_submitter = JobSubmitter()
+
+# Singleton instance of the job status poller
+job_status_poller = JobStatusPoller(job_submitter)
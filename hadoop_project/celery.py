@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from hadoop_app.config import HADOOP_CONFIG
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hadoop_project.settings')
@@ -20,12 +21,21 @@ def debug_task(self):
 
 # Schedule periodic tasks
 app.conf.beat_schedule = {
-    'collect-metrics-every-60-seconds': {
-        'task': 'hadoop_app.tasks.collect_metrics',
-        'schedule': 60.0,
+    # The pipeline decides on each tick whether a cycle is due, adapting its own interval
+    'run-collection-cycle': {
+        'task': 'hadoop_app.tasks.run_collection_cycle',
+        'schedule': float(HADOOP_CONFIG['MONITORING']['collection']['tick']),
     },
-    'check-cluster-health-every-300-seconds': {
-        'task': 'hadoop_app.tasks.check_cluster_health',
-        'schedule': 300.0,
+    'precompute-disk-usage': {
+        'task': 'hadoop_app.tasks.precompute_disk_usage',
+        'schedule': float(HADOOP_CONFIG['HDFS']['disk_usage']['precompute_interval']),
+    },
+    'poll-job-statuses': {
+        'task': 'hadoop_app.tasks.poll_job_statuses',
+        'schedule': float(HADOOP_CONFIG['MAPREDUCE']['monitoring']['job_status_interval']),
+    },
+    'maintain-metric-partitions': {
+        'task': 'hadoop_app.tasks.maintain_metric_partitions',
+        'schedule': float(HADOOP_CONFIG['MONITORING']['metrics_collection']['maintenance_interval']),
     },
 }
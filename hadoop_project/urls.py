@@ -17,17 +17,23 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from hadoop_app.views import HDFSFileViewSet, HiveQueryViewSet, HadoopJobViewSet, MonitoringViewSet
+from hadoop_app.views import (
+    HDFSFileViewSet, HDFSCompactionViewSet, HiveQueryViewSet, HadoopJobViewSet, HadoopWorkflowViewSet,
+    MonitoringViewSet
+)
 
 # Create router and register viewsets
 router = DefaultRouter()
 router.register(r'hdfs-files', HDFSFileViewSet)
+router.register(r'hdfs-compactions', HDFSCompactionViewSet)
 router.register(r'hive-queries', HiveQueryViewSet)
 router.register(r'hadoop-jobs', HadoopJobViewSet)
+router.register(r'hadoop-workflows', HadoopWorkflowViewSet)
 router.register(r'monitoring', MonitoringViewSet, basename='monitoring')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/async/', include('hadoop_app.async_urls')),
     path('api/', include(router.urls)),
     path('api-auth/', include('rest_framework.urls')),
 ]